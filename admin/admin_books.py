@@ -3,160 +3,43 @@ from tkinter import ttk, messagebox
 import customtkinter as ctk
 from datetime import datetime
 
-from utils import connect_db
+from repository import books
+from background import run_in_background
+from admin.table_actions import SelectionActionBar
+from admin.virtual_table import VirtualTable
 
-def get_books(search_term=""):
-    """Get all books with optional search"""
-    connection = connect_db()
-    if not connection:
-        return []
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        if search_term:
-            query = """
-                SELECT 
-                    book_id, title, author, genre, isbn, publication_year, 
-                    available_copies, total_copies, 
-                    (total_copies - available_copies) AS borrowed_copies
-                FROM 
-                    Books
-                WHERE 
-                    title LIKE %s OR author LIKE %s OR genre LIKE %s OR isbn LIKE %s
-                ORDER BY 
-                    title
-            """
-            search_param = f"%{search_term}%"
-            cursor.execute(query, (search_param, search_param, search_param, search_param))
-        else:
-            query = """
-                SELECT 
-                    book_id, title, author, genre, isbn, publication_year, 
-                    available_copies, total_copies, 
-                    (total_copies - available_copies) AS borrowed_copies
-                FROM 
-                    Books
-                ORDER BY 
-                    title
-            """
-            cursor.execute(query)
-        
-        return cursor.fetchall()
-    except Exception as err:
-        messagebox.showerror("Database Error", str(err))
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+# Table heading -> server-side sort key
+BOOK_SORT_KEYS = {
+    "ID": "book_id",
+    "Title": "title",
+    "Author": "author",
+    "Genre": "genre",
+    "ISBN": "isbn",
+    "Year": "publication_year",
+    "Available": "available_copies",
+    "Total": "total_copies",
+}
+
+def get_books_page(search_term="", offset=0, limit=None, sort=None, descending=False, with_total=False):
+    """One page of books for the table - (books, total), total None unless with_total"""
+    return books.search(search_term, limit=limit, offset=offset, sort=sort, descending=descending,
+                        with_total=with_total)
+
+def get_book(book_id):
+    """Get a single book including its description"""
+    return books.get(book_id)
 
 def add_book(title, author, genre, isbn, publication_year, total_copies, description=""):
-    """Add a new book"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Check if book with same ISBN already exists
-        cursor.execute("SELECT book_id FROM Books WHERE isbn = %s", (isbn,))
-        if cursor.fetchone():
-            return False, "A book with this ISBN already exists"
-        
-        # Insert the new book
-        cursor.execute(
-            """
-            INSERT INTO Books (
-                title, author, genre, isbn, publication_year, 
-                total_copies, available_copies, description
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """,
-            (title, author, genre, isbn, publication_year, total_copies, total_copies, description)
-        )
-        
-        connection.commit()
-        return True, "Book added successfully"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    """Add a new book (the ISBN is validated and stored as ISBN-13)"""
+    return books.add(title, author, genre, isbn, publication_year, total_copies, description)
 
 def update_book(book_id, title, author, genre, isbn, publication_year, total_copies, description=""):
-    """Update an existing book"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Check if book exists
-        cursor.execute("SELECT available_copies FROM Books WHERE book_id = %s", (book_id,))
-        result = cursor.fetchone()
-        if not result:
-            return False, "Book not found"
-        
-        available_copies = result[0]
-        
-        # Calculate new available copies
-        borrowed_copies = total_copies - available_copies
-        new_available = max(0, total_copies - borrowed_copies)
-        
-        # Update the book
-        cursor.execute(
-            """
-            UPDATE Books SET 
-                title = %s, author = %s, genre = %s, isbn = %s, 
-                publication_year = %s, total_copies = %s, 
-                available_copies = %s, description = %s
-            WHERE book_id = %s
-            """,
-            (title, author, genre, isbn, publication_year, 
-             total_copies, new_available, description, book_id)
-        )
-        
-        connection.commit()
-        return True, "Book updated successfully"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    """Update an existing book (the ISBN is validated and stored as ISBN-13)"""
+    return books.update(book_id, title, author, genre, isbn, publication_year, total_copies, description)
 
 def delete_book(book_id):
     """Delete a book"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Check if book is currently borrowed
-        cursor.execute(
-            "SELECT COUNT(*) FROM Loans WHERE book_id = %s AND return_date IS NULL", 
-            (book_id,)
-        )
-        
-        if cursor.fetchone()[0] > 0:
-            return False, "Cannot delete book: it is currently borrowed by users"
-        
-        # Delete the book
-        cursor.execute("DELETE FROM Books WHERE book_id = %s", (book_id,))
-        
-        connection.commit()
-        return True, "Book deleted successfully"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return books.delete(book_id)
 
 # ------------------- UI Functions -------------------
 def show_books_management(content_frame):
@@ -232,7 +115,7 @@ def show_books_management(content_frame):
     style.map("Treeview", background=[("selected", "#116636")], foreground=[("selected", "white")])
     
     # Table columns
-    books_columns = ("ID", "Title", "Author", "Genre", "ISBN", "Year", "Available", "Total", "Actions")
+    books_columns = ("ID", "Title", "Author", "Genre", "ISBN", "Year", "Available", "Total")
     
     # Create treeview
     books_tree = ttk.Treeview(
@@ -258,85 +141,55 @@ def show_books_management(content_frame):
         "ISBN": 100,
         "Year": 60,
         "Available": 70,
-        "Total": 60,
-        "Actions": 120
+        "Total": 60
     }
     
     for col in books_columns:
         books_tree.heading(col, text=col)
-        books_tree.column(col, width=column_widths.get(col, 100), anchor="w" if col != "Actions" else "center")
+        books_tree.column(col, width=column_widths.get(col, 100), anchor="w")
+    
+    # One action bar above the table for the selected book, instead of buttons on every row.
+    # Edit also runs on double-click; both are on the right-click menu
+    action_bar = SelectionActionBar(
+        content_frame,
+        books_tree,
+        [
+            ("Edit", "#FFA500", "#FF8C00",
+             lambda values: show_book_form(content_frame, books_tree, values[0]), None),
+            ("Delete", "#FF5252", "#D32F2F",
+             lambda values: confirm_delete_book(books_tree, values[0]), None),
+        ],
+        describe=lambda values: f"Selected: {values[1]} (ID {values[0]})",
+        default=0
+    )
+    action_bar.frame.pack(fill="x", padx=30, pady=(0, 10), before=table_frame)
+    
+    # Rows are fetched a page at a time as the table scrolls; headings sort on the server
+    VirtualTable(books_tree, scrollbar, get_books_page, book_row,
+                 row_key=lambda book: book['book_id'], sort_keys=BOOK_SORT_KEYS, group="books")
     
     # Initial load of books
-    populate_books_table(books_tree)
+    populate_books_table(books_tree, "")
 
-def populate_books_table(books_tree, search_term=""):
-    """Populate the books table with data"""
-    # Clear existing data
-    for item in books_tree.get_children():
-        books_tree.delete(item)
-    
-    # Get books data
-    books = get_books(search_term)
-    
-    # Insert books into table
-    for book in books:
-        item_id = books_tree.insert("", "end", values=(
-            book['book_id'],
-            book['title'],
-            book['author'],
-            book['genre'],
-            book['isbn'],
-            book['publication_year'],
-            book['available_copies'],
-            book['total_copies'],
-            ""  # Actions column will be filled with buttons
-        ))
-        
-    # Add buttons to the Actions column
-    add_book_action_buttons(books_tree)
+def book_row(book):
+    """Table values for one book"""
+    return (
+        book['book_id'],
+        book['title'],
+        book['author'],
+        book['genre'],
+        book['isbn'],
+        book['publication_year'],
+        book['available_copies'],
+        book['total_copies']
+    )
 
-def add_book_action_buttons(books_tree):
-    """Add edit and delete buttons to the books table"""
-    for item in books_tree.get_children():
-        # Get the book ID
-        book_id = books_tree.item(item, 'values')[0]
-        
-        # Get bounding box for action column
-        col_idx = 8  # "Actions" column index
-        bbox = books_tree.bbox(item, column=col_idx)
-        
-        if bbox:  # If visible
-            # Create a frame for the buttons
-            button_frame = ctk.CTkFrame(books_tree, fg_color="transparent")
-            button_frame.place(x=bbox[0], y=bbox[1], width=120, height=bbox[3])
-            
-            # Edit button
-            edit_button = ctk.CTkButton(
-                button_frame, 
-                text="Edit",
-                width=50,
-                height=20,
-                fg_color="#FFA500",
-                hover_color="#FF8C00",
-                corner_radius=4,
-                font=ctk.CTkFont(size=10),
-                command=lambda b_id=book_id: show_book_form(books_tree.master.master, books_tree, b_id)
-            )
-            edit_button.pack(side="left", padx=(0, 5))
-            
-            # Delete button
-            delete_button = ctk.CTkButton(
-                button_frame, 
-                text="Delete",
-                width=50,
-                height=20,
-                fg_color="#FF5252",
-                hover_color="#D32F2F",
-                corner_radius=4,
-                font=ctk.CTkFont(size=10),
-                command=lambda b_id=book_id: confirm_delete_book(books_tree, b_id)
-            )
-            delete_button.pack(side="left")
+def populate_books_table(books_tree, search_term=None):
+    """Load the books table for a new search, or re-read it in place (after a change) if search_term is None"""
+    if search_term is None:
+        books_tree.table.refresh()
+    else:
+        books_tree.table.reload(search_term=search_term)
 
 def show_book_form(content_frame, books_tree, book_id=None):
     """Show form to add or edit a book"""
@@ -352,16 +205,6 @@ def show_book_form(content_frame, books_tree, book_id=None):
     dialog_y = content_frame.winfo_rooty() + (content_frame.winfo_height() // 2) - 275
     dialog.geometry(f"+{dialog_x}+{dialog_y}")
     
-    # Book data (empty for new, populated for edit)
-    book_data = {}
-    if book_id:
-        # Fetch book data for editing
-        books = get_books()
-        for book in books:
-            if str(book['book_id']) == str(book_id):
-                book_data = book
-                break
-    
     # Form frame
     form_frame = ctk.CTkFrame(dialog)
     form_frame.pack(fill="both", expand=True, padx=20, pady=20)
@@ -385,50 +228,53 @@ def show_book_form(content_frame, books_tree, book_id=None):
     ctk.CTkLabel(input_frame, text="Title:", anchor="e", width=100).grid(row=0, column=0, padx=(20, 10), pady=10, sticky="e")
     title_entry = ctk.CTkEntry(input_frame, width=400, height=30)
     title_entry.grid(row=0, column=1, padx=(0, 20), pady=10, sticky="ew")
-    if 'title' in book_data:
-        title_entry.insert(0, book_data['title'])
     
     # Author field
     ctk.CTkLabel(input_frame, text="Author:", anchor="e", width=100).grid(row=1, column=0, padx=(20, 10), pady=10, sticky="e")
     author_entry = ctk.CTkEntry(input_frame, width=400, height=30)
     author_entry.grid(row=1, column=1, padx=(0, 20), pady=10, sticky="ew")
-    if 'author' in book_data:
-        author_entry.insert(0, book_data['author'])
     
     # Genre field
     ctk.CTkLabel(input_frame, text="Genre:", anchor="e", width=100).grid(row=2, column=0, padx=(20, 10), pady=10, sticky="e")
     genre_entry = ctk.CTkEntry(input_frame, width=400, height=30)
     genre_entry.grid(row=2, column=1, padx=(0, 20), pady=10, sticky="ew")
-    if 'genre' in book_data:
-        genre_entry.insert(0, book_data['genre'])
     
     # ISBN field
     ctk.CTkLabel(input_frame, text="ISBN:", anchor="e", width=100).grid(row=3, column=0, padx=(20, 10), pady=10, sticky="e")
     isbn_entry = ctk.CTkEntry(input_frame, width=400, height=30)
     isbn_entry.grid(row=3, column=1, padx=(0, 20), pady=10, sticky="ew")
-    if 'isbn' in book_data:
-        isbn_entry.insert(0, book_data['isbn'])
     
     # Publication Year field
     ctk.CTkLabel(input_frame, text="Year:", anchor="e", width=100).grid(row=4, column=0, padx=(20, 10), pady=10, sticky="e")
     year_entry = ctk.CTkEntry(input_frame, width=400, height=30)
     year_entry.grid(row=4, column=1, padx=(0, 20), pady=10, sticky="ew")
-    if 'publication_year' in book_data:
-        year_entry.insert(0, str(book_data['publication_year']))
     
     # Total Copies field
     ctk.CTkLabel(input_frame, text="Total Copies:", anchor="e", width=100).grid(row=5, column=0, padx=(20, 10), pady=10, sticky="e")
     copies_entry = ctk.CTkEntry(input_frame, width=400, height=30)
     copies_entry.grid(row=5, column=1, padx=(0, 20), pady=10, sticky="ew")
-    if 'total_copies' in book_data:
-        copies_entry.insert(0, str(book_data['total_copies']))
     
     # Description field
     ctk.CTkLabel(input_frame, text="Description:", anchor="e", width=100).grid(row=6, column=0, padx=(20, 10), pady=10, sticky="ne")
     description_text = ctk.CTkTextbox(input_frame, width=400, height=100)
     description_text.grid(row=6, column=1, padx=(0, 20), pady=10, sticky="ew")
-    if 'description' in book_data:
-        description_text.insert("1.0", book_data.get('description', ''))
+    
+    def fill_form(book_data):
+        """Populate the fields with the book being edited"""
+        if not book_data:
+            error_label.configure(text="Book not found")
+            return
+        title_entry.insert(0, book_data['title'])
+        author_entry.insert(0, book_data['author'])
+        if book_data.get('genre'):
+            genre_entry.insert(0, book_data['genre'])
+        if book_data.get('isbn'):
+            isbn_entry.insert(0, book_data['isbn'])
+        if book_data.get('publication_year'):
+            year_entry.insert(0, str(book_data['publication_year']))
+        copies_entry.insert(0, str(book_data['total_copies']))
+        if book_data.get('description'):
+            description_text.insert("1.0", book_data['description'])
     
     # Error message label
     error_label = ctk.CTkLabel(
@@ -439,6 +285,10 @@ def show_book_form(content_frame, books_tree, book_id=None):
     )
     error_label.pack(pady=(10, 0))
     
+    if book_id:
+        # Fetch book data for editing
+        run_in_background(dialog, get_book, book_id, on_success=fill_form)
+    
     # Button frame
     button_frame = ctk.CTkFrame(form_frame, fg_color="transparent")
     button_frame.pack(fill="x", pady=(20, 0))
@@ -491,18 +341,22 @@ def show_book_form(content_frame, books_tree, book_id=None):
             error_label.configure(text="Total copies must be a valid number")
             return
         
+        def on_saved(result):
+            success, message = result
+            if success:
+                dialog.destroy()
+                populate_books_table(books_tree)  # Refresh the table
+                messagebox.showinfo("Success", message)
+            else:
+                error_label.configure(text=message)
+        
         # Save/update the book
         if book_id:  # Update existing book
-            success, message = update_book(book_id, title, author, genre, isbn, year, copies, description)
+            run_in_background(dialog, update_book, book_id, title, author, genre, isbn, year, copies, description,
+                              on_success=on_saved)
         else:  # Add new book
-            success, message = add_book(title, author, genre, isbn, year, copies, description)
-        
-        if success:
-            dialog.destroy()
-            populate_books_table(books_tree)  # Refresh the table
-            messagebox.showinfo("Success", message)
-        else:
-            error_label.configure(text=message)
+            run_in_background(dialog, add_book, title, author, genre, isbn, year, copies, description,
+                              on_success=on_saved)
     
     save_button = ctk.CTkButton(
         button_frame,
@@ -518,13 +372,10 @@ def show_book_form(content_frame, books_tree, book_id=None):
 
 def confirm_delete_book(books_tree, book_id):
     """Show confirmation dialog before deleting a book"""
-    # Find book title
+    # Find book title (rows are keyed by book id)
     book_title = ""
-    for item in books_tree.get_children():
-        values = books_tree.item(item, 'values')
-        if str(values[0]) == str(book_id):
-            book_title = values[1]
-            break
+    if books_tree.exists(str(book_id)):
+        book_title = books_tree.item(str(book_id), 'values')[1]
     
     result = messagebox.askyesno(
         "Confirm Delete", 
@@ -532,9 +383,14 @@ def confirm_delete_book(books_tree, book_id):
     )
     
     if result:
-        success, message = delete_book(book_id)
-        if success:
-            messagebox.showinfo("Success", message)
-            populate_books_table(books_tree)  # Refresh the table
-        else:
-            messagebox.showerror("Error", message)
\ No newline at end of file
+        run_in_background(books_tree, delete_book, book_id,
+                          on_success=lambda result: on_book_deleted(books_tree, result))
+
+def on_book_deleted(books_tree, result):
+    """Report a finished delete and refresh the table"""
+    success, message = result
+    if success:
+        messagebox.showinfo("Success", message)
+        populate_books_table(books_tree)  # Refresh the table
+    else:
+        messagebox.showerror("Error", message)
\ No newline at end of file
@@ -1,12 +1,15 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import os
 from datetime import datetime
 
 from config import DB_CONFIG
-from utils import connect_db, load_admin_session, save_admin_session, clear_admin_session
+from utils import load_admin_session, save_admin_session, clear_admin_session
+from repository import books, loans, fines, users
+from background import run_in_background, submit_from_button
+from router import show_screen
 from admin.admin_books import show_books_management
 from admin.admin_users import show_users_management
 from admin.admin_fines import show_fines_management
@@ -204,34 +207,21 @@ class LibraryAdminApp:
                 error_label.configure(text="Please enter both email and password")
                 return
             
-            # Hash the password
-            from utils import hash_password
-            hashed_password = hash_password(password)
-            
-            connection = connect_db()
-            if connection:
-                try:
-                    cursor = connection.cursor(dictionary=True)
-                    cursor.execute(
-                        "SELECT user_id, first_name, last_name, email, role FROM Users WHERE email = %s AND password = %s AND role = 'admin'",
-                        (email, hashed_password)
-                    )
-                    admin = cursor.fetchone()
+            def on_authenticated(admin):
+                if admin:
+                    # Save admin session
+                    save_admin_session(admin)
                     
-                    if admin:
-                        # Save admin session
-                        save_admin_session(admin)
-                        
-                        # Reload the application
-                        self.admin = admin
-                        self.setup_ui()
-                        self.show_dashboard()
-                    else:
-                        error_label.configure(text="Invalid admin credentials or insufficient privileges")
-                finally:
-                    if connection.is_connected():
-                        cursor.close()
-                        connection.close()
+                    # Reload the application
+                    self.admin = admin
+                    self.setup_ui()
+                    self.show_dashboard()
+                else:
+                    error_label.configure(text="Invalid admin credentials or insufficient privileges")
+            
+            error_label.configure(text="")
+            submit_from_button(login_button, users.authenticate, email, password, role="admin",
+                               on_success=on_authenticated)
         
         login_button = ctk.CTkButton(
             login_frame,
@@ -250,11 +240,7 @@ class LibraryAdminApp:
         
         # Back button
         def go_back():
-            self.root.destroy()
-            import main
-            root = ctk.CTk()
-            main.LibraryManagementSystem(root)
-            root.mainloop()
+            show_screen("main")
             
         back_button = ctk.CTkButton(
             login_frame,
@@ -276,9 +262,6 @@ class LibraryAdminApp:
         for widget in self.content.winfo_children():
             widget.destroy()
         
-        # Get dashboard statistics
-        stats = self.get_dashboard_stats()
-        
         # Create dashboard title
         title = ctk.CTkLabel(
             self.content, 
@@ -296,16 +279,17 @@ class LibraryAdminApp:
         for i in range(4):
             cards_frame.grid_columnconfigure(i, weight=1)
         
-        # Card data and icons
+        # Card titles and icons - values are filled in when the statistics arrive
         card_data = [
-            ("Total Books", f"{stats.get('total_books', 0):,}", "📚"),
-            ("Books Borrowed", f"{stats.get('borrowed_books', 0):,}", "📖"),
-            ("Registered Users", f"{stats.get('total_users', 0):,}", "👥"),
-            ("Pending Fines", f"${stats.get('pending_fines', 0):,.2f}", "💰")
+            ("Total Books", "📚"),
+            ("Books Borrowed", "📖"),
+            ("Registered Users", "👥"),
+            ("Pending Fines", "💰")
         ]
         
         # Create summary cards
-        for i, (title, value, icon) in enumerate(card_data):
+        self.card_value_labels = {}
+        for i, (title, icon) in enumerate(card_data):
             card = ctk.CTkFrame(cards_frame, fg_color="white", corner_radius=10)
             card.grid(row=0, column=i, padx=10, pady=10, sticky="nsew", ipadx=15, ipady=15)
             
@@ -332,11 +316,12 @@ class LibraryAdminApp:
             # Value
             value_label = ctk.CTkLabel(
                 card,
-                text=value,
+                text="…",
                 font=ctk.CTkFont(size=24, weight="bold"),
                 text_color="#333333"
             )
             value_label.pack(anchor="w", padx=15, pady=(5, 15))
+            self.card_value_labels[title] = value_label
         
         # Create two columns for bottom section
         bottom_frame = ctk.CTkFrame(self.content, fg_color="transparent")
@@ -377,14 +362,7 @@ class LibraryAdminApp:
             loans_tree.heading(col, text=col)
             loans_tree.column(col, width=100)
         
-        # Populate with recent loans
-        for loan in stats.get('recent_loans', []):
-            loans_tree.insert("", "end", values=(
-                loan[0],  # Book title
-                f"{loan[1]} {loan[2]}",  # User name
-                loan[3].strftime('%b %d, %Y') if isinstance(loan[3], datetime) else loan[3],  # Loan date
-                loan[4].strftime('%b %d, %Y') if isinstance(loan[4], datetime) else loan[4]   # Due date
-            ))
+        loans_tree.insert("", "end", values=("Loading...", "", "", ""))
         
         # Genres Section
         genres_frame = ctk.CTkFrame(bottom_frame, fg_color="white", corner_radius=10)
@@ -406,6 +384,35 @@ class LibraryAdminApp:
         bar_canvas = ctk.CTkCanvas(chart_frame, bg="white", highlightthickness=0)
         bar_canvas.pack(fill="both", expand=True)
         
+        # Get dashboard statistics off the Tk thread
+        run_in_background(
+            cards_frame,
+            self.get_dashboard_stats,
+            on_success=lambda stats: self.show_dashboard_stats(stats, loans_tree, bar_canvas)
+        )
+    
+    def show_dashboard_stats(self, stats, loans_tree, bar_canvas):
+        """Fill the dashboard cards, recent loans table and genre chart"""
+        card_values = {
+            "Total Books": f"{stats.get('total_books', 0):,}",
+            "Books Borrowed": f"{stats.get('borrowed_books', 0):,}",
+            "Registered Users": f"{stats.get('total_users', 0):,}",
+            "Pending Fines": f"${stats.get('pending_fines', 0):,.2f}"
+        }
+        for title, value in card_values.items():
+            self.card_value_labels[title].configure(text=value)
+        
+        loans_tree.delete(*loans_tree.get_children())
+        
+        # Populate with recent loans
+        for loan in stats.get('recent_loans', []):
+            loans_tree.insert("", "end", values=(
+                loan[0],  # Book title
+                f"{loan[1]} {loan[2]}",  # User name
+                loan[3].strftime('%b %d, %Y') if isinstance(loan[3], datetime) else loan[3],  # Loan date
+                loan[4].strftime('%b %d, %Y') if isinstance(loan[4], datetime) else loan[4]   # Due date
+            ))
+        
         # Get genre data
         genres = stats.get('genres', [])
         if genres:
@@ -444,73 +451,18 @@ class LibraryAdminApp:
     
     def get_dashboard_stats(self):
         """Get statistics for the dashboard"""
-        connection = connect_db()
-        if not connection:
-            return {}
-        
-        try:
-            cursor = connection.cursor()
-            
-            # Total Books Count
-            cursor.execute("SELECT SUM(total_copies) FROM Books")
-            total_books = cursor.fetchone()[0] or 0
-            
-            # Borrowed Books Count
-            cursor.execute("SELECT COUNT(*) FROM Loans WHERE return_date IS NULL")
-            borrowed_books = cursor.fetchone()[0] or 0
-            
-            # Total Users Count
-            cursor.execute("SELECT COUNT(*) FROM Users")
-            total_users = cursor.fetchone()[0] or 0
-            
-            # Pending Fines Amount
-            cursor.execute("SELECT COALESCE(SUM(amount), 0) FROM Fines WHERE paid = 0")
-            pending_fines = cursor.fetchone()[0] or 0
-            
-            # Books by Genre
-            cursor.execute("""
-                SELECT genre, COUNT(*) as count 
-                FROM Books 
-                GROUP BY genre 
-                ORDER BY count DESC 
-                LIMIT 5
-            """)
-            genres = cursor.fetchall()
-            
-            # Recent Loans
-            cursor.execute("""
-                SELECT 
-                    b.title, u.first_name, u.last_name, l.loan_date, l.due_date
-                FROM 
-                    Loans l
-                JOIN 
-                    Books b ON l.book_id = b.book_id
-                JOIN 
-                    Users u ON l.user_id = u.user_id
-                WHERE 
-                    l.return_date IS NULL
-                ORDER BY 
-                    l.loan_date DESC
-                LIMIT 5
-            """)
-            recent_loans = cursor.fetchall()
-            
-            return {
-                "total_books": total_books,
-                "borrowed_books": borrowed_books,
-                "total_users": total_users,
-                "pending_fines": pending_fines,
-                "genres": genres,
-                "recent_loans": recent_loans
-            }
-        except Exception as err:
-            messagebox.showerror("Database Error", str(err))
-            return {}
-        finally:
-            if connection.is_connected():
-                cursor.close()
-                connection.close()
-
+        return {
+            "total_books": books.total_copies(),
+            "borrowed_books": loans.open_count(),
+            "total_users": users.count(),
+            "pending_fines": fines.pending_total(),
+            "genres": books.genre_counts(5),
+            "recent_loans": [
+                (loan["title"], loan["first_name"], loan["last_name"], loan["loan_date"], loan["due_date"])
+                for loan in loans.recent_open(5)
+            ]
+        }
+    
     def show_books(self):
         """Show the book management page"""
         self.highlight_active_menu("📚 Manage Books")
@@ -536,9 +488,7 @@ class LibraryAdminApp:
 
 # ------------------- Run Admin App -------------------
 def run_admin():
-    root = ctk.CTk()
-    app = LibraryAdminApp(root)
-    root.mainloop()
+    show_screen("admin")
 
 # ------------------- Main Execution -------------------
 if __name__ == "__main__":
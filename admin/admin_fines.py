@@ -3,111 +3,56 @@ from tkinter import ttk, messagebox
 import customtkinter as ctk
 from datetime import datetime
 
-from utils import connect_db, format_date
+from utils import format_date
+from repository import fines
+from background import run_in_background
+from admin.table_actions import SelectionActionBar
+from admin.virtual_table import VirtualTable
 
-def get_all_fines():
-    """Get all fines information"""
-    connection = connect_db()
-    if not connection:
-        return []
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT 
-                f.fine_id,
-                f.loan_id,
-                f.amount,
-                f.description,
-                f.paid,
-                f.payment_date,
-                b.title,
-                u.first_name,
-                u.last_name,
-                u.email,
-                l.due_date,
-                l.return_date
-            FROM 
-                Fines f
-            JOIN 
-                Loans l ON f.loan_id = l.loan_id
-            JOIN 
-                Books b ON l.book_id = b.book_id
-            JOIN 
-                Users u ON l.user_id = u.user_id
-            ORDER BY 
-                f.paid, f.fine_id DESC
-        """)
-        
-        return cursor.fetchall()
-    except Exception as err:
-        messagebox.showerror("Database Error", str(err))
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+# Table heading -> server-side sort key
+FINE_SORT_KEYS = {
+    "ID": "fine_id",
+    "Book": "title",
+    "User": "user",
+    "Email": "email",
+    "Amount": "amount",
+    "Description": "description",
+    "Status": "paid",
+    "Date": "date",
+}
+
+# Tab -> the fines it lists (paid filter)
+FINE_TABS = {"all": {}, "pending": {"paid": 0}, "paid": {"paid": 1}}
+FINE_TAB_TITLES = {"all": "All Fines", "pending": "Pending Fines", "paid": "Paid Fines"}
+
+def get_fines_page(paid=None, offset=0, limit=None, sort=None, descending=False, with_total=False):
+    """One page of fines for a table - (fines, total), total None unless with_total"""
+    rows = fines.search(paid, limit=limit, offset=offset, sort=sort, descending=descending)
+    return rows, fines.count(paid) if with_total else None
+
+def get_outstanding_total():
+    """Sum of every unpaid fine"""
+    return fines.pending_total()
+
+def get_latest_fine_change():
+    """The newest fines change number"""
+    return fines.latest_change()
+
+def get_fine_changes(change_seq):
+    """Fines written and cancelled after change number change_seq - (fines, cancelled ids, latest number)"""
+    return fines.changes_since(change_seq)
+
+def fine_in_tab(fine, filters):
+    """Whether a fine belongs in the table with these filters"""
+    return "paid" not in filters or int(bool(fine['paid'])) == filters["paid"]
 
 def process_fine_payment(fine_id):
     """Mark a fine as paid"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Check if fine exists and is unpaid
-        cursor.execute("SELECT paid FROM Fines WHERE fine_id = %s", (fine_id,))
-        result = cursor.fetchone()
-        
-        if not result:
-            return False, "Fine not found"
-        
-        if result[0] == 1:  # Already paid
-            return False, "This fine has already been paid"
-        
-        # Mark fine as paid
-        cursor.execute(
-            "UPDATE Fines SET paid = 1, payment_date = CURDATE() WHERE fine_id = %s", 
-            (fine_id,)
-        )
-        
-        connection.commit()
-        return True, "Fine marked as paid successfully"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return fines.mark_paid(fine_id)
 
 def cancel_fine(fine_id):
     """Delete a fine record"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Check if fine exists
-        cursor.execute("SELECT fine_id FROM Fines WHERE fine_id = %s", (fine_id,))
-        if not cursor.fetchone():
-            return False, "Fine not found"
-        
-        # Delete the fine
-        cursor.execute("DELETE FROM Fines WHERE fine_id = %s", (fine_id,))
-        
-        connection.commit()
-        return True, "Fine cancelled successfully"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return fines.cancel(fine_id)
 
 # ------------------- UI Functions -------------------
 def show_fines_management(content_frame):
@@ -129,11 +74,6 @@ def show_fines_management(content_frame):
     stats_frame = ctk.CTkFrame(content_frame, fg_color="white", corner_radius=10)
     stats_frame.pack(fill="x", padx=30, pady=(0, 20))
     
-    # Get fines info for stats
-    all_fines = get_all_fines()
-    pending_fines = [f for f in all_fines if not f['paid']]
-    total_pending = sum(float(f['amount']) for f in pending_fines)
-    
     # Create stats display
     stats_label = ctk.CTkLabel(
         stats_frame,
@@ -145,21 +85,21 @@ def show_fines_management(content_frame):
     
     amount_label = ctk.CTkLabel(
         stats_frame,
-        text=f"${total_pending:.2f}",
+        text="…",
         font=ctk.CTkFont(size=20, weight="bold"),
         text_color="#d32f2f",
         anchor="e"
     )
     amount_label.pack(side="right", padx=20, pady=20)
     
-    # Create tabs for different views
-    tabview = ctk.CTkTabview(content_frame, height=500)
+    # Create tabs for different views - each loads its own fines the first time it is shown
+    tabview = ctk.CTkTabview(content_frame, height=500, command=lambda: load_visible_tab(tables))
     tabview.pack(fill="both", expand=True, padx=30, pady=(0, 20))
     
     # Add tabs
-    all_tab = tabview.add("All Fines")
-    pending_tab = tabview.add("Pending Fines")
-    paid_tab = tabview.add("Paid Fines")
+    all_tab = tabview.add(FINE_TAB_TITLES["all"])
+    pending_tab = tabview.add(FINE_TAB_TITLES["pending"])
+    paid_tab = tabview.add(FINE_TAB_TITLES["paid"])
     
     # Configure tabs to expand
     for tab in [all_tab, pending_tab, paid_tab]:
@@ -174,7 +114,7 @@ def show_fines_management(content_frame):
     style.map("Treeview", background=[("selected", "#116636")], foreground=[("selected", "white")])
     
     # Table columns
-    fines_columns = ("ID", "Book", "User", "Email", "Amount", "Description", "Status", "Date", "Actions")
+    fines_columns = ("ID", "Book", "User", "Email", "Amount", "Description", "Status", "Date")
     column_widths = {
         "ID": 50,
         "Book": 200,
@@ -183,8 +123,7 @@ def show_fines_management(content_frame):
         "Amount": 80,
         "Description": 200,
         "Status": 80,
-        "Date": 100,
-        "Actions": 100
+        "Date": 100
     }
     
     # Create tables for each tab
@@ -213,13 +152,37 @@ def show_fines_management(content_frame):
         # Configure column widths and headings
         for col in fines_columns:
             tree.heading(col, text=col)
-            tree.column(col, width=column_widths.get(col, 100), anchor="w" if col != "Actions" else "center")
+            tree.column(col, width=column_widths.get(col, 100), anchor="w")
+        
+        # One action bar under each table for the selected fine, instead of buttons on every
+        # row; Pay and Cancel (also on the right-click menu) only apply to pending fines
+        action_bar = SelectionActionBar(
+            tab,
+            tree,
+            [
+                ("Pay", "#4CAF50", "#388E3C",
+                 lambda values: process_payment(tables, values[0]), is_pending),
+                ("Cancel", "#FF5252", "#D32F2F",
+                 lambda values: cancel_fine_action(tables, values[0]), is_pending),
+            ],
+            describe=describe_fine
+        )
+        action_bar.frame.grid(row=1, column=0, sticky="ew", pady=(10, 0))
+        
+        # Rows are fetched a page at a time as the table scrolls; headings sort on the server
+        tree.tag_configure("paid", background="#E8F5E9")
+        tree.tag_configure("pending", background="#FFEBEE")
+        VirtualTable(tree, scrollbar, get_fines_page, fine_row,
+                     row_key=lambda fine: fine['fine_id'],
+                     row_tags=lambda fine: ("paid" if fine['paid'] else "pending",),
+                     sort_keys=FINE_SORT_KEYS, filters=FINE_TABS[tab_name], group=f"fines-{tab_name}")
         
         # Store tree in dictionary
         tables[tab_name] = tree
     
-    # Populate tables with data
-    populate_fines_tables(tables, all_fines)
+    # Populate the visible table with data
+    tables["all"].tabview = tabview
+    refresh_fines_data(tables, amount_label)
     
     # Refresh button
     refresh_btn = ctk.CTkButton(
@@ -230,115 +193,39 @@ def show_fines_management(content_frame):
         hover_color="#0d4f29",
         width=120,
         height=35,
-        command=lambda: refresh_fines_data(tables)
+        command=lambda: refresh_fines_data(tables, amount_label)
     )
     refresh_btn.place(relx=0.95, rely=0.07, anchor="e")
 
-def populate_fines_tables(tables, fines=None):
-    """Populate the fines tables with data"""
-    if fines is None:
-        fines = get_all_fines()
-    
-    # Clear existing data
-    for tree in tables.values():
-        for item in tree.get_children():
-            tree.delete(item)
+def fine_row(fine):
+    """Table values for one fine"""
+    status = "Paid" if fine['paid'] else "Pending"
+    date = fine['payment_date'] if fine['paid'] else fine['due_date']
     
-    # Process each fine
-    for fine in fines:
-        status = "Paid" if fine['paid'] else "Pending"
-        date = fine['payment_date'] if fine['paid'] else fine['due_date']
-        
-        if isinstance(date, datetime):
-            date = date.strftime('%Y-%m-%d')
-        
-        # Create row data
-        row_data = (
-            fine['fine_id'],
-            fine['title'],
-            f"{fine['first_name']} {fine['last_name']}",
-            fine['email'],
-            f"${float(fine['amount']):.2f}",
-            fine['description'],
-            status,
-            format_date(date),
-            ""  # Actions column will be filled with buttons
-        )
-        
-        # Insert into all fines table
-        item_id = tables["all"].insert("", "end", values=row_data, tags=(status.lower(),))
-        
-        # Insert into appropriate status table
-        if fine['paid']:
-            tables["paid"].insert("", "end", values=row_data, tags=("paid",))
-        else:
-            tables["pending"].insert("", "end", values=row_data, tags=("pending",))
+    if isinstance(date, datetime):
+        date = date.strftime('%Y-%m-%d')
     
-    # Configure tag colors
-    for tree in tables.values():
-        tree.tag_configure("paid", background="#E8F5E9")
-        tree.tag_configure("pending", background="#FFEBEE")
-    
-    # Add action buttons
-    for tab_name, tree in tables.items():
-        add_fine_action_buttons(tree, tab_name)
+    return (
+        fine['fine_id'],
+        fine['title'],
+        f"{fine['first_name']} {fine['last_name']}",
+        fine['email'],
+        f"${float(fine['amount']):.2f}",
+        fine['description'],
+        status,
+        format_date(date)
+    )
 
-def add_fine_action_buttons(tree, tab_type):
-    """Add action buttons to the fines table"""
-    for item in tree.get_children():
-        # Get values
-        values = tree.item(item, 'values')
-        fine_id = values[0]
-        status = values[6]  # Status column
-        
-        # Get bounding box for action column
-        col_idx = 8  # "Actions" column index
-        bbox = tree.bbox(item, column=col_idx)
-        
-        if bbox:  # If visible
-            # Create a frame for the buttons
-            button_frame = ctk.CTkFrame(tree, fg_color="transparent")
-            button_frame.place(x=bbox[0], y=bbox[1], width=100, height=bbox[3])
-            
-            if status == "Pending" or tab_type == "pending":
-                # Show process payment button for pending fines
-                pay_button = ctk.CTkButton(
-                    button_frame, 
-                    text="Pay",
-                    width=40,
-                    height=20,
-                    fg_color="#4CAF50",
-                    hover_color="#388E3C",
-                    corner_radius=4,
-                    font=ctk.CTkFont(size=10),
-                    command=lambda f_id=fine_id: process_payment(tree, f_id)
-                )
-                pay_button.pack(side="left", padx=(0, 5))
-                
-                # Show cancel button for pending fines
-                cancel_button = ctk.CTkButton(
-                    button_frame, 
-                    text="Cancel",
-                    width=40,
-                    height=20,
-                    fg_color="#FF5252",
-                    hover_color="#D32F2F",
-                    corner_radius=4,
-                    font=ctk.CTkFont(size=10),
-                    command=lambda f_id=fine_id: cancel_fine_action(tree, f_id)
-                )
-                cancel_button.pack(side="left")
-            elif status == "Paid" or tab_type == "paid":
-                # Show "Paid" text for already paid fines
-                paid_label = ctk.CTkLabel(
-                    button_frame,
-                    text="✓ Paid",
-                    font=ctk.CTkFont(size=10),
-                    text_color="#4CAF50"
-                )
-                paid_label.pack()
+def is_pending(values):
+    """Whether a fines table row (its values) is still unpaid"""
+    return values[6] == "Pending"
 
-def process_payment(tree, fine_id):
+def describe_fine(values):
+    """Action bar text for the selected fine"""
+    status = "Pending" if is_pending(values) else "✓ Paid"
+    return f"Fine #{values[0]}: {values[2]}, {values[4]} ({status})"
+
+def process_payment(tables, fine_id):
     """Process payment for a fine"""
     result = messagebox.askyesno(
         "Confirm Payment", 
@@ -346,14 +233,10 @@ def process_payment(tree, fine_id):
     )
     
     if result:
-        success, message = process_fine_payment(fine_id)
-        if success:
-            messagebox.showinfo("Success", message)
-            refresh_fines_data({tree}) 
-        else:
-            messagebox.showerror("Error", message)
+        run_in_background(tables["all"], process_fine_payment, fine_id,
+                          on_success=lambda result: on_fine_updated(tables, result))
 
-def cancel_fine_action(tree, fine_id):
+def cancel_fine_action(tables, fine_id):
     """Cancel a fine"""
     result = messagebox.askyesno(
         "Confirm Cancellation", 
@@ -361,14 +244,81 @@ def cancel_fine_action(tree, fine_id):
     )
     
     if result:
-        success, message = cancel_fine(fine_id)
-        if success:
-            messagebox.showinfo("Success", message)
-            refresh_fines_data({tree})
-        else:
-            messagebox.showerror("Error", message)
+        run_in_background(tables["all"], cancel_fine, fine_id,
+                          on_success=lambda result: on_fine_updated(tables, result))
+
+def on_fine_updated(tables, result):
+    """Report a finished payment or cancellation and patch the tables with what changed"""
+    success, message = result
+    if success:
+        messagebox.showinfo("Success", message)
+        refresh_changed_fines(tables)
+    else:
+        messagebox.showerror("Error", message)
+
+def refresh_fines_data(tables, amount_label=None):
+    """Re-read the outstanding total and the table on screen in the background (other tabs when shown)"""
+    if amount_label is not None:
+        # Later refreshes (after pay/cancel) only get the tables, so keep the label with them
+        tables["all"].amount_label = amount_label
+    
+    refresh_outstanding_total(tables)
+    
+    # Take the change number before any rows are read: a write landing during the reads
+    # is then applied again (harmlessly) by the next incremental refresh, never missed
+    run_in_background(tables["all"], get_latest_fine_change, group="fines-reload",
+                      on_success=lambda change_seq: reload_fines_tables(tables, change_seq))
+
+def reload_fines_tables(tables, change_seq):
+    """Re-read the visible table, and the others when they are next shown"""
+    tables["all"].change_seq = change_seq
+    tables["all"].stale_tabs = set(tables)
+    load_visible_tab(tables)
+
+def visible_tab(tables):
+    """Name of the tab on screen"""
+    title = tables["all"].tabview.get()
+    return next(tab_name for tab_name, tab_title in FINE_TAB_TITLES.items() if tab_title == title)
+
+def load_visible_tab(tables):
+    """Load the tab on screen if it has not been read since the last full refresh"""
+    stale_tabs = getattr(tables["all"], "stale_tabs", None)
+    if stale_tabs is None:
+        return  # The change number for the first load is still being read
+    tab_name = visible_tab(tables)
+    if tab_name in stale_tabs:
+        stale_tabs.discard(tab_name)
+        tables[tab_name].table.refresh()
+
+def refresh_changed_fines(tables):
+    """Patch the tables with only the fines written or cancelled since they were read"""
+    change_seq = getattr(tables["all"], "change_seq", None)
+    if change_seq is None:
+        refresh_fines_data(tables)  # Never fully loaded - nothing to patch
+        return
+    
+    run_in_background(tables["all"], get_fine_changes, change_seq, group="fines-changes",
+                      on_success=lambda result: apply_fine_changes(tables, *result))
+
+def apply_fine_changes(tables, changed, cancelled, change_seq):
+    """Update, drop or (by re-reading the window) add the affected rows of each loaded table"""
+    tables["all"].change_seq = max(change_seq, tables["all"].change_seq)
+    if changed or cancelled:
+        stale_tabs = tables["all"].stale_tabs
+        for tab_name, tree in tables.items():
+            if tab_name in stale_tabs:
+                continue  # Not read yet - it loads fresh when shown
+            filters = FINE_TABS[tab_name]
+            if tree.table.apply_changes(changed, cancelled, lambda fine: fine_in_tab(fine, filters)):
+                # A row this table lacks may belong in its window - re-read it now if it is
+                # on screen, or when it is next shown
+                stale_tabs.add(tab_name)
+        load_visible_tab(tables)
+    
+    refresh_outstanding_total(tables)
 
-def refresh_fines_data(tables):
-    """Refresh fines data in tables"""
-    fines = get_all_fines()
-    populate_fines_tables(tables, fines)
\ No newline at end of file
+def refresh_outstanding_total(tables):
+    amount_label = getattr(tables["all"], "amount_label", None)
+    if amount_label is not None:
+        run_in_background(amount_label, get_outstanding_total, group="fines-total",
+                          on_success=lambda total: amount_label.configure(text=f"${float(total):.2f}"))
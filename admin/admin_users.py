@@ -4,173 +4,37 @@ import customtkinter as ctk
 import re
 from datetime import datetime
 
-from utils import connect_db, hash_password
+from repository import users
+from background import run_in_background
+from admin.table_actions import SelectionActionBar
+from admin.virtual_table import VirtualTable
 
-def get_users(search_term=""):
-    """Get all users with optional search"""
-    connection = connect_db()
-    if not connection:
-        return []
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        if search_term:
-            query = """
-                SELECT 
-                    user_id, first_name, last_name, email, role, 
-                    registration_date
-                FROM 
-                    Users
-                WHERE 
-                    first_name LIKE %s OR last_name LIKE %s OR email LIKE %s
-                ORDER BY 
-                    registration_date DESC
-            """
-            search_param = f"%{search_term}%"
-            cursor.execute(query, (search_param, search_param, search_param))
-        else:
-            query = """
-                SELECT 
-                    user_id, first_name, last_name, email, role, 
-                    registration_date
-                FROM 
-                    Users
-                ORDER BY 
-                    registration_date DESC
-            """
-            cursor.execute(query)
-        
-        return cursor.fetchall()
-    except Exception as err:
-        messagebox.showerror("Database Error", str(err))
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+# Table heading -> server-side sort key
+USER_SORT_KEYS = {
+    "ID": "user_id",
+    "First Name": "first_name",
+    "Last Name": "last_name",
+    "Email": "email",
+    "Role": "role",
+    "Registration Date": "registration_date",
+}
+
+def get_users_page(search_term="", offset=0, limit=None, sort=None, descending=False, with_total=False):
+    """One page of users for the table - (users, total), total None unless with_total"""
+    rows = users.search(search_term, limit=limit, offset=offset, sort=sort, descending=descending)
+    return rows, users.count(search_term) if with_total else None
 
 def create_user(first_name, last_name, email, password, role="member"):
     """Create a new user"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Check if email already exists
-        cursor.execute("SELECT user_id FROM Users WHERE email = %s", (email,))
-        if cursor.fetchone():
-            return False, "A user with this email already exists"
-        
-        # Hash password
-        hashed_password = hash_password(password)
-        
-        # Insert the new user
-        cursor.execute(
-            """
-            INSERT INTO Users (
-                first_name, last_name, email, password, role, registration_date
-            ) VALUES (%s, %s, %s, %s, %s, CURDATE())
-            """,
-            (first_name, last_name, email, hashed_password, role)
-        )
-        
-        connection.commit()
-        return True, "User created successfully"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return users.create(first_name, last_name, email, password, role)
 
 def update_user(user_id, first_name, last_name, email, role, new_password=None):
     """Update an existing user"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Check if user exists
-        cursor.execute("SELECT user_id FROM Users WHERE user_id = %s", (user_id,))
-        if not cursor.fetchone():
-            return False, "User not found"
-        
-        # Update user with or without password change
-        if new_password:
-            hashed_password = hash_password(new_password)
-            cursor.execute(
-                """
-                UPDATE Users SET 
-                    first_name = %s, last_name = %s, email = %s, role = %s, password = %s
-                WHERE user_id = %s
-                """,
-                (first_name, last_name, email, role, hashed_password, user_id)
-            )
-        else:
-            cursor.execute(
-                """
-                UPDATE Users SET 
-                    first_name = %s, last_name = %s, email = %s, role = %s
-                WHERE user_id = %s
-                """,
-                (first_name, last_name, email, role, user_id)
-            )
-        
-        connection.commit()
-        return True, "User updated successfully"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return users.update(user_id, first_name, last_name, email, role, new_password)
 
 def delete_user(user_id):
     """Delete a user"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Check if user has active loans
-        cursor.execute(
-            "SELECT COUNT(*) FROM Loans WHERE user_id = %s AND return_date IS NULL", 
-            (user_id,)
-        )
-        
-        if cursor.fetchone()[0] > 0:
-            return False, "Cannot delete user: they have active loans"
-        
-        # Delete any fines
-        cursor.execute(
-            """
-            DELETE FROM Fines
-            WHERE loan_id IN (SELECT loan_id FROM Loans WHERE user_id = %s)
-            """, 
-            (user_id,)
-        )
-        
-        # Delete loan history
-        cursor.execute("DELETE FROM Loans WHERE user_id = %s", (user_id,))
-        
-        # Delete the user
-        cursor.execute("DELETE FROM Users WHERE user_id = %s", (user_id,))
-        
-        connection.commit()
-        return True, "User deleted successfully"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return users.delete(user_id)
 
 # ------------------- UI Functions -------------------
 def show_users_management(content_frame):
@@ -245,7 +109,7 @@ def show_users_management(content_frame):
     style.map("Treeview", background=[("selected", "#116636")], foreground=[("selected", "white")])
     
     # Table columns
-    users_columns = ("ID", "First Name", "Last Name", "Email", "Role", "Registration Date", "Actions")
+    users_columns = ("ID", "First Name", "Last Name", "Email", "Role", "Registration Date")
     
     # Create treeview
     users_tree = ttk.Treeview(
@@ -269,87 +133,57 @@ def show_users_management(content_frame):
         "Last Name": 120,
         "Email": 200,
         "Role": 100,
-        "Registration Date": 120,
-        "Actions": 120
+        "Registration Date": 120
     }
     
     for col in users_columns:
         users_tree.heading(col, text=col)
-        users_tree.column(col, width=column_widths.get(col, 100), anchor="w" if col != "Actions" else "center")
+        users_tree.column(col, width=column_widths.get(col, 100), anchor="w")
+    
+    # One action bar above the table for the selected user, instead of buttons on every row.
+    # Edit also runs on double-click; both are on the right-click menu
+    action_bar = SelectionActionBar(
+        content_frame,
+        users_tree,
+        [
+            ("Edit", "#FFA500", "#FF8C00",
+             lambda values: show_user_form(content_frame, users_tree, values[0]), None),
+            ("Delete", "#FF5252", "#D32F2F",
+             lambda values: confirm_delete_user(users_tree, values[0]), None),
+        ],
+        describe=lambda values: f"Selected: {values[1]} {values[2]} ({values[3]})",
+        default=0
+    )
+    action_bar.frame.pack(fill="x", padx=30, pady=(0, 10), before=table_frame)
+    
+    # Rows are fetched a page at a time as the table scrolls; headings sort on the server
+    VirtualTable(users_tree, scrollbar, get_users_page, user_row,
+                 row_key=lambda user: user['user_id'], sort_keys=USER_SORT_KEYS, group="users")
     
     # Initial load of users
-    populate_users_table(users_tree)
+    populate_users_table(users_tree, "")
 
-def populate_users_table(users_tree, search_term=""):
-    """Populate the users table with data"""
-    # Clear existing data
-    for item in users_tree.get_children():
-        users_tree.delete(item)
-    
-    # Get users data
-    users = get_users(search_term)
-    
-    # Insert users into table
-    for user in users:
-        reg_date = user['registration_date']
-        if isinstance(reg_date, datetime):
-            reg_date = reg_date.strftime('%Y-%m-%d')
-        
-        item_id = users_tree.insert("", "end", values=(
-            user['user_id'],
-            user['first_name'],
-            user['last_name'],
-            user['email'],
-            user['role'],
-            reg_date,
-            ""  # Actions column will be filled with buttons
-        ))
-        
-    # Add buttons to the Actions column
-    add_user_action_buttons(users_tree)
+def user_row(user):
+    """Table values for one user"""
+    reg_date = user['registration_date']
+    if isinstance(reg_date, datetime):
+        reg_date = reg_date.strftime('%Y-%m-%d')
+    
+    return (
+        user['user_id'],
+        user['first_name'],
+        user['last_name'],
+        user['email'],
+        user['role'],
+        reg_date
+    )
 
-def add_user_action_buttons(users_tree):
-    """Add edit and delete buttons to the users table"""
-    for item in users_tree.get_children():
-        # Get the user ID
-        user_id = users_tree.item(item, 'values')[0]
-        
-        # Get bounding box for action column
-        col_idx = 6  # "Actions" column index
-        bbox = users_tree.bbox(item, column=col_idx)
-        
-        if bbox:  # If visible
-            # Create a frame for the buttons
-            button_frame = ctk.CTkFrame(users_tree, fg_color="transparent")
-            button_frame.place(x=bbox[0], y=bbox[1], width=120, height=bbox[3])
-            
-            # Edit button
-            edit_button = ctk.CTkButton(
-                button_frame, 
-                text="Edit",
-                width=50,
-                height=20,
-                fg_color="#FFA500",
-                hover_color="#FF8C00",
-                corner_radius=4,
-                font=ctk.CTkFont(size=10),
-                command=lambda u_id=user_id: show_user_form(users_tree.master.master, users_tree, u_id)
-            )
-            edit_button.pack(side="left", padx=(0, 5))
-            
-            # Delete button
-            delete_button = ctk.CTkButton(
-                button_frame, 
-                text="Delete",
-                width=50,
-                height=20,
-                fg_color="#FF5252",
-                hover_color="#D32F2F",
-                corner_radius=4,
-                font=ctk.CTkFont(size=10),
-                command=lambda u_id=user_id: confirm_delete_user(users_tree, u_id)
-            )
-            delete_button.pack(side="left")
+def populate_users_table(users_tree, search_term=None):
+    """Load the users table for a new search, or re-read it in place (after a change) if search_term is None"""
+    if search_term is None:
+        users_tree.table.refresh()
+    else:
+        users_tree.table.reload(search_term=search_term)
 
 def show_user_form(content_frame, users_tree, user_id=None):
     """Show form to add or edit a user"""
@@ -368,11 +202,16 @@ def show_user_form(content_frame, users_tree, user_id=None):
     # User data (empty for new, populated for edit)
     user_data = {}
     if user_id:
-        # Fetch user data for editing
-        users = get_users()
-        for user in users:
-            if str(user['user_id']) == str(user_id):
-                user_data = user
+        # The table row already holds everything the form needs
+        for item in users_tree.get_children():
+            values = users_tree.item(item, 'values')
+            if str(values[0]) == str(user_id):
+                user_data = {
+                    'first_name': values[1],
+                    'last_name': values[2],
+                    'email': values[3],
+                    'role': values[4]
+                }
                 break
     
     # Form frame
@@ -506,18 +345,22 @@ def show_user_form(content_frame, users_tree, user_id=None):
             error_label.configure(text="Password is required for new users")
             return
         
+        def on_saved(result):
+            success, message = result
+            if success:
+                dialog.destroy()
+                populate_users_table(users_tree)  # Refresh the table
+                messagebox.showinfo("Success", message)
+            else:
+                error_label.configure(text=message)
+        
         # Save/update the user
         if user_id:  # Update existing user
-            success, message = update_user(user_id, first_name, last_name, email, role, password if password else None)
+            run_in_background(dialog, update_user, user_id, first_name, last_name, email, role,
+                              password if password else None, on_success=on_saved)
         else:  # Add new user
-            success, message = create_user(first_name, last_name, email, password, role)
-        
-        if success:
-            dialog.destroy()
-            populate_users_table(users_tree)  # Refresh the table
-            messagebox.showinfo("Success", message)
-        else:
-            error_label.configure(text=message)
+            run_in_background(dialog, create_user, first_name, last_name, email, password, role,
+                              on_success=on_saved)
     
     save_button = ctk.CTkButton(
         button_frame,
@@ -535,11 +378,9 @@ def confirm_delete_user(users_tree, user_id):
     """Show confirmation dialog before deleting a user"""
     # Find user name
     user_name = ""
-    for item in users_tree.get_children():
-        values = users_tree.item(item, 'values')
-        if str(values[0]) == str(user_id):
-            user_name = f"{values[1]} {values[2]}"
-            break
+    if users_tree.exists(str(user_id)):
+        values = users_tree.item(str(user_id), 'values')
+        user_name = f"{values[1]} {values[2]}"
     
     result = messagebox.askyesno(
         "Confirm Delete", 
@@ -547,9 +388,14 @@ def confirm_delete_user(users_tree, user_id):
     )
     
     if result:
-        success, message = delete_user(user_id)
-        if success:
-            messagebox.showinfo("Success", message)
-            populate_users_table(users_tree)  # Refresh the table
-        else:
-            messagebox.showerror("Error", message)
\ No newline at end of file
+        run_in_background(users_tree, delete_user, user_id,
+                          on_success=lambda result: on_user_deleted(users_tree, result))
+
+def on_user_deleted(users_tree, result):
+    """Report a finished delete and refresh the table"""
+    success, message = result
+    if success:
+        messagebox.showinfo("Success", message)
+        populate_users_table(users_tree)  # Refresh the table
+    else:
+        messagebox.showerror("Error", message)
\ No newline at end of file
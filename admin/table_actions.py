@@ -0,0 +1,98 @@
+import tkinter as tk
+import customtkinter as ctk
+
+# ------------------- Selection Action Bar -------------------
+class SelectionActionBar:
+    """One set of row actions for a Treeview, applied to the selected row
+
+    Replaces per-row buttons placed over the tree: the bar and the right-click
+    menu are built once, so repopulating the table creates no widgets however
+    many rows it has. Actions are (text, color, hover_color, command, enabled)
+    where command(values) runs the action on the selected row's values and
+    enabled(values) (or None for always) says whether it applies to that row.
+    """
+    def __init__(self, parent, tree, actions, describe=None, default=None):
+        self.tree = tree
+        self.actions = actions
+        self.describe = describe or (lambda values: f"#{values[0]}")
+
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+
+        self.label = ctk.CTkLabel(
+            self.frame,
+            text="",
+            font=ctk.CTkFont(size=13),
+            text_color="#555555",
+            anchor="w"
+        )
+        self.label.pack(side="left")
+
+        font = ctk.CTkFont(size=12)
+        self.buttons = []
+        for index, (text, color, hover_color, command, enabled) in enumerate(actions):
+            button = ctk.CTkButton(
+                self.frame,
+                text=text,
+                width=80,
+                height=28,
+                fg_color=color,
+                hover_color=hover_color,
+                corner_radius=4,
+                font=font,
+                command=lambda index=index: self.run(index)
+            )
+            button.pack(side="left", padx=(10, 0))
+            self.buttons.append(button)
+
+        # The same actions on right-click
+        self.menu = tk.Menu(tree, tearoff=0)
+        for index, (text, *_) in enumerate(actions):
+            self.menu.add_command(label=text, command=lambda index=index: self.run(index))
+
+        tree.bind("<<TreeviewSelect>>", lambda event: self.refresh())
+        tree.bind("<Button-3>", self.show_menu)
+        if default is not None:
+            tree.bind("<Double-1>", lambda event: self.run(default))
+
+        # Table fill functions reach the bar through the tree
+        tree.action_bar = self
+        self.refresh()
+
+    def selected_values(self):
+        """Values of the selected row, or None (no selection, or a placeholder row)"""
+        selection = self.tree.selection()
+        if not selection or not self.tree.exists(selection[0]):
+            return None
+        values = self.tree.item(selection[0], "values")
+        return values if values and values[0] != "" else None
+
+    def is_enabled(self, index, values):
+        enabled = self.actions[index][4]
+        return values is not None and (enabled is None or enabled(values))
+
+    def refresh(self):
+        """Match the label and buttons to the current selection (call after repopulating)"""
+        values = self.selected_values()
+        self.label.configure(text=self.describe(values) if values else "Select a row to see its actions")
+        for index, button in enumerate(self.buttons):
+            button.configure(state="normal" if self.is_enabled(index, values) else "disabled")
+
+    def run(self, index):
+        values = self.selected_values()
+        if self.is_enabled(index, values):
+            self.actions[index][3](values)
+
+    def show_menu(self, event):
+        """Select the row under the pointer and offer its actions"""
+        row = self.tree.identify_row(event.y)
+        if not row:
+            return
+        self.tree.selection_set(row)
+        self.refresh()
+        values = self.selected_values()
+        for index in range(len(self.actions)):
+            self.menu.entryconfigure(index, state="normal" if self.is_enabled(index, values) else "disabled")
+        try:
+            self.menu.tk_popup(event.x_root, event.y_root)
+        finally:
+            self.menu.grab_release()
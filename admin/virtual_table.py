@@ -0,0 +1,307 @@
+from utils import show_error
+from background import run_in_background
+from config import ADMIN_PAGE_SIZE, ADMIN_MAX_PAGES, ADMIN_INSERT_CHUNK
+
+JUMP_DELAY_MS = 150  # Scrollbar drags settle this long before the page under the thumb is fetched
+LOADING_ROW = "loading"
+
+# ------------------- Virtual Table -------------------
+class VirtualTable:
+    """A Treeview over a server-side result that is never loaded whole
+
+    fetch(offset=, limit=, sort=, descending=, with_total=, **filters) returns
+    (rows, total) and runs on a worker thread. Only a window of at most max_pages
+    pages is in the tree: as the view nears either end of the window the next page
+    is fetched and inserted a chunk per idle callback, and the page furthest from
+    the view is dropped. The scrollbar spans the whole result, so dragging it far
+    away fetches the page under the thumb instead of everything before it. Heading
+    clicks re-sort on the server; row iids are row_key(row) so a row can be found
+    by its id.
+    """
+    def __init__(self, tree, scrollbar, fetch, row_values, row_key, row_tags=None,
+                 sort_keys=None, filters=None, group=None, page_size=ADMIN_PAGE_SIZE,
+                 max_pages=ADMIN_MAX_PAGES, chunk_size=ADMIN_INSERT_CHUNK):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch = fetch
+        self.row_values = row_values
+        self.row_key = row_key
+        self.row_tags = row_tags
+        self.sort_keys = sort_keys or {}  # column -> sort key understood by fetch
+        self.filters = filters or {}
+        self.group = group
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.chunk_size = chunk_size
+
+        self.sort = None
+        self.descending = False
+        self.total = 0
+        self.start = 0  # Result offset of the first row in the tree
+        self.end = 0  # Result offset just past the last row in the tree
+        self.count = 0  # Rows in the tree
+        self.generation = 0  # Bumped whenever the window is replaced - older loads are dropped
+        self.loading = False
+        self.pending_jump = None
+
+        self.headings = {column: tree.heading(column, "text") for column in tree["columns"]}
+        for column, key in self.sort_keys.items():
+            tree.heading(column, command=lambda key=key: self.sort_by(key))
+
+        tree.configure(yscrollcommand=self.on_tree_scrolled)
+        scrollbar.configure(command=self.on_scrollbar)
+
+        # Screen functions reach the model through the tree
+        tree.table = self
+
+    # ---- public ----
+    def reload(self, **filters):
+        """Start again from the first row, with new filters if any are given"""
+        if filters:
+            self.filters = filters
+        self._clear()
+        columns = len(self.tree["columns"])
+        self.tree.insert("", "end", iid=LOADING_ROW, values=("", "Loading...") + ("",) * (columns - 2))
+        self.jump(0)
+
+    def refresh(self):
+        """Re-read the rows around the view (after a write), keeping filters, sort and position"""
+        if not self.count:
+            self.reload()  # Nothing shown yet - show the loading row meanwhile
+            return
+        self.jump(self.visible_offset())
+
+    def apply_changes(self, rows, removed_keys=(), matches=None):
+        """Patch in rows written since the window was read, without re-reading it
+
+        Loaded rows are updated where they stand (they move to their sorted place on
+        the next refresh or sort); rows in removed_keys, or that no longer pass
+        matches(row), are dropped. Returns True if a matching row is not loaded: it
+        may be new, and only the server knows where it sorts, so refresh() the table.
+        """
+        if self.loading:
+            return True  # A read is landing - it may predate the changes
+        dropped = [str(key) for key in removed_keys]
+        unseen = False
+        for row in rows:
+            key = str(self.row_key(row))
+            if matches is not None and not matches(row):
+                dropped.append(key)
+            elif self.tree.exists(key):
+                self.tree.item(key, values=self.row_values(row),
+                               tags=self.row_tags(row) if self.row_tags else ())
+            else:
+                unseen = True
+
+        dropped = [key for key in dropped if self.tree.exists(key)]
+        if dropped:
+            self.tree.delete(*dropped)
+            self.count -= len(dropped)
+            self.end -= len(dropped)
+            self.total -= len(dropped)
+        self._selection_changed()
+        return unseen
+
+    def sort_by(self, key):
+        """Sort on a column's key, reversing the order on a second click"""
+        self.descending = not self.descending if key == self.sort else False
+        self.sort = key
+        for column, text in self.headings.items():
+            if self.sort_keys.get(column) == key:
+                text += " ▼" if self.descending else " ▲"
+            self.tree.heading(column, text=text)
+        self.reload()
+
+    def visible_offset(self):
+        """Result offset of the top row in view"""
+        return self.start + round(float(self.tree.yview()[0]) * (self.end - self.start))
+
+    def jump(self, offset):
+        """Replace the window with the page around offset and scroll it into view"""
+        if self.pending_jump is not None:
+            self.tree.after_cancel(self.pending_jump)
+            self.pending_jump = None
+        self.generation += 1
+        start = max(0, min(offset - self.page_size // 2, self.total - self.page_size))
+        self._load(start, self.page_size, True,
+                   lambda rows, total: self._replace(start, rows, total, offset))
+
+    # ---- scrolling ----
+    def on_tree_scrolled(self, first, last):
+        """yscrollcommand: map the view onto the whole result and prefetch near the edges"""
+        first, last = float(first), float(last)
+        span = self.end - self.start
+        if self.total and span:
+            self.scrollbar.set((self.start + first * span) / self.total,
+                               (self.start + last * span) / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+        # A tree in a hidden tab reports the whole window in view - don't walk it page by page
+        if self.loading or not self.count or not self.tree.winfo_viewable():
+            return
+        if (1 - last) * self.count < self.page_size / 2 and self.end < self.total:
+            self._load(self.end, self.page_size, False, self._append)
+        elif first * self.count < self.page_size / 2 and self.start > 0:
+            start = max(0, self.start - self.page_size)
+            self._load(start, self.start - start, False, lambda rows, total: self._prepend(start, rows))
+
+    def on_scrollbar(self, action, *args):
+        """Scrollbar command: scroll within the window, or fetch the page the thumb was dragged to"""
+        if action != "moveto":
+            self.tree.yview(action, *args)
+            return
+        if not self.total:
+            return
+
+        fraction = min(max(float(args[0]), 0.0), 1.0)
+        target = int(fraction * self.total)
+        if self.start <= target < self.end:
+            self.tree.yview_moveto((target - self.start) / (self.end - self.start))
+            return
+
+        # Far from what is loaded: follow the thumb now, fetch once the drag settles
+        first, last = self.scrollbar.get()
+        self.scrollbar.set(fraction, fraction + (last - first))
+        if self.pending_jump is not None:
+            self.tree.after_cancel(self.pending_jump)
+        self.pending_jump = self.tree.after(JUMP_DELAY_MS, self._settled_jump, target)
+
+    def _settled_jump(self, target):
+        self.pending_jump = None
+        if self.tree.winfo_exists():
+            self.jump(target)
+
+    # ---- loading ----
+    def _load(self, offset, limit, with_total, on_loaded):
+        generation = self.generation
+        self.loading = True
+
+        def loaded(result):
+            if generation == self.generation:
+                on_loaded(*result)
+
+        def failed(error):
+            if generation == self.generation:
+                self.loading = False
+            show_error("Database Error", str(error))
+
+        # One group per table: a newer load supersedes one still running
+        run_in_background(self.tree, self.fetch, on_success=loaded, on_error=failed, group=self.group,
+                          offset=offset, limit=limit, sort=self.sort, descending=self.descending,
+                          with_total=with_total, **self.filters)
+
+    def _replace(self, start, rows, total, offset):
+        self.total = total or 0
+        if not rows and start and self.total:
+            self.jump(self.total - 1)  # Rows were deleted from under the view
+            return
+        self._clear()
+        self.start = start
+        self.end = start + len(rows)
+
+        def done(inserted):
+            self.end = start + inserted
+            # Put the requested row at the top of the view
+            if self.count and offset > start:
+                self.tree.update_idletasks()
+                self.tree.yview_moveto((offset - start) / self.count)
+            self._loaded()
+        self._insert_rows(rows, False, done)
+
+    def _append(self, rows, total):
+        self.end += len(rows)
+        if len(rows) < self.page_size:
+            self.total = self.end  # Rows were deleted since the count was taken
+
+        def done(inserted):
+            # Rows that were already in the tree (they shifted between pages) don't widen the window
+            self.end -= len(rows) - inserted
+            if len(rows) < self.page_size:
+                self.total = self.end
+            self._trim(from_top=True)
+        self._insert_rows(rows, False, done)
+
+    def _prepend(self, start, rows):
+        self.start = start
+
+        def done(inserted):
+            self.start += len(rows) - inserted
+            self._trim(from_top=False)
+        self._insert_rows(rows, True, done)
+
+    def _insert_rows(self, rows, at_top, done):
+        """Insert rows a chunk per idle callback so the window keeps handling events,
+        then call done with the number inserted (rows already in the tree are skipped)"""
+        generation = self.generation
+        inserted = 0
+
+        def insert_chunk(position):
+            if generation != self.generation or not self.tree.winfo_exists():
+                return
+
+            def insert():
+                nonlocal inserted
+                for row in rows[position:position + self.chunk_size]:
+                    key = str(self.row_key(row))
+                    if self.tree.exists(key):
+                        continue  # Rows shifted between pages - it is already in the table
+                    self.tree.insert("", inserted if at_top else "end", iid=key,
+                                     values=self.row_values(row),
+                                     tags=self.row_tags(row) if self.row_tags else ())
+                    inserted += 1
+                    self.count += 1
+
+            if at_top:
+                self._keep_view(insert)
+            else:
+                insert()
+
+            if position + self.chunk_size < len(rows):
+                self.tree.after_idle(insert_chunk, position + self.chunk_size)
+            else:
+                done(inserted)
+        insert_chunk(0)
+
+    def _trim(self, from_top):
+        """Drop the rows furthest from the view once the window is over max_rows"""
+        excess = self.count - self.max_rows
+        if excess > 0:
+            children = self.tree.get_children()
+            if from_top:
+                self._keep_view(lambda: self.tree.delete(*children[:excess]))
+                self.start += excess
+            else:
+                self.tree.delete(*children[-excess:])
+                self.end -= excess
+            self.count -= excess
+            self._selection_changed()
+        self._loaded()
+
+    def _loaded(self):
+        self.loading = False
+        # The view may already be near the next edge (a short page, or a fast scroll)
+        self.tree.after_idle(lambda: self.tree.winfo_exists() and self.on_tree_scrolled(*self.tree.yview()))
+
+    # ---- tree helpers ----
+    def _keep_view(self, change):
+        """Run change() (rows added or removed above the view) without moving what is on screen"""
+        children = self.tree.get_children()
+        top = None
+        if children:
+            top = children[min(round(float(self.tree.yview()[0]) * len(children)), len(children) - 1)]
+        change()
+        if top is not None and self.tree.exists(top):
+            self.tree.update_idletasks()
+            self.tree.yview_moveto(self.tree.index(top) / max(len(self.tree.get_children()), 1))
+
+    def _clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self.count = 0
+        self.start = self.end = 0
+        self._selection_changed()
+
+    def _selection_changed(self):
+        action_bar = getattr(self.tree, "action_bar", None)
+        if action_bar is not None:
+            action_bar.refresh()
@@ -1,17 +1,15 @@
 import tkinter as tk
 import customtkinter as ctk
 from tkinter import messagebox
-from PIL import Image, ImageTk
 import os
 import re
-import mysql.connector
-
-from config import DB_CONFIG
-from utils import connect_db, hash_password, save_user_session, generate_secret, update_password
-def admin_window():
-    """Create and run the admin login window"""
-    # Initialize the window
-    root = ctk.CTk()
+
+from utils import save_user_session
+from repository import users
+from router import show_screen, load_image
+from background import submit_from_button
+def admin_window(root):
+    """Build the admin login screen in the application window"""
     root.title("Admin Login")
     root.geometry("800x600")
     root.resizable(False, False)
@@ -128,22 +126,7 @@ def admin_window():
             error_label.configure(text="Please enter both email and password.")
             return
 
-        # Hash the password
-        hashed_password = hash_password(password)
-
-        try:
-            connection = connect_db()
-            if not connection:
-                error_label.configure(text="Database connection failed.")
-                return
-                
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT user_id, first_name, last_name, email, role FROM Users WHERE email = %s AND password = %s AND role = 'admin'",
-                (email, hashed_password)
-            )
-            user = cursor.fetchone()
-
+        def on_authenticated(user):
             if user:
                 # Save user session
                 save_user_session(user)
@@ -151,19 +134,14 @@ def admin_window():
                 # Show success message
                 messagebox.showinfo("Success", f"Welcome Admin {user['first_name']} {user['last_name']}!")
                 
-                # Close the login window and open admin dashboard
-                root.destroy()
-                from admin.admin_dashboard import run_admin
-                run_admin()
+                # Open the admin dashboard
+                show_screen("admin")
             else:
                 error_label.configure(text="Invalid Admin Credentials.")
-        
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", str(err))
-        finally:
-            if connection and connection.is_connected():
-                cursor.close()
-                connection.close()
+
+        error_label.configure(text="")
+        submit_from_button(login_button, users.authenticate, email, password, role="admin",
+                           on_success=on_authenticated)
 
     # Login Button
     login_button = ctk.CTkButton(
@@ -182,11 +160,7 @@ def admin_window():
 
     # Back to Main Window Button
     def back_to_main():
-        root.destroy()
-        from main import LibraryManagementSystem
-        root = ctk.CTk()
-        LibraryManagementSystem(root)
-        root.mainloop()
+        show_screen("main")
 
     back_button = ctk.CTkButton(
         main_frame,
@@ -204,9 +178,6 @@ def admin_window():
 
     # Bind Enter key to login action
     password_entry.bind("<Return>", lambda event: admin_login_action())
-
-    # Start the application
-    root.mainloop()
 # ------------------- Password Validation -------------------
 def check_password_strength(password):
     """Check password strength and return feedback"""
@@ -272,14 +243,8 @@ def check_password_strength(password):
     }
 
 # ------------------- Password Reset Window -------------------
-def password_reset_window(parent=None):
-    """Create and run the password reset window"""
-    # If parent exists, destroy it
-    if parent:
-        parent.destroy()
-        
-    # Initialize the window
-    reset_window = ctk.CTk()
+def password_reset_window(reset_window):
+    """Build the password reset screen in the application window"""
     reset_window.title("Reset Password")
     reset_window.geometry("800x800")
     reset_window.resizable(False, False)
@@ -481,15 +446,17 @@ def password_reset_window(parent=None):
             error_label.configure(text="Please choose a stronger password")
             return
         
-        # Update the password
-        success, message = update_password(email, secret, new_password)
+        def on_reset(result):
+            success, message = result
+            if success:
+                messagebox.showinfo("Success", message)
+                show_screen("login")
+            else:
+                error_label.configure(text=message)
         
-        if success:
-            messagebox.showinfo("Success", message)
-            reset_window.destroy()
-            login_window()
-        else:
-            error_label.configure(text=message)
+        # Update the password
+        error_label.configure(text="")
+        submit_from_button(reset_button, users.reset_password, email, secret, new_password, on_success=on_reset)
     
     reset_button = ctk.CTkButton(
         main_frame,
@@ -507,8 +474,7 @@ def password_reset_window(parent=None):
     
     # Back to Login Button
     def back_to_login():
-        reset_window.destroy()
-        login_window()
+        show_screen("login")
     
     back_button = ctk.CTkButton(
         main_frame,
@@ -523,15 +489,10 @@ def password_reset_window(parent=None):
         command=back_to_login
     )
     back_button.pack(padx=40, pady=(0, 20))
-    
-    # Start the application
-    reset_window.mainloop()
 
 # ------------------- Login Window -------------------
-def login_window():
-    """Create and run the login window"""
-    # Initialize the window
-    root = ctk.CTk()
+def login_window(root):
+    """Build the login screen in the application window"""
     root.title("Library Management System")
     root.geometry("1000x600")
     root.resizable(False, False)
@@ -657,20 +618,7 @@ def login_window():
             error_label.configure(text="Please enter both email and password.")
             return
 
-        hashed_password = hash_password(password)
-
-        try:
-            connection = connect_db()
-            if not connection:
-                return
-                
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute(
-                "SELECT user_id, first_name, last_name, email, role FROM Users WHERE email = %s AND password = %s",
-                (email, hashed_password)
-            )
-            user = cursor.fetchone()
-
+        def on_authenticated(user):
             if user:
                 # Save user session
                 save_user_session(user)
@@ -678,23 +626,16 @@ def login_window():
                 # Show success message
                 messagebox.showinfo("Success", f"Welcome {user['first_name']} {user['last_name']}!")
                 
-                # Close the login window and open home page
-                root.destroy()
+                # Open the home page
                 if user['role'] == 'admin':
-                    from admin.admin_dashboard import run_admin
-                    run_admin()
+                    show_screen("admin")
                 else:
-                    from student.dashboard import run_dashboard
-                    run_dashboard()
+                    show_screen("dashboard")
             else:
                 error_label.configure(text="Invalid Email or Password.")
-        
-        except mysql.connector.Error as err:
-            messagebox.showerror("Database Error", str(err))
-        finally:
-            if connection and connection.is_connected():
-                cursor.close()
-                connection.close()
+
+        error_label.configure(text="")
+        submit_from_button(login_button, users.authenticate, email, password, on_success=on_authenticated)
 
     login_button = ctk.CTkButton(
         right_frame,
@@ -716,8 +657,7 @@ def login_window():
 
     # Forgot Password Link
     def forgot_password_action():
-        root.destroy()
-        password_reset_window()
+        show_screen("password_reset")
 
     forgot_link = ctk.CTkButton(
         links_frame,
@@ -737,14 +677,7 @@ def login_window():
 
     # Sign Up Link
     def signup_action():
-        print("Sign up button clicked")
-        try:
-            root.destroy()
-            print("Login window destroyed")
-            signup_window()
-            print("Signup window opened")
-        except Exception as e:
-            print(f"Error opening signup window: {e}")
+        show_screen("signup")
 
     signup_link = ctk.CTkButton(
         links_frame,
@@ -762,9 +695,7 @@ def login_window():
     try:
         # Load and resize the image
         image_path = "images/library.png"  # Path to your image
-        pil_image = Image.open(image_path)
-        pil_image = pil_image.resize((400, 400))
-        img = ImageTk.PhotoImage(pil_image)
+        img = load_image(image_path, (400, 400))
         
         # Create image label
         image_label = tk.Label(left_frame, image=img, bg="white")
@@ -784,15 +715,9 @@ def login_window():
     # Bind Enter key to login action
     password_entry.bind("<Return>", lambda event: login_action())
 
-    # Start the application
-    root.mainloop()
-
 # ------------------- Sign Up Window -------------------
-def signup_window():
-    """Create and run the signup window"""
-    # If a parent is needed, pass in the root window that called this function
-    # Initialize the window
-    root = ctk.CTk()
+def signup_window(root):
+    """Build the signup screen in the application window"""
     root.title("Library Management System - Sign Up")
     root.geometry("1200x1000")
     root.resizable(False, False)
@@ -1089,36 +1014,19 @@ def signup_window():
             error_label.configure(text="Please choose a stronger password.")
             return
 
-        # Hash the password
-        hashed_password = hash_password(password)
-
-        try:
-            connection = connect_db()
-            if not connection:
+        # Split full name into first and last name (best effort)
+        name_parts = full_name.split()
+        first_name = name_parts[0] if name_parts else ""
+        last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else ""
+
+        def on_created(result):
+            success, message = result
+            if not success:
+                if message == "A user with this email already exists":
+                    message = "Email already exists. Please use a different email."
+                error_label.configure(text=message)
                 return
-                
-            cursor = connection.cursor()
-
-            # Check if email already exists
-            cursor.execute("SELECT * FROM Users WHERE email = %s", (email,))
-            existing_user = cursor.fetchone()
-            if existing_user:
-                error_label.configure(text="Email already exists. Please use a different email.")
-                return
-
-            # Split full name into first and last name (best effort)
-            name_parts = full_name.split()
-            first_name = name_parts[0] if name_parts else ""
-            last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else ""
 
-            # Insert the user data into the database including the secret key
-            cursor.execute(
-                "INSERT INTO Users (first_name, last_name, email, password, secret, role) VALUES (%s, %s, %s, %s, %s, %s)",
-                (first_name, last_name, email, hashed_password, secret_key, "member")
-            )
-
-            connection.commit()
-            
             # Show account creation success message
             secret_message = (f"Your account has been created successfully!\n\n"
                              f"IMPORTANT: Your secret key has been saved.\n\n"
@@ -1126,15 +1034,12 @@ def signup_window():
             messagebox.showinfo("Account Created", secret_message)
             
             # After successful registration, redirect to login page
-            root.destroy()
-            login_window()
+            show_screen("login")
 
-        except mysql.connector.Error as err:
-            error_label.configure(text=f"Database Error: {str(err)}")
-        finally:
-            if 'connection' in locals() and connection.is_connected():
-                cursor.close()
-                connection.close()
+        # Create the member account, keeping the secret key they chose
+        error_label.configure(text="")
+        submit_from_button(signup_button, users.create, first_name, last_name, email, password, "member",
+                           secret=secret_key, on_success=on_created)
 
     # Sign Up Button
     signup_button = ctk.CTkButton(
@@ -1153,8 +1058,7 @@ def signup_window():
 
     # Back to Login Link
     def back_to_login():
-        root.destroy()
-        login_window()
+        show_screen("login")
 
     back_link = ctk.CTkButton(
         right_frame,
@@ -1172,9 +1076,7 @@ def signup_window():
     try:
         # Load and resize the image
         image_path = "images/library.png"  # Path to your image
-        pil_image = Image.open(image_path)
-        pil_image = pil_image.resize((400, 400))
-        img = ImageTk.PhotoImage(pil_image)
+        img = load_image(image_path, (400, 400))
         
         # Create image label
         image_label = tk.Label(left_frame, image=img, bg="white")
@@ -1190,6 +1092,3 @@ def signup_window():
             text_color="#15883e"
         )
         placeholder.pack(expand=True)
-
-    # Start the application
-    root.mainloop()
\ No newline at end of file
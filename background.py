@@ -0,0 +1,210 @@
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from config import BACKGROUND_WORKERS, BACKGROUND_POLL_MS
+import utils
+
+# ------------------- Background Executor -------------------
+# Data-layer calls run on these threads; results are handed back to Tk through root.after
+_executor = None
+_executor_lock = threading.Lock()
+
+# The dispatcher of the task a worker thread is currently running
+_current = threading.local()
+
+def get_executor():
+    """Return the process-wide worker pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="db-worker")
+    return _executor
+
+def _report_worker_error(title, message):
+    """utils.show_error hook: queue the dialog for the Tk thread that started the task"""
+    dispatcher = getattr(_current, "dispatcher", None)
+    if dispatcher is None:
+        print(f"{title}: {message}")
+        return
+    dispatcher.post(lambda: utils.show_error(title, message))
+
+utils.set_error_reporter(_report_worker_error)
+
+# ------------------- Background Task -------------------
+class BackgroundTask:
+    """Handle for one submitted call - cancel() drops its result"""
+    def __init__(self, owner, group, generation, on_success, on_error):
+        self.owner = owner
+        self.group = group
+        self.generation = generation
+        self.on_success = on_success
+        self.on_error = on_error
+        self.cancelled = False
+        self.future = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+# ------------------- Dispatcher -------------------
+class Dispatcher:
+    """Per-window queue of finished calls, drained on the Tk thread"""
+    def __init__(self, root):
+        self.root = root
+        self._queue = queue.Queue()
+        self._generations = {}
+        self._pending = 0
+        self._polling = False
+        self._closed = False
+
+    def submit(self, func, *args, on_success=None, on_error=None, owner=None, group=None, **kwargs):
+        """Run func(*args, **kwargs) on a worker thread and call on_success(result) on the Tk thread
+
+        The result is dropped if owner (a widget) has been destroyed by then, or if
+        the group was cancelled or reused by a newer submit in the meantime.
+        """
+        generation = None
+        if group is not None:
+            # A newer call in the same group supersedes the older one
+            generation = self._generations.get(group, 0) + 1
+            self._generations[group] = generation
+
+        task = BackgroundTask(owner, group, generation, on_success, on_error)
+
+        def work():
+            _current.dispatcher = self
+            try:
+                if task.cancelled:
+                    # Picked up before cancel() could stop it - still release the slot it holds
+                    self.post(self._task_dropped)
+                    return
+                try:
+                    result = func(*args, **kwargs)
+                except Exception as err:
+                    traceback.print_exc()
+                    self.post(lambda err=err: self._finish(task, error=err))
+                else:
+                    self.post(lambda: self._finish(task, result=result))
+            finally:
+                _current.dispatcher = None
+
+        self._pending += 1
+        task.future = get_executor().submit(work)
+        task.future.add_done_callback(self._on_future_done)
+        self._start_polling()
+        return task
+
+    def cancel_group(self, group):
+        """Drop the results of every call still running in group"""
+        self._generations[group] = self._generations.get(group, 0) + 1
+
+    def post(self, callback):
+        """Queue a callback to run on the Tk thread (safe from any thread)"""
+        self._queue.put(callback)
+
+    def close(self):
+        """Stop delivering results - used when the window goes away"""
+        self._closed = True
+
+    def _is_current(self, task):
+        if task.cancelled or self._closed:
+            return False
+        if task.group is not None and self._generations.get(task.group) != task.generation:
+            return False
+        if task.owner is not None:
+            try:
+                if not task.owner.winfo_exists():
+                    return False
+            except Exception:
+                return False
+        return True
+
+    def _finish(self, task, result=None, error=None):
+        self._pending -= 1
+        if not self._is_current(task):
+            return
+
+        if error is None:
+            if task.on_success:
+                task.on_success(result)
+        elif task.on_error:
+            task.on_error(error)
+        else:
+            utils.show_error("Error", str(error))
+
+    def _on_future_done(self, future):
+        # A call cancelled before it started never posts _finish, so release its slot here
+        if future.cancelled():
+            self.post(self._task_dropped)
+
+    def _task_dropped(self):
+        self._pending -= 1
+
+    def _start_polling(self):
+        if self._polling or self._closed:
+            return
+        self._polling = True
+        self._schedule_poll()
+
+    def _schedule_poll(self):
+        try:
+            self.root.after(BACKGROUND_POLL_MS, self._poll)
+        except Exception:
+            # The window was destroyed - nothing left to deliver to
+            self._polling = False
+            self._closed = True
+
+    def _poll(self):
+        while True:
+            try:
+                callback = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback()
+            except Exception:
+                traceback.print_exc()
+
+        if (self._pending > 0 or not self._queue.empty()) and not self._closed:
+            self._schedule_poll()
+        else:
+            self._polling = False
+
+def get_dispatcher(root):
+    """Return the dispatcher for a Tk root window, creating it on first use"""
+    dispatcher = getattr(root, "_background_dispatcher", None)
+    if dispatcher is None:
+        dispatcher = Dispatcher(root)
+        root._background_dispatcher = dispatcher
+    return dispatcher
+
+def run_in_background(widget, func, *args, on_success=None, on_error=None, group=None, **kwargs):
+    """Run a data-layer call off the Tk thread; on_success only fires while widget still exists"""
+    dispatcher = get_dispatcher(widget.winfo_toplevel())
+    return dispatcher.submit(func, *args, on_success=on_success, on_error=on_error,
+                             owner=widget, group=group, **kwargs)
+
+def submit_from_button(button, func, *args, on_success=None, **kwargs):
+    """run_in_background for a form's submit button, which stays disabled until the call answers
+
+    A click or Enter while the button is disabled is ignored, so a slow database
+    never gets the same form twice.
+    """
+    if str(button.cget("state")) == "disabled":
+        return None
+    button.configure(state="disabled")
+
+    def finished(result):
+        button.configure(state="normal")
+        if on_success:
+            on_success(result)
+
+    def failed(error):
+        button.configure(state="normal")
+        utils.show_error("Database Error", str(error))
+
+    return run_in_background(button, func, *args, on_success=finished, on_error=failed, **kwargs)
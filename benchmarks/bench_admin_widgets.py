@@ -0,0 +1,161 @@
+"""Check that refreshing and scrolling the admin tables creates no widgets
+
+Seeds a throwaway in-memory SQLite database with --rows books, users and fines,
+opens the books, users and fines management screens in a real Tk window and
+refreshes every table 100 times (what a search, save or pay/cancel does). It
+reports widgets created per refresh, live widgets and Tk fonts before and after,
+and the time until a refresh has landed. Then it scrolls each table to the end of
+its rows and reports the most rows any table held at once. Row actions live in one
+selection-driven action bar per table and rows are fetched a page at a time, so
+every count must stay flat and the row count bounded; the script exits non-zero
+otherwise. Needs a display (use xvfb-run on a headless machine).
+
+    python benchmarks/bench_admin_widgets.py [--refreshes 100] [--rows 20000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tkinter
+import tkinter.font
+from tkinter import ttk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_support import use_memory_database, count_widgets, count_live
+
+use_memory_database()
+
+import customtkinter as ctk
+
+from config import ADMIN_PAGE_SIZE, ADMIN_MAX_PAGES
+from utils import get_pool
+from migrations import migrate
+from admin.admin_books import show_books_management
+from admin.admin_users import show_users_management
+from admin.admin_fines import show_fines_management
+
+# ------------------- Widget Counting -------------------
+widgets = count_widgets()
+
+def find_trees(widget):
+    """Every Treeview under widget, in creation order"""
+    trees = []
+    for child in widget.winfo_children():
+        if isinstance(child, ttk.Treeview):
+            trees.append(child)
+        trees.extend(find_trees(child))
+    return trees
+
+# ------------------- Setup -------------------
+def seed(count):
+    """count books, users, loans and fines (every other fine paid)"""
+    connection = get_pool().get_connection()
+    cursor = connection.cursor()
+    cursor.executemany(
+        "INSERT INTO Books (title, author, genre, isbn, publication_year, total_copies, available_copies) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        [(f"Book {i}", f"Author {i % 500}", "Fiction", f"979{i:010d}", 1950 + i % 70, 2, i % 3)
+         for i in range(count)])
+    cursor.executemany(
+        "INSERT INTO Users (first_name, last_name, email, password, secret) VALUES (%s, %s, %s, %s, %s)",
+        [(f"First{i}", f"Last{i}", f"user{i}@example.com", "x", "x") for i in range(count)])
+    cursor.executemany(
+        "INSERT INTO Loans (user_id, book_id, due_date, return_date) VALUES (%s, %s, %s, %s)",
+        [(i + 2, i + 1, "2024-01-15", "2024-01-20") for i in range(count)])  # user 1 is the default admin
+    cursor.executemany(
+        "INSERT INTO Fines (loan_id, amount, description, paid, payment_date) VALUES (%s, %s, %s, %s, %s)",
+        [(i + 1, 2.5, "Late return", i % 2, "2024-02-01" if i % 2 else None) for i in range(count)])
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+def settle(root, trees):
+    """Pump events until every table has landed its rows"""
+    while any(tree.table.loading for tree in trees):
+        root.update()
+        time.sleep(0.001)
+    root.update()
+
+# ------------------- Measurements -------------------
+def measure(root, content_frame, show_screen, refreshes):
+    """(widgets created per refresh, live widgets before/after, fonts before/after, p50 ms, most rows held)"""
+    show_screen(content_frame)
+    trees = find_trees(content_frame)
+    for tree in trees:
+        tree.table.refresh()  # Tabs the screen has not loaded yet
+    settle(root, trees)
+
+    # Select a row so the action bar is live, as it is when an admin works the table
+    for tree in trees:
+        rows_in_tree = tree.get_children()
+        if rows_in_tree:
+            tree.selection_set(rows_in_tree[0])
+    root.update()
+
+    live_before = count_live(root)
+    fonts_before = len(tkinter.font.names(root))
+    widgets.created = 0
+    samples = []
+    for _ in range(refreshes):
+        start = time.perf_counter()
+        for tree in trees:
+            tree.table.refresh()
+        settle(root, trees)
+        samples.append((time.perf_counter() - start) * 1000)
+    per_refresh = widgets.created / refreshes
+
+    # Scroll each table on screen (hidden tabs only load when shown) to the end, a page at a time
+    most_rows = 0
+    for tree in trees:
+        if not tree.winfo_viewable():
+            continue
+        table = tree.table
+        while table.end < table.total:
+            tree.yview_moveto(1.0)
+            root.update()
+            settle(root, trees)
+            most_rows = max(most_rows, len(tree.get_children()))
+
+    return (per_refresh, live_before, count_live(root),
+            fonts_before, len(tkinter.font.names(root)), statistics.median(samples), most_rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--refreshes", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    if not migrate():
+        sys.exit("Could not create the schema")
+    seed(args.rows)
+
+    root = ctk.CTk()
+    root.geometry("1300x800")
+    content_frame = ctk.CTkFrame(root, fg_color="transparent")
+    content_frame.pack(fill="both", expand=True)
+
+    screens = [("books", show_books_management), ("users", show_users_management),
+               ("fines", show_fines_management)]
+    results = [(name, measure(root, content_frame, show_screen, args.refreshes))
+               for name, show_screen in screens]
+    root.destroy()
+
+    limit = ADMIN_PAGE_SIZE * ADMIN_MAX_PAGES
+    print(f"{'table':<8}{'created/refresh':>17}{'live before':>13}{'live after':>12}"
+          f"{'fonts before':>14}{'fonts after':>13}{'p50':>11}{'most rows':>11}")
+    failed = False
+    for name, (per_refresh, live_before, live_after, fonts_before, fonts_after, p50, most_rows) in results:
+        print(f"{name:<8}{per_refresh:>17.1f}{live_before:>13}{live_after:>12}"
+              f"{fonts_before:>14}{fonts_after:>13}{p50:>9.2f}ms{most_rows:>11}")
+        failed = (failed or per_refresh or live_after != live_before or fonts_after != fonts_before
+                  or most_rows > limit)
+
+    if failed:
+        sys.exit(f"Widgets or fonts grew across refreshes, or a table held more than {limit} rows")
+    print(f"No widgets or fonts created across {args.refreshes} refreshes; at most {limit} rows held")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark browse page flips: rebuilding every book card vs recycling a fixed pool
+
+Flips through pages of synthetic books in a real Tk window and times each flip
+up to the point Tk has laid it out, counting the Tk widgets created per flip.
+"rebuild" destroys the grid and builds fresh cards for every page (what
+display_books used to do); "recycle" is BrowseBooksApp.display_books itself.
+No database is needed. Needs a display (use xvfb-run on a headless machine).
+
+    python benchmarks/bench_book_cards.py [--flips 200] [--per-page 6]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "student"))
+
+import customtkinter as ctk
+
+from browse import BrowseBooksApp, BookCard
+from bench_support import count_widgets, require_display
+
+widgets = count_widgets()
+
+# ------------------- Setup -------------------
+def make_pages(count, per_page):
+    pages = []
+    for page in range(count):
+        pages.append([
+            {
+                "book_id": page * per_page + i,
+                "title": f"Book {page * per_page + i}",
+                "author": f"Author {i}",
+                "genre": "Fiction",
+                "publication_year": 1950 + i,
+                "available_copies": (page + i) % 3,
+                "total_copies": 2,
+            }
+            for i in range(per_page)
+        ])
+    return pages
+
+def make_fonts():
+    return {
+        "title": ctk.CTkFont(size=16, weight="bold"),
+        "body": ctk.CTkFont(size=14),
+        "bold": ctk.CTkFont(size=14, weight="bold"),
+        "small": ctk.CTkFont(size=12),
+    }
+
+def make_screen(root):
+    """The attributes display_books uses, without a session or database"""
+    books_frame = ctk.CTkFrame(root, fg_color="transparent")
+    books_frame.pack(fill="both", expand=True)
+    return SimpleNamespace(
+        books_frame=books_frame,
+        card_fonts=make_fonts(),
+        book_cards=[],
+        loading_label=ctk.CTkLabel(books_frame, text="Loading books..."),
+        current_books=[],
+        borrowed_book_ids={1, 8},
+        borrow_book_action=lambda book_id: None,
+        show_book_details=lambda book: None,
+    )
+
+# ------------------- Display Paths -------------------
+def rebuild(screen):
+    """Destroy the grid and build every card (and its fonts) from scratch"""
+    for widget in screen.books_frame.winfo_children():
+        widget.destroy()
+    for i, book in enumerate(screen.current_books):
+        card = BookCard(screen.books_frame, make_fonts(), screen.borrow_book_action, screen.show_book_details)
+        card.show(book, book["book_id"] in screen.borrowed_book_ids, i // 3, i % 3)
+
+def recycle(screen):
+    BrowseBooksApp.display_books(screen)
+
+# ------------------- Timing -------------------
+def time_flips(root, display, pages):
+    screen = make_screen(root)
+    screen.current_books = pages[0]
+    display(screen)  # First page builds the cards either way
+    root.update()
+
+    samples = []
+    created = []
+    for page in pages[1:]:
+        widgets.created = 0
+        start = time.perf_counter()
+        screen.current_books = page
+        display(screen)
+        root.update_idletasks()
+        samples.append((time.perf_counter() - start) * 1000)
+        created.append(widgets.created)
+
+    screen.books_frame.destroy()
+    root.update()
+    cuts = statistics.quantiles(samples, n=100)
+    return cuts[49], cuts[94], statistics.mean(created)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flips", type=int, default=200)
+    parser.add_argument("--per-page", type=int, default=6)
+    args = parser.parse_args()
+
+    require_display()
+    root = ctk.CTk()
+    root.geometry("1300x700")
+    pages = make_pages(args.flips + 1, args.per_page)
+
+    results = [
+        ("rebuild (before)", time_flips(root, rebuild, pages)),
+        ("recycle (after)", time_flips(root, recycle, pages)),
+    ]
+    root.destroy()
+
+    print(f"{'path':<20}{'p50':>12}{'p95':>12}{'widgets/flip':>15}")
+    for name, (p50, p95, per_flip) in results:
+        print(f"{name:<20}{p50:>10.2f}ms{p95:>10.2f}ms{per_flip:>15.1f}")
+
+if __name__ == "__main__":
+    main()
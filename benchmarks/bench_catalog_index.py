@@ -0,0 +1,157 @@
+"""Benchmark catalog searches through the in-memory index against the SQL LIKE path
+
+Builds a throwaway in-memory SQLite catalog (no MySQL server needed), loads the
+catalog index from it and times the same searches both ways: the index alone,
+a full browse page through the index (ids + one primary-key read) and the SQL
+LIKE search the SQLite backend falls back to. Also times "did you mean"
+suggestions for misspelled words and incremental updates.
+
+    python benchmarks/bench_catalog_index.py [--books 1000000] [--runs 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_support import use_memory_database
+
+use_memory_database()
+
+from utils import get_pool
+from migrations import migrate
+from repository import books
+from catalog_index import get_catalog_index
+
+BATCH_SIZE = 10000
+PAGE_SIZE = 6
+
+# ------------------- Setup -------------------
+SYLLABLES = ["ka", "lo", "mi", "ra", "ven", "tor", "sel", "da", "qu", "is", "an", "ber", "fo", "gal", "hin", "jus"]
+
+def make_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def seed(count, rng):
+    """Fill Books with titles drawn Zipf-style from a synthetic vocabulary, so some words are common"""
+    vocabulary = make_vocabulary(20000, rng)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    surnames = make_vocabulary(2000, rng)
+    genres = [f"Genre{i}" for i in range(20)]
+
+    rows = []
+    for i in range(count):
+        title = " ".join(rng.choices(vocabulary, weights, k=rng.randint(2, 5))).title()
+        author = f"{rng.choice(surnames).title()} {rng.choice(surnames).title()}"
+        rows.append((title, author, rng.choice(genres), f"978{i:010d}", 3, 3))
+
+    connection = get_pool().get_connection()
+    cursor = connection.cursor()
+    for start in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany(
+            "INSERT INTO Books (title, author, genre, isbn, total_copies, available_copies) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            rows[start:start + BATCH_SIZE])
+    connection.commit()
+    cursor.close()
+    connection.close()
+    return vocabulary, surnames
+
+def make_queries(vocabulary, surnames, runs, rng):
+    """A mix of common, rare, two-word, prefix and author searches"""
+    queries = []
+    for i in range(runs):
+        kind = i % 5
+        if kind == 0:
+            queries.append(rng.choice(vocabulary[:50]))  # Highest-weighted words in seed()
+        elif kind == 1:
+            queries.append(rng.choice(vocabulary))
+        elif kind == 2:
+            queries.append(f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}")
+        elif kind == 3:
+            queries.append(rng.choice(vocabulary)[:4])
+        else:
+            queries.append(rng.choice(surnames))
+    return queries
+
+def misspell(word, rng):
+    """word with two neighbouring letters swapped, the typo students make most"""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+# ------------------- Timing -------------------
+def percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100)
+    return cuts[49], cuts[94]
+
+def time_calls(function, queries):
+    function(queries[0])
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        function(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--books", type=int, default=1000000)
+    parser.add_argument("--runs", type=int, default=200, help="searches per path")
+    parser.add_argument("--sql-runs", type=int, default=50, help="searches for the (slow) LIKE path")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    if not migrate():
+        sys.exit(1)
+    print(f"Seeding {args.books:,} books...")
+    start = time.perf_counter()
+    vocabulary, surnames = seed(args.books, rng)
+    print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    index = get_catalog_index()
+    print(f"Index built in {time.perf_counter() - start:.1f}s")
+
+    queries = make_queries(vocabulary, surnames, args.runs, rng)
+    matches = [index.search(query, limit=PAGE_SIZE)[1] for query in queries]
+    typos = [misspell(rng.choice(vocabulary), rng) for _ in range(args.runs)]
+    print(f"Matches per query: median {statistics.median(matches):,.0f}, max {max(matches):,}")
+
+    results = [
+        ("index search (ids + total)", time_calls(lambda q: index.search(q, limit=PAGE_SIZE), queries)),
+        ("index page (ids + rows)", time_calls(
+            lambda q: index.search_page(q, limit=PAGE_SIZE, with_total=True), queries)),
+        ("SQL LIKE page + COUNT", time_calls(
+            lambda q: books.search(q, limit=PAGE_SIZE, with_total=True), queries[:args.sql_runs])),
+        ("index did-you-mean", time_calls(index.suggest, typos)),
+    ]
+
+    # Incremental maintenance, as driven by admin add/update/delete
+    book_ids = [rng.randint(1, args.books) for _ in range(args.runs)]
+    new_ids = iter(range(args.books + 1, args.books + 1 + len(book_ids) + 1))
+    results.append(("index add", time_calls(
+        lambda _: index.add(next(new_ids), "Benchmark Added Title", "Bench Author", "Genre0", "9999999999999"),
+        book_ids)))
+    results.append(("index update", time_calls(
+        lambda book_id: index.add(book_id, "Benchmark Updated Title", "Bench Author", "Genre1", f"u{book_id}"),
+        book_ids)))
+    results.append(("index delete", time_calls(index.remove, book_ids)))
+
+    print()
+    print(f"{'path':<30}{'p50':>12}{'p95':>12}")
+    for name, (p50, p95) in results:
+        print(f"{name:<30}{p50:>10.3f}ms{p95:>10.3f}ms")
+
+if __name__ == "__main__":
+    main()
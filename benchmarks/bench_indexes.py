@@ -0,0 +1,188 @@
+"""Benchmark the per-user loan/fine queries before and after the Loans/Fines indexes
+
+Builds a scratch database (library_bench by default - never the real one), seeds it
+with 1M loans, times each screen function on the schema as it was before the
+Loans/Fines indexes, applies the migration that adds them and times them again.
+
+    python benchmarks/bench_indexes.py [--loans 1000000] [--runs 200] [--keep]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "student"))
+
+import config
+
+BENCH_DB_NAME = "library_bench"
+
+# Server credentials without a default database, for CREATE/DROP DATABASE
+SERVER_CONFIG = {key: value for key, value in config.DB_CONFIG.items() if key != "database"}
+
+# Point every module at the scratch database before they import the config values
+config.DB_BACKEND = "mysql"  # InnoDB index behaviour is what this measures
+config.DB_NAME = BENCH_DB_NAME
+config.DB_CONFIG["database"] = BENCH_DB_NAME
+
+import mysql.connector
+
+from utils import get_pool
+from migrations import migrate
+from dashboard import get_user_summary
+from borrowed import get_active_loans
+from browse import get_borrowed_book_ids
+from fines import get_pending_fines
+
+BATCH_SIZE = 10000
+
+# ------------------- Setup -------------------
+# Last schema version without the Loans/Fines indexes, and the one that adds them
+BASELINE_VERSION = 2
+INDEXED_VERSION = 3
+
+def create_scratch_database():
+    """Drop and recreate the scratch database at the baseline schema version"""
+    connection = mysql.connector.connect(**SERVER_CONFIG)
+    cursor = connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DB_NAME}")
+    cursor.close()
+    connection.close()
+    return migrate(target=BASELINE_VERSION)
+
+def insert_batches(cursor, query, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        cursor.executemany(query, rows[start:start + BATCH_SIZE])
+
+def seed(loans, users, books, rng):
+    """Fill the scratch database - roughly 5% of loans are open and 10% of returned ones have a fine"""
+    connection = get_pool().get_connection()
+    cursor = connection.cursor()
+
+    insert_batches(cursor,
+        "INSERT INTO Users (first_name, last_name, email, password, secret) VALUES (%s, %s, %s, %s, %s)",
+        [(f"First{i}", f"Last{i}", f"user{i}@bench.local", "x", "bench") for i in range(users)])
+    insert_batches(cursor,
+        "INSERT INTO Books (title, author, genre, isbn, total_copies, available_copies) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        [(f"Book {i}", f"Author {i % 2000}", f"Genre {i % 20}", f"BENCH{i:012d}", 10, 10)
+         for i in range(books)])
+    connection.commit()
+
+    today = date.today()
+    loan_rows = []
+    for _ in range(loans):
+        loan_date = today - timedelta(days=rng.randint(0, 3650))
+        due_date = loan_date + timedelta(days=config.LOAN_PERIOD_DAYS)
+        return_date = None if rng.random() < 0.05 else loan_date + timedelta(days=rng.randint(1, 30))
+        loan_rows.append((rng.randint(1, users), rng.randint(1, books), loan_date, due_date, return_date))
+    insert_batches(cursor,
+        "INSERT INTO Loans (user_id, book_id, loan_date, due_date, return_date) VALUES (%s, %s, %s, %s, %s)",
+        loan_rows)
+    connection.commit()
+
+    fine_rows = []
+    for loan_id, (_, _, _, _, return_date) in enumerate(loan_rows, start=1):
+        if return_date is not None and rng.random() < 0.10:
+            paid = rng.random() < 0.7
+            fine_rows.append((loan_id, round(rng.uniform(0.5, 20), 2), "Late return fine", paid,
+                              return_date if paid else None))
+    insert_batches(cursor,
+        "INSERT INTO Fines (loan_id, amount, description, paid, payment_date) VALUES (%s, %s, %s, %s, %s)",
+        fine_rows)
+    connection.commit()
+
+    cursor.execute("ANALYZE TABLE Loans, Fines")
+    cursor.fetchall()
+    cursor.close()
+    connection.close()
+
+def upgrade_schema():
+    """Apply only the Loans/Fines index migration, so later migrations don't skew the timings"""
+    migrate(target=INDEXED_VERSION)
+    connection = get_pool().get_connection()
+    cursor = connection.cursor()
+    cursor.execute("ANALYZE TABLE Loans, Fines")
+    cursor.fetchall()
+    cursor.close()
+    connection.close()
+
+# ------------------- Timing -------------------
+FUNCTIONS = [
+    ("get_user_summary", get_user_summary),
+    ("get_active_loans", get_active_loans),
+    ("get_borrowed_book_ids", get_borrowed_book_ids),
+    ("get_pending_fines", get_pending_fines),
+]
+
+def percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100)
+    return cuts[49], cuts[94]
+
+def time_functions(user_ids):
+    """Call every function for each sampled user and return {name: (p50_ms, p95_ms)}"""
+    results = {}
+    for name, function in FUNCTIONS:
+        function(user_ids[0])  # warm the pool and the buffer pool
+        samples = []
+        for user_id in user_ids:
+            start = time.perf_counter()
+            function(user_id)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = percentiles(samples)
+    return results
+
+def drop_scratch_database():
+    get_pool().close_all()
+    connection = mysql.connector.connect(**SERVER_CONFIG)
+    cursor = connection.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS {BENCH_DB_NAME}")
+    cursor.close()
+    connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loans", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--books", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=200, help="users sampled per function")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help=f"keep the {BENCH_DB_NAME} database afterwards")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    print(f"Seeding {BENCH_DB_NAME}: {args.loans:,} loans, {args.users:,} users, {args.books:,} books...")
+    if not create_scratch_database():
+        sys.exit(1)
+    seed(args.loans, args.users, args.books, rng)
+
+    user_ids = [rng.randint(1, args.users) for _ in range(args.runs)]
+
+    print("Timing baseline schema...")
+    before = time_functions(user_ids)
+
+    print("Applying migrations...")
+    start = time.perf_counter()
+    upgrade_schema()
+    print(f"Indexes built in {time.perf_counter() - start:.1f}s")
+
+    print("Timing indexed schema...")
+    after = time_functions(user_ids)
+
+    print()
+    print(f"{'function':<24}{'p50 before':>12}{'p95 before':>12}{'p50 after':>12}{'p95 after':>12}")
+    for name, _ in FUNCTIONS:
+        (p50_before, p95_before), (p50_after, p95_after) = before[name], after[name]
+        print(f"{name:<24}{p50_before:>10.2f}ms{p95_before:>10.2f}ms{p50_after:>10.2f}ms{p95_after:>10.2f}ms")
+
+    if not args.keep:
+        drop_scratch_database()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark navigating between screens: a new window per screen vs the single-window router
+
+Seeds a throwaway in-memory SQLite database with a member account, signs it in
+and walks the student screens (dashboard, browse, borrowed, fines, profile)
+--rounds times, timing each navigation up to the point Tk has laid the new
+screen out. "relaunch" destroys the window and builds a fresh ctk.CTk() for every
+screen, reading the session file each time (what every page did before);
+"router" is router.show, which swaps the screen inside one window. Logout is
+timed the same way: "relaunch" closes the window and starts a new interpreter
+that imports auth.py (what os.system("python auth.py") did); "router" shows the
+login screen. Needs a display (use xvfb-run on a headless machine).
+
+    python benchmarks/bench_navigation.py [--rounds 20]
+"""
+import argparse
+import importlib
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+from bench_support import use_memory_database, require_display
+
+use_memory_database()
+config.USER_SESSION_FILE = os.path.join(tempfile.mkdtemp(), "user_session.json")  # Never the real session
+
+import customtkinter as ctk
+
+import utils
+from migrations import migrate
+from repository import users
+from router import SCREENS, get_router
+
+STUDENT_SCREENS = ["dashboard", "browse", "borrowed", "fines", "profile"]
+SETTLE_MS = 100  # Let each screen's background loads land (untimed) before moving on
+
+# ------------------- Setup -------------------
+def create_member():
+    """A member account, as the login screen gets it back from users.authenticate"""
+    users.create("Bench", "Reader", "bench@example.com", "Bench#Pass123", "member", secret="bench")
+    return users.authenticate("bench@example.com", "Bench#Pass123")
+
+def settle(root):
+    """Pump events for SETTLE_MS"""
+    end = time.perf_counter() + SETTLE_MS / 1000
+    while time.perf_counter() < end:
+        root.update()
+        time.sleep(0.005)
+
+def build(name, root):
+    module_name, attribute = SCREENS[name]
+    return getattr(importlib.import_module(module_name), attribute)(root)
+
+# ------------------- Navigation Paths -------------------
+class Relaunch:
+    """Destroy the window and build the next screen in a new one"""
+    def __init__(self):
+        self.root = None
+
+    def show(self, name):
+        if self.root is not None:
+            self.root.destroy()
+        utils._user_session = None  # Each screen read the session file
+        self.root = ctk.CTk()
+        build(name, self.root)
+        self.root.update_idletasks()
+
+    def logout(self):
+        utils.clear_user_session()
+        self.root.destroy()
+        self.root = None
+        subprocess.run([sys.executable, "-c", "import auth"], cwd=ROOT, check=False,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def close(self):
+        if self.root is not None:
+            self.root.destroy()
+
+class Routed:
+    """Swap the screen inside the router's window"""
+    def __init__(self):
+        self.router = get_router()
+        self.root = self.router.get_root()
+
+    def show(self, name):
+        self.router.show(name)
+        self.root.update_idletasks()
+
+    def logout(self):
+        utils.clear_user_session()
+        self.router.show("login")
+        self.root.update_idletasks()
+
+    def close(self):
+        self.root.destroy()
+
+# ------------------- Timing -------------------
+def time_path(path, rounds):
+    """(navigation samples ms, logout ms)"""
+    for name in STUDENT_SCREENS:  # Warm imports so neither path pays them in the samples
+        path.show(name)
+        settle(path.root)
+
+    samples = []
+    for _ in range(rounds):
+        for name in STUDENT_SCREENS:
+            start = time.perf_counter()
+            path.show(name)
+            samples.append((time.perf_counter() - start) * 1000)
+            settle(path.root)
+
+    start = time.perf_counter()
+    path.logout()
+    logout_ms = (time.perf_counter() - start) * 1000
+    path.close()
+    return samples, logout_ms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    require_display()
+    if not migrate():
+        sys.exit("Could not create the schema")
+    member = create_member()
+
+    results = []
+    for name, path in [("relaunch (before)", Relaunch), ("router (after)", Routed)]:
+        utils.save_user_session(member)  # Signed in, as after the login screen
+        results.append((name, time_path(path(), args.rounds)))
+
+    print(f"{'path':<20}{'p50':>12}{'p95':>12}{'logout':>12}")
+    for name, (samples, logout_ms) in results:
+        cuts = statistics.quantiles(samples, n=100)
+        print(f"{name:<20}{cuts[49]:>10.2f}ms{cuts[94]:>10.2f}ms{logout_ms:>10.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark the student Fines page: a label per cell vs Treeview tables
+
+Renders --rows synthetic payment history rows (plus a few pending fines) in a real
+Tk window and times each render up to the point Tk has laid it out, counting the
+Tk widgets created and the widgets alive afterwards. "labels" grids a CTkLabel
+per cell and a status pill per row (what show_data used to do); "treeview" is
+FinesPaymentApp.show_data itself, whose widget count does not depend on the rows.
+The second render of each path shows the cost of a refresh after paying a fine.
+No database is needed. Needs a display (use xvfb-run on a headless machine).
+
+    python benchmarks/bench_student_fines.py [--rows 5000] [--pending 20] [--skip-labels]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "student"))
+
+import customtkinter as ctk
+
+from fines import FinesPaymentApp
+from utils import format_date, format_currency
+from bench_support import count_widgets, count_live, require_display
+
+widgets = count_widgets()
+
+# ------------------- Setup -------------------
+def make_data(rows, pending):
+    """What get_fines_page_data returns: (pending fines, payment history, no-fine loans)"""
+    start = datetime(2024, 1, 1)
+    pending_fines = [
+        {"fine_id": i + 1, "title": f"Overdue Book {i}", "due_date": start + timedelta(days=i), "amount": 1.5 + i}
+        for i in range(pending)
+    ]
+    history = [
+        {"title": f"Book {i}", "amount": 2.0, "payment_date": start - timedelta(hours=i)}
+        for i in range(0, rows, 2)
+    ]
+    no_fine_loans = [
+        {"title": f"Book {i}", "return_date": start - timedelta(hours=i)}
+        for i in range(1, rows, 2)
+    ]
+    return pending_fines, history, no_fine_loans
+
+def make_screen(root, tables):
+    """A FinesPaymentApp without a session or database, its content area built if tables"""
+    content = ctk.CTkFrame(root, fg_color="#e6f4e6")
+    content.pack(fill="both", expand=True)
+    screen = FinesPaymentApp.__new__(FinesPaymentApp)
+    screen.root = root
+    screen.content = content
+    screen.user = {"user_id": 1}
+    if tables:
+        screen.create_content_area()
+    return screen
+
+# ------------------- Display Paths -------------------
+def labels(screen, data):
+    """Grid a label per cell and a status pill per history row into a plain frame"""
+    frame = getattr(screen, "label_frame", None)
+    if frame is None:
+        frame = screen.label_frame = ctk.CTkFrame(screen.content, fg_color="#f0f4f0")
+        frame.pack(fill="both", expand=True)
+    for widget in frame.grid_slaves():
+        widget.destroy()
+
+    pending_fines, payment_history, no_fine_loans = data
+    row = 0
+    for fine in pending_fines:
+        for column, text in enumerate([fine["title"], format_date(fine["due_date"]),
+                                       format_currency(fine["amount"])]):
+            ctk.CTkLabel(frame, text=text, anchor="w", fg_color="#ffffff", corner_radius=0,
+                         height=30).grid(row=row, column=column, sticky="ew", padx=1, pady=1)
+        ctk.CTkButton(frame, text="$ Pay Now", fg_color="#d32f2f", hover_color="#b71c1c", width=80, height=25,
+                      font=ctk.CTkFont(size=12)).grid(row=row, column=3, padx=5, pady=5)
+        row += 1
+
+    history = ([(fine["title"], fine["amount"], fine["payment_date"], "Paid") for fine in payment_history]
+               + [(loan["title"], 0.0, loan["return_date"], "No Fine") for loan in no_fine_loans])
+    history.sort(key=lambda item: item[2], reverse=True)
+    for title, amount, date, status in history:
+        for column, text in enumerate([title, format_currency(amount), format_date(date)]):
+            ctk.CTkLabel(frame, text=text, anchor="w", fg_color="#ffffff", corner_radius=0,
+                         height=30).grid(row=row, column=column, sticky="ew", padx=1, pady=1)
+        pill = ctk.CTkFrame(frame, fg_color="#4caf50" if status == "Paid" else "#2196f3", corner_radius=10, height=22)
+        ctk.CTkLabel(pill, text=status, text_color="white", font=ctk.CTkFont(size=12), width=60).pack(padx=5, pady=2)
+        pill.grid(row=row, column=3, padx=5, pady=5)
+        row += 1
+
+def treeview(screen, data):
+    FinesPaymentApp.show_data(screen, data)
+
+# ------------------- Timing -------------------
+def time_renders(root, display, data, tables):
+    """[(ms, widgets created)] for a first render and a re-render, and live widgets after"""
+    screen = make_screen(root, tables)
+    root.update()
+
+    renders = []
+    for _ in range(2):
+        widgets.created = 0
+        start = time.perf_counter()
+        display(screen, data)
+        root.update_idletasks()
+        renders.append(((time.perf_counter() - start) * 1000, widgets.created))
+    live = count_live(screen.content)
+
+    screen.content.destroy()
+    root.update()
+    return renders, live
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--pending", type=int, default=20)
+    parser.add_argument("--skip-labels", action="store_true",
+                        help="only time the Treeview path (the label path is slow at thousands of rows)")
+    args = parser.parse_args()
+
+    require_display()
+    root = ctk.CTk()
+    root.geometry("1100x700")
+    data = make_data(args.rows, args.pending)
+
+    paths = [("treeview (after)", treeview, True)]
+    if not args.skip_labels:
+        paths.insert(0, ("labels (before)", labels, False))
+    results = [(name, time_renders(root, display, data, tables)) for name, display, tables in paths]
+    root.destroy()
+
+    print(f"{args.rows} history rows, {args.pending} pending fines")
+    print(f"{'path':<18}{'render':>12}{'created':>10}{'re-render':>12}{'created':>10}{'live':>8}")
+    for name, (renders, live) in results:
+        (first_ms, first_created), (again_ms, again_created) = renders
+        print(f"{name:<18}{first_ms:>10.1f}ms{first_created:>10}{again_ms:>10.1f}ms{again_created:>10}{live:>8}")
+
+if __name__ == "__main__":
+    main()
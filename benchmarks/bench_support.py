@@ -0,0 +1,44 @@
+"""Setup shared by the benchmark scripts: a hermetic database and Tk widget counting"""
+import sys
+import tkinter
+
+# ------------------- Hermetic Database -------------------
+def use_memory_database():
+    """Point every module at a private in-memory SQLite database, with no query instrumentation
+    overhead - call before importing anything that reads the config values"""
+    import config
+    config.DB_BACKEND = "sqlite"
+    config.SQLITE_PATH = ":memory:"
+    config.QUERY_STATS_ENABLED = False
+
+# ------------------- Display -------------------
+def require_display():
+    """Exit with a note instead of a Tcl traceback when there is no display to open windows on"""
+    try:
+        tkinter.Tk().destroy()
+    except tkinter.TclError as error:
+        sys.exit(f"Needs a display ({error}) - run it under xvfb-run on a headless machine")
+
+# ------------------- Widget Counting -------------------
+class WidgetCounter:
+    """Counts every Tk widget created once install() has wrapped tkinter.BaseWidget.__init__"""
+    def __init__(self):
+        self.created = 0
+
+    def install(self):
+        base_init = tkinter.BaseWidget.__init__
+
+        def counting_init(widget, *args, **kwargs):
+            self.created += 1
+            base_init(widget, *args, **kwargs)
+
+        tkinter.BaseWidget.__init__ = counting_init
+        return self
+
+def count_widgets():
+    """Start counting widget creations - returns the counter, reset it with counter.created = 0"""
+    return WidgetCounter().install()
+
+def count_live(widget):
+    """Widgets under widget, including it"""
+    return 1 + sum(count_live(child) for child in widget.winfo_children())
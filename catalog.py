@@ -0,0 +1,91 @@
+import re
+
+# ------------------- Catalog Search -------------------
+# Query building only - repository.BookRepository.search runs the statements
+
+# Every list/search screen reads these columns - the description TEXT column is loaded on demand
+BOOK_LIST_COLUMNS = """
+    b.book_id,
+    b.title,
+    b.author,
+    b.genre,
+    b.publication_year,
+    b.available_copies,
+    b.total_copies,
+    (b.total_copies - b.available_copies) AS borrowed_copies,
+    b.isbn
+"""
+
+# Must list the same columns, in the same order, as the ft_books_search FULLTEXT index
+FULLTEXT_COLUMNS = "b.title, b.author, b.genre, b.isbn"
+
+# InnoDB does not index words shorter than innodb_ft_min_token_size (3 by default)
+FULLTEXT_MIN_TOKEN = 3
+
+# InnoDB's default stopword list - a required (+) stopword would match nothing
+FULLTEXT_STOPWORDS = {
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for", "from",
+    "how", "i", "in", "is", "it", "la", "of", "on", "or", "that", "the", "this", "to",
+    "was", "what", "when", "where", "who", "will", "with", "und", "www",
+}
+
+def build_fulltext_query(search_term):
+    """Turn free text into a BOOLEAN MODE query where every word is required and prefix-matched
+
+    Returns None when no word is long enough to be in the FULLTEXT index.
+    """
+    words = [
+        word for word in re.findall(r"\w+", search_term.lower())
+        if len(word) >= FULLTEXT_MIN_TOKEN and word not in FULLTEXT_STOPWORDS
+    ]
+    if not words:
+        return None
+    return " ".join(f"+{word}*" for word in words)
+
+def build_search_filter(search_term="", category="", fulltext=True, availability="", decade=None):
+    """Build the WHERE clause for a catalog search
+
+    Returns (where, params, score, score_params) - score is a relevance expression
+    for ORDER BY, or None when the search isn't ranked. Without fulltext (backends
+    that have no FULLTEXT index) every word must appear somewhere in the same
+    columns the index covers, and results come back unranked. availability
+    ("available"/"unavailable") and decade (e.g. 1950) narrow it like the facets do.
+    """
+    where = " WHERE 1=1"
+    params = []
+    score = None
+    score_params = []
+
+    search_term = search_term.strip()
+    if search_term and not fulltext:
+        for word in re.findall(r"\w+", search_term):
+            where += " AND (b.title LIKE %s OR b.author LIKE %s OR b.genre LIKE %s OR b.isbn LIKE %s)"
+            params.extend([f"%{word}%"] * 4)
+    elif search_term:
+        fulltext_query = build_fulltext_query(search_term)
+        if fulltext_query:
+            match = f"MATCH({FULLTEXT_COLUMNS}) AGAINST (%s IN BOOLEAN MODE)"
+            where += f" AND {match}"
+            params.append(fulltext_query)
+            score = match
+            score_params.append(fulltext_query)
+        else:
+            # Too short for the FULLTEXT index - a prefix match can still use idx_books_title
+            where += " AND (b.title LIKE %s OR b.author LIKE %s)"
+            prefix = f"{search_term}%"
+            params.extend([prefix, prefix])
+
+    if category:
+        where += " AND b.genre = %s"
+        params.append(category)
+
+    if availability == "available":
+        where += " AND b.available_copies > 0"
+    elif availability == "unavailable":
+        where += " AND b.available_copies = 0"
+
+    if decade is not None:
+        where += " AND b.publication_year BETWEEN %s AND %s"
+        params.extend([decade, decade + 9])
+
+    return where, params, score, score_params
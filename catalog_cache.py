@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+from config import RESULT_CACHE_SIZE
+from repository import books
+
+# ------------------- Catalog Version -------------------
+# Bumped after every committed catalog write in this process - admin add/update/delete
+# and every borrow or return, which move available_copies. A cached result remembers
+# the version it was read at and is thrown away once the version has moved on.
+_version = 0
+_version_lock = threading.Lock()
+
+def catalog_version():
+    return _version
+
+def bump_catalog_version(*args):
+    """Mark every cached catalog result stale (also usable as a BookRepository listener)"""
+    global _version
+    with _version_lock:
+        _version += 1
+
+books.add_listener(bump_catalog_version)
+
+# ------------------- Result Cache -------------------
+class ResultCache:
+    """Size-bounded LRU of query results, valid only for the catalog version they were read at"""
+    def __init__(self, size=RESULT_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (catalog version, result)
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def get(self, key):
+        """(True, result) for a current entry, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == _version:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return True, entry[1]
+                # Read before the last catalog write - never hand it out again
+                del self._entries[key]
+                self._stats["stale"] += 1
+            self._stats["misses"] += 1
+            return False, None
+
+    def put(self, key, version, result):
+        """Store a result read at version (the version taken before the query ran)"""
+        if version != _version:
+            return  # The catalog changed while the query ran
+        with self._lock:
+            self._entries[key] = (version, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Snapshot of the hit/miss counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["size"] = self.size
+        stats["version"] = _version
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+# Browse pages: keyed by search, filters and page position
+page_cache = ResultCache()
+
+def get_page_cache_stats():
+    """Hit/miss/stale/eviction counters for the browse page cache"""
+    return page_cache.stats()
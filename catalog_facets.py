@@ -0,0 +1,214 @@
+import threading
+import time
+
+from utils import connect_db, show_error
+from repository import books
+
+# ------------------- Bitmaps -------------------
+# A set of books is a Python int with bit book_id set for each member, so combining
+# filters is a single & and counting one is int.bit_count() - both run in C
+
+def bitmap_from_ids(book_ids):
+    """Bitmap with a bit set for each book_id"""
+    if not book_ids:
+        return 0
+    bits = bytearray(max(book_ids) // 8 + 1)
+    for book_id in book_ids:
+        bits[book_id >> 3] |= 1 << (book_id & 7)
+    return int.from_bytes(bits, "little")
+
+def bitmap_tester(bitmap):
+    """Fast membership test for many ids against one bitmap (shifting a big int is O(size))"""
+    bits = bitmap.to_bytes(bitmap.bit_length() // 8 + 1, "little")
+    size = len(bits)
+
+    def contains(book_id):
+        byte = book_id >> 3
+        return byte < size and bits[byte] >> (book_id & 7) & 1
+    return contains
+
+# ------------------- Facets -------------------
+FACETS = ("genre", "availability", "decade")
+
+def decade_of(publication_year):
+    return publication_year // 10 * 10 if publication_year else None
+
+def facet_values(genre, publication_year, available_copies):
+    """The value a book has for each facet (None = not counted under that facet)"""
+    return {
+        "genre": genre,
+        "availability": "available" if available_copies > 0 else "unavailable",
+        "decade": decade_of(publication_year),
+    }
+
+class FacetIndex:
+    """One bitmap per facet value (genre, availability, publication decade)
+
+    Counts follow the usual faceted-search rule: a facet's counts apply every
+    selected filter except its own, so picking a genre still shows how many
+    books each other genre would have.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bitmaps = {facet: {} for facet in FACETS}  # facet -> value -> bitmap
+        self._docs = {}  # book_id -> (facet values, available_copies)
+        self._all = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---- building and maintenance ----
+    def load(self, rows):
+        """Build from (book_id, genre, publication_year, available_copies) rows"""
+        with self._lock:
+            members = {facet: {} for facet in FACETS}
+            docs = {}
+            for book_id, genre, publication_year, available_copies in rows:
+                values = facet_values(genre, publication_year, available_copies)
+                docs[book_id] = (values, available_copies)
+                for facet, value in values.items():
+                    if value is not None:
+                        members[facet].setdefault(value, []).append(book_id)
+
+            self._bitmaps = {
+                facet: {value: bitmap_from_ids(ids) for value, ids in values.items()}
+                for facet, values in members.items()
+            }
+            self._docs = docs
+            self._all = bitmap_from_ids(list(docs))
+
+    def _set(self, book_id, values, available_copies):
+        bit = 1 << book_id
+        self._docs[book_id] = (values, available_copies)
+        self._all |= bit
+        for facet, value in values.items():
+            if value is not None:
+                bitmaps = self._bitmaps[facet]
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def _remove(self, book_id):
+        doc = self._docs.pop(book_id, None)
+        if doc is None:
+            return
+        mask = ~(1 << book_id)
+        self._all &= mask
+        for facet, value in doc[0].items():
+            if value is None:
+                continue
+            bitmaps = self._bitmaps[facet]
+            bitmaps[value] &= mask
+            if not bitmaps[value]:
+                del bitmaps[value]
+
+    def add(self, book_id, genre, publication_year, available_copies):
+        with self._lock:
+            self._remove(book_id)
+            self._set(book_id, facet_values(genre, publication_year, available_copies), available_copies)
+
+    def remove(self, book_id):
+        with self._lock:
+            self._remove(book_id)
+
+    def set_copies(self, book_id, available_copies):
+        """A copy was borrowed or returned - only availability can change"""
+        with self._lock:
+            doc = self._docs.get(book_id)
+            if doc is None:
+                return
+            values = dict(doc[0], availability="available" if available_copies > 0 else "unavailable")
+            self._remove(book_id)
+            self._set(book_id, values, available_copies)
+
+    def on_book_changed(self, action, book_id, book):
+        """BookRepository listener - keeps the bitmaps in step with admin writes and loans"""
+        if action == "delete":
+            self.remove(book_id)
+        elif action == "copies":
+            self.set_copies(book_id, book["available_copies"])
+        else:
+            self.add(book_id, book["genre"], book["publication_year"], book["available_copies"])
+
+    # ---- queries ----
+    def _selected(self, filters, skip=None):
+        """Bitmap of books passing every filter except skip's"""
+        bitmap = self._all
+        for facet, value in filters.items():
+            if facet == skip or value in (None, ""):
+                continue
+            bitmap &= self._bitmaps[facet].get(value, 0)
+        return bitmap
+
+    def counts(self, base=None, **filters):
+        """{facet: {value: count}} over base (a bitmap, default every book) with filters applied"""
+        with self._lock:
+            base = self._all if base is None else base & self._all
+            counts = {}
+            for facet in FACETS:
+                scope = base & self._selected(filters, skip=facet)
+                counts[facet] = {
+                    value: count
+                    for value, bitmap in self._bitmaps[facet].items()
+                    if (count := (scope & bitmap).bit_count())
+                }
+            return counts
+
+    def values(self, facet):
+        """Every value a facet currently has, sorted"""
+        with self._lock:
+            return sorted(self._bitmaps[facet])
+
+    def filter_ids(self, book_ids, **filters):
+        """The book_ids (in their given order) that pass every filter"""
+        with self._lock:
+            selected = self._selected(filters)
+        if selected == self._all:
+            return list(book_ids)
+        contains = bitmap_tester(selected)
+        return [book_id for book_id in book_ids if contains(book_id)]
+
+# ------------------- Process-Wide Index -------------------
+_index = None
+_index_lock = threading.Lock()
+
+def load_facet_index(index):
+    """Fill index from the catalog - False if the database can't be read"""
+    connection = connect_db()
+    if not connection:
+        return False
+
+    cursor = None
+    try:
+        start = time.perf_counter()
+        cursor = connection.cursor()
+        cursor.execute("SELECT book_id, genre, publication_year, available_copies FROM Books")
+        index.load(cursor)
+        print(f"Facet index: {len(index)} books loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return True
+    except Exception as err:
+        show_error("Database Error", f"Could not load the facet index: {err}")
+        return False
+    finally:
+        if connection.is_connected():
+            if cursor is not None:
+                cursor.close()
+            connection.close()
+
+def get_facet_index():
+    """Return the process-wide facet index, loading it on first use (None if loading failed)"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = FacetIndex()
+                # Listen before reading so a write that lands during the load isn't missed
+                books.add_listener(index.on_book_changed)
+                if load_facet_index(index):
+                    _index = index
+                else:
+                    books.remove_listener(index.on_book_changed)
+    return _index
+
+def warm_facet_index():
+    """Start loading the index on a background thread so the first browse page doesn't wait"""
+    if _index is None:
+        threading.Thread(target=get_facet_index, name="facet-index", daemon=True).start()
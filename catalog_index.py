@@ -0,0 +1,608 @@
+import heapq
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from operator import itemgetter
+
+from config import CATALOG_INDEX_MIN_PREFIX, CATALOG_INDEX_MAX_EXPANSIONS
+from utils import connect_db, show_error
+from repository import books
+from fuzzy_search import TrigramIndex, is_fuzzy_word
+
+# ------------------- Tokenizing -------------------
+_TOKEN = re.compile(r"\w+")
+
+def tokenize(text):
+    """Lower-cased words of a catalog field"""
+    return _TOKEN.findall(str(text).lower()) if text else []
+
+# Relevance weight of a query word found in each field, in book_tokens' field order
+FIELD_WEIGHTS = (4, 2, 1, 1)  # title, author, genre, isbn
+
+def book_tokens(title, author, genre, isbn):
+    """Every distinct token of the fields FULLTEXT search covers -> bitmask of the fields it is in"""
+    tokens = {}
+    for bit, field in enumerate((title, author, genre, isbn)):
+        for token in tokenize(field):
+            tokens[token] = tokens.get(token, 0) | (1 << bit)
+    return tokens
+
+def shared_prefixes(tokens):
+    """Prefix (CATALOG_INDEX_MIN_PREFIX or longer) -> how many of tokens start with it, less
+    one - for each prefix at least two of them share"""
+    shared = {}
+    ordered = sorted(tokens)
+    # Sorted, the tokens with a prefix sit together and each neighbouring pair shares it
+    for first, second in zip(ordered, ordered[1:]):
+        common = 0
+        for a, b in zip(first, second):
+            if a != b:
+                break
+            common += 1
+        for length in range(CATALOG_INDEX_MIN_PREFIX, common + 1):
+            prefix = first[:length]
+            shared[prefix] = shared.get(prefix, 0) + 1
+    return shared
+
+# Field bitmask -> the fields in it, as indexes into FIELD_WEIGHTS
+MASK_FIELDS = tuple(tuple(field for field in range(len(FIELD_WEIGHTS)) if mask & (1 << field))
+                    for mask in range(1 << len(FIELD_WEIGHTS)))
+
+def fuzzy_words(title, author):
+    """Distinct title and author words the typo-tolerant search may suggest"""
+    return {token for token in tokenize(title) + tokenize(author) if is_fuzzy_word(token)}
+
+# ------------------- Ranking -------------------
+# A stream is drained by set intersection when the other streams hold at most this many
+# times its books - past that, checking each of its books' fields is cheaper
+DRAIN_SET_RATIO = 20
+
+def _field_text(doc, field):
+    """Lower-cased text of one field (book_tokens order) of a CatalogIndex._docs entry"""
+    if field == 0:
+        return doc[0]
+    text = doc[field + 1]
+    return str(text).lower() if text else ""
+
+def _score(doc, query):
+    """Relevance of one book (as kept in CatalogIndex._docs) - None if it misses a query word
+
+    For every query word, the FIELD_WEIGHTS of the fields it is in, doubled where it
+    is a whole word rather than a prefix - so, as with FULLTEXT, books with the words
+    in the title and in more places come first.
+    """
+    texts = [_field_text(doc, field) for field in range(len(FIELD_WEIGHTS))]
+    fields = [None] * len(texts)  # Tokenized when first needed
+    score = 0
+    for word, tokens, _, _, _ in query:
+        found = 0
+        for field, weight in enumerate(FIELD_WEIGHTS):
+            if word not in texts[field]:
+                continue  # Cheap test first - most fields don't have the word at all
+            if fields[field] is None:
+                fields[field] = _TOKEN.findall(texts[field])
+            if word in fields[field]:
+                found += 2 * weight
+            elif not tokens.isdisjoint(fields[field]):
+                found += weight
+        if not found:
+            return None
+        score += found
+    return score
+
+def _stream(whole, prefixed, weight, title_key):
+    """(score it adds, book_id) for one query word in one field: the books with the whole
+    word, then those with a longer word, each in title order"""
+    for book_id in whole or ():
+        yield 2 * weight, book_id
+    if len(prefixed) > 1:
+        prefixed = [heapq.merge(*prefixed, key=title_key)]
+    for posting in prefixed:
+        for book_id in posting:
+            yield weight, book_id
+
+# ------------------- Inverted Index -------------------
+# What a search sees for a book deleted while it was reading the postings
+_GONE = ("", None, None, None, None)
+
+def _inserted(posting, position, book_id):
+    """Copy of posting with book_id at position - postings are replaced, never changed in place"""
+    posting = posting[:] if posting is not None else array("i")
+    posting.insert(position, book_id)
+    return posting
+
+def _deleted(posting, position):
+    """Copy of posting without the book_id at position"""
+    posting = posting[:]
+    del posting[position]
+    return posting
+
+class CatalogIndex:
+    """In-memory token -> sorted book_id postings over title, author, genre and ISBN
+
+    Every query word is required and prefix-matched (words shorter than
+    CATALOG_INDEX_MIN_PREFIX must match a whole token), the same rules as the
+    BOOLEAN MODE FULLTEXT search, and matches are ranked by where the words
+    were found (see _score). Only ids come out of the index - the rows
+    themselves are read by primary key so availability is always current.
+
+    Writes replace postings instead of changing them, so a search only holds
+    the lock while it looks its words up and reads and ranks without it.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}  # token -> array('i') of book_ids, ascending
+        # Per field (book_tokens order): token -> array('i') of the book_ids with it there, in title order
+        self._field_postings = tuple({} for _ in FIELD_WEIGHTS)
+        self._vocabulary = []  # sorted tokens, for prefix lookups
+        self._repeats = {}  # prefix -> books' extra tokens starting with it (see shared_prefixes)
+        self._docs = {}  # book_id -> (title sort key, title, author, genre, isbn)
+        self._fuzzy = TrigramIndex()  # For "did you mean" when a search finds nothing
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _title_key(self, book_id):
+        """Ranking tie-break: title, then book_id (a book deleted meanwhile sorts first)"""
+        return (self._docs.get(book_id, _GONE)[0], book_id)
+
+    # ---- building and maintenance ----
+    def load(self, rows):
+        """Build from (book_id, title, author, genre, isbn) rows in ascending book_id order"""
+        # Held for the whole build: a write committed meanwhile waits and is applied on top
+        with self._lock:
+            postings = {}
+            field_postings = tuple({} for _ in FIELD_WEIGHTS)
+            repeats = {}
+            docs = {}
+            fuzzy = TrigramIndex()
+            for book_id, title, author, genre, isbn in rows:
+                docs[book_id] = ((title or "").lower(), title, author, genre, isbn)
+                fuzzy.add_words(fuzzy_words(title, author))
+                tokens = book_tokens(title, author, genre, isbn)
+                for prefix, extra in shared_prefixes(tokens).items():
+                    repeats[prefix] = repeats.get(prefix, 0) + extra
+                for token, mask in tokens.items():
+                    posting = postings.get(token)
+                    if posting is None:
+                        posting = postings[token] = array("i")
+                    posting.append(book_id)  # Rows arrive by book_id, so postings stay sorted
+                    for field in MASK_FIELDS[mask]:
+                        field_postings[field].setdefault(token, []).append(book_id)
+
+            # Per-field postings run in title order, the ranking tie-break
+            by_title = sorted(docs, key=lambda book_id: (docs[book_id][0], book_id))
+            order = {book_id: n for n, book_id in enumerate(by_title)}
+            for by_token in field_postings:
+                for token, book_ids in by_token.items():
+                    by_token[token] = array("i", sorted(book_ids, key=order.__getitem__))
+
+            self._postings = postings
+            self._field_postings = field_postings
+            self._vocabulary = sorted(postings)
+            self._repeats = repeats
+            self._docs = docs
+            self._fuzzy = fuzzy
+
+    def add(self, book_id, title, author, genre, isbn):
+        with self._lock:
+            self._remove(book_id)
+            doc = self._docs[book_id] = ((title or "").lower(), title, author, genre, isbn)
+            self._fuzzy.add_words(fuzzy_words(title, author))
+            tokens = book_tokens(title, author, genre, isbn)
+            for prefix, extra in shared_prefixes(tokens).items():
+                self._repeats[prefix] = self._repeats.get(prefix, 0) + extra
+            for token, mask in tokens.items():
+                posting = self._postings.get(token)
+                if posting is None:
+                    insort(self._vocabulary, token)
+                self._postings[token] = _inserted(posting, bisect_left(posting or (), book_id), book_id)
+                for field in MASK_FIELDS[mask]:
+                    by_token = self._field_postings[field]
+                    ordered = by_token.get(token)
+                    position = bisect_left(ordered or (), (doc[0], book_id), key=self._title_key)
+                    by_token[token] = _inserted(ordered, position, book_id)
+
+    def remove(self, book_id):
+        with self._lock:
+            self._remove(book_id)
+
+    def _remove(self, book_id):
+        doc = self._docs.get(book_id)
+        if doc is None:
+            return
+        self._fuzzy.remove_words(fuzzy_words(doc[1], doc[2]))
+        tokens = book_tokens(*doc[1:])
+        for prefix, extra in shared_prefixes(tokens).items():
+            if self._repeats[prefix] == extra:
+                del self._repeats[prefix]
+            else:
+                self._repeats[prefix] -= extra
+        for token, mask in tokens.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                continue
+            position = bisect_left(posting, book_id)
+            if position < len(posting) and posting[position] == book_id:
+                posting = self._postings[token] = _deleted(posting, position)
+            if not posting:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+            # Found by title while the book is still in _docs, so the search can compare against it
+            for field in MASK_FIELDS[mask]:
+                by_token = self._field_postings[field]
+                ordered = by_token.get(token)
+                if ordered is None:
+                    continue
+                position = bisect_left(ordered, (doc[0], book_id), key=self._title_key)
+                if position < len(ordered) and ordered[position] == book_id:
+                    ordered = by_token[token] = _deleted(ordered, position)
+                if not ordered:
+                    del by_token[token]
+        del self._docs[book_id]
+
+    def on_book_changed(self, action, book_id, book):
+        """BookRepository listener - keeps the index in step with admin writes"""
+        if action == "delete":
+            self.remove(book_id)
+        elif action in ("add", "update"):
+            self.add(book_id, book["title"], book["author"], book["genre"], book["isbn"])
+
+    # ---- queries ----
+    def _word_tokens(self, word):
+        """Index tokens one query word matches"""
+        if len(word) < CATALOG_INDEX_MIN_PREFIX:
+            return [word] if word in self._postings else []
+        start = bisect_left(self._vocabulary, word)
+        end = bisect_right(self._vocabulary, word + "\uffff", lo=start)
+        # A short prefix over ISBNs could expand to every book - cap the fan-out
+        return self._vocabulary[start:min(end, start + CATALOG_INDEX_MAX_EXPANSIONS)]
+
+    def _lookup(self, words):
+        """Per distinct query word: (word, its tokens, their postings, per field (postings of
+        the whole word, postings of the longer words), books matching it or None if the
+        fan-out was capped) - everything a search reads, taken under the lock"""
+        query = []
+        for word in dict.fromkeys(words):
+            tokens = self._word_tokens(word)
+            postings = [self._postings[token] for token in tokens]
+            fields = [(by_token.get(word),
+                       [posting for token in tokens if token != word and (posting := by_token.get(token))])
+                      for by_token in self._field_postings]
+            matches = None
+            if len(tokens) < CATALOG_INDEX_MAX_EXPANSIONS:
+                # A book with several of the tokens is in several of their postings
+                matches = sum(map(len, postings)) - self._repeats.get(word, 0)
+            query.append((word, set(tokens), postings, fields, matches))
+        return query
+
+    def _match(self, query, category):
+        """book_ids matching every word of a looked-up query (and the genre, if given), unordered"""
+        postings = []
+        for _, _, word_postings, _, _ in query:
+            if len(word_postings) == 1:
+                postings.append(word_postings[0])
+            else:
+                merged = set()
+                for posting in word_postings:
+                    merged.update(posting)
+                postings.append(merged)
+
+        # Start from the rarest word and probe the others
+        postings.sort(key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            if isinstance(posting, set):
+                candidates = [book_id for book_id in candidates if book_id in posting]
+                continue
+            size = len(posting)
+            candidates = [
+                book_id for book_id in candidates
+                if (position := bisect_left(posting, book_id)) < size and posting[position] == book_id
+            ]
+
+        if category:
+            docs = self._docs
+            return [book_id for book_id in candidates if docs.get(book_id, _GONE)[3] == category]
+        return candidates
+
+    def match(self, search_term, category=""):
+        """Unordered book_ids matching every word of search_term (and the genre, if given)"""
+        words = tokenize(search_term)
+        if not words:
+            return []
+        with self._lock:
+            query = self._lookup(words)
+        return list(self._match(query, category))
+
+    def search(self, search_term, category="", limit=None, offset=0):
+        """(book_ids for the page, best matches first, total matches)"""
+        words = tokenize(search_term)
+        if not words:
+            return [], 0
+
+        with self._lock:
+            query = self._lookup(words)
+        if len(query) == 1 and not category and query[0][4] is not None:
+            total = query[0][4]  # No need to gather the matches just to count them
+        else:
+            total = len(self._match(query, category))
+        if not total:
+            return [], 0
+        accept = None
+        if category:
+            docs = self._docs
+            accept = lambda book_id: docs.get(book_id, _GONE)[3] == category
+        return self._top(query, None if limit is None else offset + limit, accept)[offset:], total
+
+    def rank(self, search_term, book_ids, limit=None, offset=0):
+        """One page of book_ids (matches of search_term), best matches first"""
+        words = tokenize(search_term)
+        if not words:
+            return []
+        with self._lock:
+            query = self._lookup(words)
+
+        count = None if limit is None else offset + limit
+        # Reading the streams costs about count * matches / len(book_ids) books before the page
+        # is settled, against scoring every candidate outright - take whichever is less
+        matches = min(sum(len(posting) for posting in word_postings) for _, _, word_postings, _, _ in query)
+        if count is not None and len(book_ids) ** 2 > count * matches:
+            return self._top(query, count, set(book_ids).__contains__)[offset:]
+
+        docs = self._docs
+        ranked = []
+        for book_id in book_ids:
+            doc = docs.get(book_id)
+            if doc is not None:  # A book deleted since the ids were matched is left out
+                ranked.append((-(_score(doc, query) or 0), doc[0], book_id))
+        if count is None:
+            ranked.sort()
+        else:
+            # Only the rows up to the end of the page need ordering
+            ranked = heapq.nsmallest(count, ranked)
+        return [book_id for _, _, book_id in ranked[offset:]]
+
+    def _top(self, query, count, accept=None):
+        """book_ids of the count best matches accept (if given) lets through, best first -
+        every match if count is None
+
+        A threshold algorithm over one stream (see _stream) per query word and field:
+        the next book of each stream caps what any unread book can still score for
+        that word and field, so reading stops as soon as no unread book could make
+        the page - for a page of a common word that is a handful of books.
+        """
+        if count == 0:
+            return []
+        title_key = self._title_key
+        heads = []  # [score the stream adds next, its next book_id, stream, word index, size, word, field]
+        postings = {}  # id(head) -> [(score added, posting)] of its stream
+        for word, (text, _, _, fields, _) in enumerate(query):
+            for field, (weight, (whole, prefixed)) in enumerate(zip(FIELD_WEIGHTS, fields)):
+                stream = _stream(whole, prefixed, weight, title_key)
+                first = next(stream, None)
+                if first is None:
+                    continue
+                scored = [(weight, posting) for posting in prefixed]
+                if whole:
+                    scored.insert(0, (2 * weight, whole))
+                head = [*first, stream, word, sum(len(posting) for _, posting in scored), text, field]
+                postings[id(head)] = scored
+                heads.append(head)
+        left = [0] * len(query)  # Unfinished streams per word
+        for head in heads:
+            left[head[3]] += 1
+
+        docs = self._docs
+        best = []  # (-score, title key), best first
+        seen = set()
+
+        def keep(score, doc, book_id):
+            entry = (-score, (doc[0], book_id))
+            if count is None:
+                best.append(entry)
+            elif len(best) < count or entry < best[-1]:
+                insort(best, entry)
+                del best[count:]
+
+        def read(book_id):
+            seen.add(book_id)
+            doc = docs.get(book_id)
+            if doc is None or (accept is not None and not accept(book_id)):
+                return
+            score = _score(doc, query)
+            if score is not None:
+                keep(score, doc, book_id)
+
+        def advance(head, others=None):
+            """Read the next book of a stream - given the other streams, only if the ones
+            whose word is in its fields could lift it onto the page"""
+            score, book_id = head[0], head[1]
+            following = next(head[2], None)
+            if following is None:
+                head[0] = 0
+                left[head[3]] -= 1
+            else:
+                head[0], head[1] = following
+            if book_id in seen:
+                return
+            if others is not None:
+                doc = docs.get(book_id)
+                if doc is None:
+                    return
+                score += sum(other[0] for other in others if other[5] in _field_text(doc, other[6]))
+                if (-score, (doc[0], book_id)) > best[-1]:
+                    seen.add(book_id)
+                    return
+            read(book_id)
+
+        def drain(head, others):
+            """Read a stream to the end at once: a book in no other stream can't make the
+            page (or even match, with more than one word), and as an unread book is in no
+            finished stream the others' postings are enough to score the rest"""
+            unread = set().union(*(posting for _, posting in postings[id(head)]))
+            unread -= seen
+            scores = {}  # book_id -> score from the other streams
+            words = {}  # book_id -> bitmask of the query words they found it for
+            for other in others:
+                found = {}
+                for score, posting in postings[id(other)]:  # The whole word's posting comes first
+                    for book_id in unread.intersection(posting):
+                        found.setdefault(book_id, score)
+                for book_id, score in found.items():
+                    scores[book_id] = scores.get(book_id, 0) + score
+                    words[book_id] = words.get(book_id, 0) | (1 << other[3])
+            seen.update(unread)
+            head[0] = 0
+            left[head[3]] -= 1
+
+            own = {}
+            for score, posting in postings[id(head)]:
+                for book_id in scores.keys() & set(posting):
+                    own.setdefault(book_id, score)
+            every_word = (1 << len(query)) - 1
+            for book_id, score in scores.items():
+                doc = docs.get(book_id)
+                if (words[book_id] | (1 << head[3]) == every_word and doc is not None
+                        and (accept is None or accept(book_id))):
+                    keep(score + own[book_id], doc, book_id)
+
+        # Every match is in some stream of every word, so once one word's streams are read
+        # to the end no match is left unread
+        while all(left):
+            top = max(head[0] for head in heads)
+            if count is None or len(best) < count or -best[-1][0] < top:
+                # Fill the page from the streams that add the most, best books first
+                for head in [head for head in heads if head[0] == top]:
+                    advance(head)
+            else:
+                # Once no stream alone can beat the page, the cap only falls as the others
+                # are read - go through the shortest
+                head = min(heads, key=itemgetter(4))
+                others = [other for other in heads if other is not head]
+                alone = len(query) == 1 and (-head[0], title_key(head[1])) < best[-1]
+                if not alone and sum(other[4] for other in others) <= DRAIN_SET_RATIO * head[4]:
+                    drain(head, others)
+                else:
+                    advance(head, others)
+            heads = [head for head in heads if head[0]]
+
+            if count is not None and len(best) == count:
+                # An unread book scores at most the sum of the heads, and to tie it must sit
+                # at or after every head in title order
+                bound = sum(head[0] for head in heads)
+                worst_score, worst_key = -best[-1][0], best[-1][1]
+                if bound < worst_score or (bound == worst_score and
+                                           max(title_key(head[1]) for head in heads) > worst_key):
+                    break
+
+        if count is None:
+            best.sort()
+        return [key[1] for _, key in best]
+
+    def complete(self, search_term, limit=6):
+        """Whole-search completions of the word being typed, most widely used words first
+
+        Read straight off the sorted vocabulary: the prefix's words sit next to each
+        other, and at most CATALOG_INDEX_MAX_EXPANSIONS of them are ranked.
+        """
+        if not search_term or search_term[-1].isspace():
+            return []  # The last word is finished
+        words = tokenize(search_term)
+        if not words:
+            return []
+        head, prefix = words[:-1], words[-1]
+
+        with self._lock:
+            start = bisect_left(self._vocabulary, prefix)
+            end = bisect_right(self._vocabulary, prefix + "\uffff", lo=start)
+            postings = self._postings
+            tokens = [token for token in self._vocabulary[start:min(end, start + CATALOG_INDEX_MAX_EXPANSIONS)]
+                      if token != prefix]
+            if head:
+                # Only offer completions that still find something with the words before them
+                head_ids = set(self._match(self._lookup(head), ""))
+                tokens = [token for token in tokens if not head_ids.isdisjoint(postings[token])]
+            best = heapq.nlargest(limit, tokens, key=lambda token: len(postings[token]))
+        return [" ".join(head + [token]) for token in best]
+
+    def suggest(self, search_term, limit=3):
+        """Respellings of search_term, closest first, with each word that matches nothing
+        swapped for a similar title or author word - [] if there is nothing to correct
+        """
+        words = tokenize(search_term)
+        misspelled = False
+        with self._lock:
+            alternatives = []
+            for word in words:
+                if self._word_tokens(word) or not is_fuzzy_word(word):
+                    alternatives.append([word])
+                    continue
+                misspelled = True
+                similar = [candidate for _, candidate in self._fuzzy.similar(word, limit)]
+                if not similar:
+                    return []  # Nothing like this word anywhere, so no respelling can match
+                alternatives.append(similar)
+
+        if not misspelled:
+            return []
+        # The n-th suggestion takes the n-th closest word for every misspelled word
+        depth = max(len(options) for options in alternatives)
+        return [" ".join(options[min(n, len(options) - 1)] for options in alternatives) for n in range(depth)]
+
+    def search_page(self, search_term, category="", limit=6, offset=0, with_total=False):
+        """Same return shape as BookRepository.search: (book rows, total or None)"""
+        page_ids, total = self.search(search_term, category, limit, offset)
+        return books.get_many(page_ids), total if with_total else None
+
+# ------------------- Process-Wide Index -------------------
+_index = None
+_index_lock = threading.Lock()
+
+def load_catalog_index(index):
+    """Fill index from the catalog - False if the database can't be read"""
+    connection = connect_db()
+    if not connection:
+        return False
+
+    cursor = None
+    try:
+        start = time.perf_counter()
+        cursor = connection.cursor()
+        cursor.execute("SELECT book_id, title, author, genre, isbn FROM Books ORDER BY book_id")
+        index.load(cursor)
+        print(f"Catalog index: {len(index)} books loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return True
+    except Exception as err:
+        show_error("Database Error", f"Could not load the catalog index: {err}")
+        return False
+    finally:
+        if connection.is_connected():
+            if cursor is not None:
+                cursor.close()
+            connection.close()
+
+def get_catalog_index():
+    """Return the process-wide index, loading it on first use (None if loading failed)"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = CatalogIndex()
+                # Listen before reading so a write that lands during the load isn't missed
+                books.add_listener(index.on_book_changed)
+                if load_catalog_index(index):
+                    _index = index
+                else:
+                    books.remove_listener(index.on_book_changed)
+    return _index
+
+def warm_catalog_index():
+    """Start loading the index on a background thread so the first search doesn't wait"""
+    if _index is None:
+        threading.Thread(target=get_catalog_index, name="catalog-index", daemon=True).start()
@@ -1,6 +1,8 @@
 # ------------------- Constants and Configuration -------------------
 
 # Database Configuration
+DB_BACKEND = "mysql"  # "mysql", or "sqlite" to run without a MySQL server
+
 DB_CONFIG = {
     "host": "localhost",
     "user": "root",
@@ -10,10 +12,59 @@ DB_CONFIG = {
 
 DB_NAME = "library_system"
 
+# SQLite backend settings
+SQLITE_PATH = "library_system.db"  # ":memory:" for a throwaway in-process database
+SQLITE_BUSY_TIMEOUT = 5  # Seconds a writer waits for another connection's lock
+
+# Connection pool settings
+DB_POOL_SIZE = 5  # Maximum number of open connections
+DB_POOL_CHECKOUT_TIMEOUT = 10  # Seconds to wait for a free connection before giving up
+DB_POOL_IDLE_TIMEOUT = 300  # Seconds a connection may sit idle before it is pinged on reuse
+DB_CONNECT_TIMEOUT = 5  # Seconds allowed for the TCP connect + auth handshake
+DB_STATEMENT_CACHE_SIZE = 32  # Prepared statements kept per pooled connection
+
+# Background database work
+BACKGROUND_WORKERS = 3  # Worker threads for data-layer calls (keep below DB_POOL_SIZE)
+BACKGROUND_POLL_MS = 30  # How often the Tk thread checks for finished background calls
+
+# Query instrumentation
+QUERY_STATS_ENABLED = False  # Opt-in: time every query per shape; the report is written on exit
+SLOW_QUERY_THRESHOLD_MS = 200  # Queries slower than this are appended to the slow-query log
+SLOW_QUERY_LOG_FILE = 'slow_queries.log'
+QUERY_REPORT_FILE = 'query_report.json'
+EXPLAIN_CAPTURE_ENABLED = False  # Diagnostic mode: EXPLAIN each distinct query shape once (turns on the query stats)
+EXPLAIN_REPORT_FILE = 'explain_report.json'
+
 # Session file paths
 USER_SESSION_FILE = 'user_session.json'
 ADMIN_SESSION_FILE = 'admin_session.json'
 
 # Application Constants
 FINE_RATE_PER_DAY = 0.50  # $0.50 per day for overdue books
-LOAN_PERIOD_DAYS = 14  # Default loan period in days
\ No newline at end of file
+LOAN_PERIOD_DAYS = 14  # Default loan period in days
+
+# In-memory catalog search index
+CATALOG_INDEX_MIN_PREFIX = 3  # Shorter query words must match a whole word, like the FULLTEXT minimum
+CATALOG_INDEX_MAX_EXPANSIONS = 200  # Most index words one prefix may expand to
+
+# Typo-tolerant ("did you mean") search
+FUZZY_MIN_SIMILARITY = 0.3  # Share of trigrams a suggested word must have in common with the typed one
+FUZZY_MAX_POSTING = 5000  # Trigrams shared by more words than this are too common to narrow anything down
+FUZZY_MAX_CANDIDATES = 50  # Most words scored per query word
+
+# Search-as-you-type
+SEARCH_DEBOUNCE_MS = 250  # Quiet time after the last keystroke before the browse screen searches
+AUTOCOMPLETE_MIN_CHARS = 2  # Shortest word that gets completions
+AUTOCOMPLETE_MAX_SUGGESTIONS = 6
+
+# Browse result cache
+RESULT_CACHE_SIZE = 256  # Pages of search results kept; any catalog write invalidates them all
+
+# Browse scroll view
+SCROLL_WINDOW_SIZE = 60  # Books fetched per database round trip while scrolling
+SCROLL_MAX_WINDOWS = 4  # Fetched windows kept in memory (least recently used are dropped)
+
+# Admin tables (books, users, fines)
+ADMIN_PAGE_SIZE = 200  # Rows fetched per database round trip as an admin table scrolls
+ADMIN_MAX_PAGES = 5  # Rows kept in a table at once, in pages - the page furthest from view is dropped
+ADMIN_INSERT_CHUNK = 50  # Rows inserted into a Treeview per idle callback
@@ -0,0 +1,264 @@
+import re
+import sqlite3
+import threading
+
+from config import DB_BACKEND, DB_CONFIG, DB_NAME, DB_POOL_SIZE, DB_CONNECT_TIMEOUT, SQLITE_PATH, SQLITE_BUSY_TIMEOUT
+
+# ------------------- Backends -------------------
+# A backend knows how to open raw connections and how its SQL dialect differs for
+# schema work. Everything above the pool talks the mysql.connector cursor API with
+# %s placeholders; the SQLite backend adapts to that instead of the other way round.
+
+class MySQLBackend:
+    name = "mysql"
+    supports_fulltext = True
+
+    def __init__(self):
+        # Imported here so the SQLite backend runs without the MySQL driver installed
+        import mysql.connector
+        self._connector = mysql.connector
+        self.Error = mysql.connector.Error
+        self.pool_size = DB_POOL_SIZE
+
+    def connect(self):
+        """Open a brand-new MySQL connection (used by the pool only)"""
+        return self._connector.connect(connection_timeout=DB_CONNECT_TIMEOUT, **DB_CONFIG)
+
+    def connect_for_migration(self):
+        """Connect to the server, creating the database if it doesn't exist yet"""
+        connection = self._connector.connect(
+            host=DB_CONFIG["host"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"]
+        )
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
+        cursor.execute(f"USE {DB_NAME}")
+        cursor.close()
+        return connection
+
+    def acquire_migration_lock(self, cursor, name, timeout):
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+        return bool(cursor.fetchone()[0])
+
+    def release_migration_lock(self, cursor, name):
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+        cursor.fetchone()
+
+    def index_exists(self, cursor, table, index):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_NAME = %s
+        """, (DB_NAME, table, index))
+        return cursor.fetchone()[0] > 0
+
+    def column_exists(self, cursor, table, column):
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """, (DB_NAME, table, column))
+        return cursor.fetchone()[0] > 0
+
+    def add_index_sql(self, table, definition, online=True):
+        clause = f"ALTER TABLE {table} ADD {definition}"
+        if online:
+            # Build the index without blocking reads and writes on a live library
+            clause += ", ALGORITHM=INPLACE, LOCK=NONE"
+        return clause
+
+    def explain_sql(self, operation):
+        return f"EXPLAIN {operation}"
+
+    def upsert_sql(self, table, columns, update):
+        """INSERT of columns that overwrites the update columns of a row with the same key"""
+        placeholders = ", ".join(["%s"] * len(columns))
+        assignments = ", ".join(f"{column} = VALUES({column})" for column in update)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+                f" ON DUPLICATE KEY UPDATE {assignments}")
+
+# "[FULLTEXT|UNIQUE] INDEX name (columns)" - the MySQL definitions used by migrations
+_INDEX_DEFINITION = re.compile(r"^\s*(FULLTEXT\s+|UNIQUE\s+)?INDEX\s+(\w+)\s*(\(.*\))\s*$", re.IGNORECASE | re.DOTALL)
+
+class SQLiteBackend:
+    name = "sqlite"
+    supports_fulltext = False  # Catalog search uses LIKE instead of MATCH ... AGAINST
+    Error = sqlite3.Error
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self.in_memory = path == ":memory:"
+        # Every connection to ":memory:" is a separate empty database, so an in-memory
+        # backend hands out one shared connection and the pool is sized to match
+        self.pool_size = 1 if self.in_memory else DB_POOL_SIZE
+        self._shared = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        if not self.in_memory:
+            return SQLiteConnection(self.path)
+        with self._lock:
+            if self._shared is None:
+                self._shared = SQLiteConnection(self.path, keep_open=True)
+        return self._shared
+
+    def connect_for_migration(self):
+        # Opening the file creates the database
+        return self.connect()
+
+    def acquire_migration_lock(self, cursor, name, timeout):
+        # SQLite serializes writers itself and a version's steps share one transaction
+        return True
+
+    def release_migration_lock(self, cursor, name):
+        pass
+
+    def index_exists(self, cursor, table, index):
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                       (table, index))
+        return cursor.fetchone()[0] > 0
+
+    def column_exists(self, cursor, table, column):
+        cursor.execute("SELECT COUNT(*) FROM pragma_table_info(%s) WHERE name = %s", (table, column))
+        return cursor.fetchone()[0] > 0
+
+    def add_index_sql(self, table, definition, online=True):
+        """CREATE INDEX for a MySQL index definition, or None if SQLite has no equivalent"""
+        match = _INDEX_DEFINITION.match(definition)
+        if not match:
+            return None
+        kind = (match.group(1) or "").strip().upper()
+        if kind == "FULLTEXT":
+            return None
+        unique = "UNIQUE " if kind == "UNIQUE" else ""
+        return f"CREATE {unique}INDEX IF NOT EXISTS {match.group(2)} ON {table} {match.group(3)}"
+
+    def explain_sql(self, operation):
+        return f"EXPLAIN QUERY PLAN {operation}"
+
+    def upsert_sql(self, table, columns, update):
+        placeholders = ", ".join(["%s"] * len(columns))
+        return f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+# ------------------- SQLite Adapter -------------------
+def to_qmark(sql):
+    """Rewrite mysql.connector's %s placeholders (and %% escapes) for sqlite3"""
+    return sql.replace("%s", "?").replace("%%", "%")
+
+class SQLiteCursor:
+    """sqlite3 cursor with the mysql.connector calls the app makes (dictionary rows, column_names)"""
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, operation, params=None):
+        if params:
+            # mysql.connector only applies placeholder/escape rules when params are given
+            self._cursor.execute(to_qmark(operation), tuple(params))
+        else:
+            self._cursor.execute(operation)
+
+    def executemany(self, operation, seq_params):
+        self._cursor.executemany(to_qmark(operation), [tuple(params) for params in seq_params])
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    def close(self):
+        self._cursor.close()
+
+class SQLiteConnection:
+    """sqlite3 connection with the mysql.connector calls the pool and data layer make"""
+    unread_result = False  # sqlite3 never leaves a result set pinned to the connection
+
+    def __init__(self, path, keep_open=False):
+        self.path = path
+        self.keep_open = keep_open  # The shared in-memory database must outlive every close()
+        self._conn = None
+        self._open()
+
+    def _open(self):
+        # The pool hands a connection to one worker thread at a time
+        self._conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT,
+                                     detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if self.path != ":memory:":
+            # Readers don't block the writer (and vice versa) in WAL mode
+            self._conn.execute("PRAGMA journal_mode = WAL")
+
+    def cursor(self, dictionary=False, prepared=False, **kwargs):
+        # sqlite3 already keeps compiled statements per connection, so prepared needs no extra work
+        return SQLiteCursor(self._conn.cursor(), dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._conn is not None and self._conn.in_transaction
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self):
+        return self._conn is not None
+
+    def reconnect(self, attempts=1, delay=0):
+        if self._conn is None:
+            self._open()
+
+    def close(self):
+        if self.keep_open or self._conn is None:
+            return
+        self._conn.close()
+        self._conn = None
+
+# ------------------- Backend Selection -------------------
+BACKENDS = {
+    "mysql": MySQLBackend,
+    "sqlite": SQLiteBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Return the backend named by config.DB_BACKEND, creating it on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if DB_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown DB_BACKEND {DB_BACKEND!r} (expected one of {', '.join(BACKENDS)})")
+                _backend = BACKENDS[DB_BACKEND]()
+    return _backend
@@ -0,0 +1,245 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config import DB_POOL_SIZE, DB_POOL_CHECKOUT_TIMEOUT, DB_POOL_IDLE_TIMEOUT, DB_STATEMENT_CACHE_SIZE
+
+# ------------------- Pool Errors -------------------
+class PoolExhaustedError(Exception):
+    """Raised when no connection is returned to the pool within the checkout timeout"""
+
+# ------------------- Pooled Connection -------------------
+class PooledConnection:
+    """Wrapper around a raw connection that hands it back to the pool on close()"""
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._closed = False
+
+    def __getattr__(self, name):
+        # Everything we don't override (cursor, commit, rollback...) goes to the real connection
+        if self._closed:
+            raise AttributeError(f"Connection already returned to the pool (accessing '{name}')")
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        """Open a cursor on the real connection, wrapped by the pool's cursor_wrapper if any"""
+        if self._closed:
+            raise AttributeError("Connection already returned to the pool (accessing 'cursor')")
+        cursor = self._raw.cursor(*args, **kwargs)
+        if self._pool.cursor_wrapper is not None:
+            cursor = self._pool.cursor_wrapper(cursor, self._raw)
+        return cursor
+
+    def prepared(self, sql):
+        """Cursor holding sql as a server-side prepared statement, reused across checkouts of this connection"""
+        if self._closed:
+            raise AttributeError("Connection already returned to the pool (accessing 'prepared')")
+        return self._pool.prepared_cursor(self, self._raw, sql)
+
+    def is_connected(self):
+        """Cheap check used by the callers' finally blocks - the pool validates on checkout instead"""
+        return not self._closed
+
+    def close(self):
+        """Return the connection to the pool instead of closing the socket"""
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.release(self._raw)
+
+# ------------------- Connection Pool -------------------
+class ConnectionPool:
+    def __init__(self, connect, size=DB_POOL_SIZE, checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT,
+                 idle_timeout=DB_POOL_IDLE_TIMEOUT, cursor_wrapper=None, statement_cache_size=DB_STATEMENT_CACHE_SIZE):
+        self._connect = connect
+        self.cursor_wrapper = cursor_wrapper  # e.g. query_stats.instrument_cursor
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.idle_timeout = idle_timeout
+        self.statement_cache_size = statement_cache_size
+
+        self._cond = threading.Condition()
+        self._idle = []  # (raw connection, time it was released)
+        self._created = 0
+        self._in_use = 0
+        self._statements = {}  # raw connection -> OrderedDict of sql -> prepared cursor
+
+        self._stats = {
+            "checkouts": 0,
+            "total_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "exhausted": 0,
+            "timeouts": 0,
+            "reconnects": 0,
+            "connections_opened": 0,
+            "statements_prepared": 0,
+            "statements_reused": 0,
+        }
+
+    def get_connection(self):
+        """Check out a connection, waiting up to checkout_timeout if all of them are busy"""
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.checkout_timeout
+        raw = None
+        released_at = None
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, released_at = self._idle.pop()
+                    break
+
+                if self._created < self.size:
+                    # Reserve a slot; the socket is opened outside the lock
+                    self._created += 1
+                    break
+
+                if not waited:
+                    self._stats["exhausted"] += 1
+                    waited = True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolExhaustedError(
+                        f"no connection became free within {self.checkout_timeout}s "
+                        f"({self.size} in use)"
+                    )
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            wait_ms = (time.perf_counter() - start) * 1000
+            self._stats["checkouts"] += 1
+            self._stats["total_wait_ms"] += wait_ms
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+
+        try:
+            if raw is None:
+                raw = self._open()
+            elif time.monotonic() - released_at > self.idle_timeout:
+                raw = self._revalidate(raw)
+        except Exception:
+            # Give the reserved slot back so other callers are not starved
+            with self._cond:
+                self._created -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        """Put a connection back into the idle list"""
+        try:
+            # Don't leak unread rows or a half-finished transaction into the next borrower
+            if getattr(raw, "unread_result", False):
+                raw.get_rows()
+            if getattr(raw, "in_transaction", False):
+                raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def prepared_cursor(self, connection, raw, sql):
+        """Return the cached prepared cursor for sql on raw, preparing it on first use"""
+        # Only the thread holding raw touches its cache, so the lock just guards the outer dict
+        with self._cond:
+            statements = self._statements.setdefault(raw, OrderedDict())
+
+        cursor = statements.get(sql)
+        if cursor is not None:
+            statements.move_to_end(sql)
+            with self._cond:
+                self._stats["statements_reused"] += 1
+            return cursor
+
+        cursor = connection.cursor(prepared=True)
+        statements[sql] = cursor
+        with self._cond:
+            self._stats["statements_prepared"] += 1
+
+        if len(statements) > self.statement_cache_size:
+            # Least recently used statement goes, freeing its server-side handle
+            _, oldest = statements.popitem(last=False)
+            try:
+                oldest.close()
+            except Exception:
+                pass
+        return cursor
+
+    def _forget_statements(self, raw):
+        """Drop the prepared cursors of a connection whose server session is gone"""
+        with self._cond:
+            self._statements.pop(raw, None)
+
+    def _discard(self, raw):
+        """Drop a broken connection and free its slot"""
+        self._forget_statements(raw)
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    def _open(self):
+        raw = self._connect()
+        with self._cond:
+            self._stats["connections_opened"] += 1
+        return raw
+
+    def _revalidate(self, raw):
+        """Ping a connection that sat idle for a while and reconnect it if the server dropped it"""
+        if raw.is_connected():
+            return raw
+
+        # Statements prepared on the old session don't survive a reconnect
+        self._forget_statements(raw)
+        with self._cond:
+            self._stats["reconnects"] += 1
+        try:
+            raw.reconnect(attempts=1, delay=0)
+            return raw
+        except Exception:
+            try:
+                raw.close()
+            except Exception:
+                pass
+            return self._open()
+
+    def stats(self):
+        """Snapshot of the pool counters"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["open"] = self._created
+            stats["in_use"] = self._in_use
+            stats["idle"] = len(self._idle)
+
+        checkouts = stats["checkouts"]
+        stats["avg_wait_ms"] = stats["total_wait_ms"] / checkouts if checkouts else 0.0
+        return stats
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones are closed when released)"""
+        with self._cond:
+            idle = self._idle
+            self._idle = []
+            self._created -= len(idle)
+            for raw, _ in idle:
+                self._statements.pop(raw, None)
+
+        for raw, _ in idle:
+            try:
+                raw.close()
+            except Exception:
+                pass
@@ -0,0 +1,166 @@
+import json
+import os
+import re
+import sys
+import threading
+from datetime import datetime
+
+from config import EXPLAIN_REPORT_FILE
+from db_backend import get_backend
+
+# ------------------- EXPLAIN Capture -------------------
+# Statements that can be EXPLAINed - DDL, SHOW, transactions etc. are skipped
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT\s+INTO\s+\S+\s*(\([^)]*\)\s*)?SELECT|REPLACE)\b", re.IGNORECASE)
+
+_lock = threading.Lock()
+_seen = set()  # Shapes already explained (or being explained) in this process
+
+def is_explainable(sql):
+    return bool(_EXPLAINABLE.match(sql))
+
+def sqlite_plan_flags(plan):
+    """The same problems in an EXPLAIN QUERY PLAN result (SQLite backend)"""
+    flags = []
+    for row in plan:
+        detail = row.get("detail") or ""
+        scan = re.match(r"SCAN (\w+)( USING (COVERING )?INDEX)?", detail)
+        if scan:
+            kind = "full_index_scan" if scan.group(2) else "full_table_scan"
+            flags.append(f"{kind}:{scan.group(1)}")
+        if "USE TEMP B-TREE FOR ORDER BY" in detail or "USE TEMP B-TREE FOR RIGHT PART OF ORDER BY" in detail:
+            flags.append("filesort")
+        elif "USE TEMP B-TREE" in detail:
+            flags.append("temporary")
+    return flags
+
+def plan_flags(plan):
+    """Problems worth a look in a traditional EXPLAIN result"""
+    if plan and "detail" in plan[0]:
+        return sqlite_plan_flags(plan)
+
+    flags = []
+    for row in plan:
+        table = row.get("table") or "?"
+        access = (row.get("type") or "").upper()
+        extra = row.get("Extra") or ""
+
+        if access == "ALL":
+            flags.append(f"full_table_scan:{table}")
+        elif access == "INDEX":
+            flags.append(f"full_index_scan:{table}")
+        if "Using filesort" in extra:
+            flags.append(f"filesort:{table}")
+        if "Using temporary" in extra:
+            flags.append(f"temporary:{table}")
+    return flags
+
+def plan_access(plan):
+    """How each table is read - [table, access type, key] per row, or the plan lines on SQLite
+
+    Row estimates are left out: they move with the data, while a change here is a
+    change of plan.
+    """
+    if plan and "detail" in plan[0]:
+        return [row.get("detail") or "" for row in plan]
+    return [[row.get("table"), row.get("type"), row.get("key")] for row in plan]
+
+def _jsonable(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    if isinstance(value, (str, int, float)) or value is None:
+        return value
+    return str(value)
+
+def explain_once(connection, shape, operation, params, caller):
+    """EXPLAIN a statement the first time its shape is seen and add it to the report"""
+    if not is_explainable(shape):
+        return
+
+    with _lock:
+        if shape in _seen:
+            return
+        _seen.add(shape)
+
+    entry = {"caller": caller, "access": [], "flags": []}
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(get_backend().explain_sql(operation), params)
+        plan = [{key: _jsonable(value) for key, value in row.items()} for row in cursor.fetchall()]
+        entry["access"] = plan_access(plan)
+        entry["flags"] = plan_flags(plan)
+    except Exception as err:
+        # Diagnostics must never break the real query
+        entry["error"] = str(err)
+    finally:
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+    save_entry(shape, entry)
+
+def load_report(path=EXPLAIN_REPORT_FILE):
+    if not os.path.exists(path):
+        return {"statements": {}}
+    with open(path) as f:
+        return json.load(f)
+
+def meta_path(path):
+    """The file beside the report that holds when it was written, so the report itself diffs cleanly"""
+    return f"{os.path.splitext(path)[0]}.meta.json"
+
+def save_entry(shape, entry, path=EXPLAIN_REPORT_FILE):
+    """Merge one statement into the report file, keeping it sorted so releases diff cleanly"""
+    with _lock:
+        try:
+            report = load_report(path)
+            report.pop("generated", None)  # Reports written before the timestamp moved out
+            report["statements"][shape] = entry
+            report["flagged"] = sorted(
+                shape for shape, statement in report["statements"].items() if statement.get("flags")
+            )
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            with open(meta_path(path), "w") as f:
+                json.dump({"generated": datetime.now().isoformat(timespec="seconds")}, f, indent=2)
+        except (OSError, ValueError) as err:
+            print(f"Could not update EXPLAIN report: {err}")
+
+def compare_reports(old, new):
+    """Statements whose access changed between two reports - [(shape, old access, new access)]
+
+    A statement in only one report is listed with None on the other side.
+    """
+    old_statements, new_statements = old["statements"], new["statements"]
+    changes = []
+    for shape in sorted(set(old_statements) | set(new_statements)):
+        before = old_statements.get(shape)
+        after = new_statements.get(shape)
+        before_access = before.get("access") if before else None
+        after_access = after.get("access") if after else None
+        if before_access != after_access:
+            changes.append((shape, before_access, after_access))
+    return changes
+
+# ------------------- Main Execution -------------------
+if __name__ == "__main__":
+    # Compare two releases' reports by access type and key: python explain_capture.py old.json new.json
+    if len(sys.argv) == 3:
+        changes = compare_reports(load_report(sys.argv[1]), load_report(sys.argv[2]))
+        print(f"{len(changes)} statements read their tables differently")
+        for shape, before, after in changes:
+            print(f"\n  {shape[:160]}")
+            print(f"  before: {before}")
+            print(f"  after:  {after}")
+        sys.exit(0)
+
+    # Print the flagged statements from the saved report: python explain_capture.py [report.json]
+    report = load_report(sys.argv[1] if len(sys.argv) > 1 else EXPLAIN_REPORT_FILE)
+    statements = report["statements"]
+    print(f"{len(statements)} statements explained, {len(report.get('flagged', []))} flagged")
+    for shape in report.get("flagged", []):
+        statement = statements[shape]
+        print(f"\n{statement['caller']}: {', '.join(statement['flags'])}")
+        print(f"  {shape[:160]}")
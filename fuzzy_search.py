@@ -0,0 +1,100 @@
+import heapq
+from collections import Counter
+from itertools import islice
+
+from config import FUZZY_MIN_SIMILARITY, FUZZY_MAX_POSTING, FUZZY_MAX_CANDIDATES
+
+# ------------------- Trigrams -------------------
+def trigrams(word):
+    """Distinct 3-letter windows of word, padded so the start and end count too"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similarity(a_grams, b_grams):
+    """Share of trigrams two words have in common (1.0 = identical)"""
+    shared = len(a_grams & b_grams)
+    return shared / (len(a_grams) + len(b_grams) - shared)
+
+def is_fuzzy_word(token):
+    """Only real words are worth correcting - not ISBN digits or initials"""
+    return len(token) >= 3 and token.isalpha()
+
+# ------------------- Trigram Index -------------------
+class TrigramIndex:
+    """Trigram -> words postings over the distinct words of titles and authors
+
+    Not thread-safe on its own; CatalogIndex owns one and calls it under its lock.
+    Words are reference-counted by the number of books using them, so a word
+    disappears once the last book with it is edited or deleted.
+    """
+    def __init__(self):
+        self._counts = {}  # word -> books using it
+        self._postings = {}  # trigram -> set of words
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, word):
+        return word in self._counts
+
+    def add_words(self, words):
+        counts = self._counts
+        for word in words:
+            if word in counts:
+                counts[word] += 1
+                continue
+            counts[word] = 1
+            for gram in trigrams(word):
+                posting = self._postings.get(gram)
+                if posting is None:
+                    posting = self._postings[gram] = set()
+                posting.add(word)
+
+    def remove_words(self, words):
+        counts = self._counts
+        for word in words:
+            count = counts.get(word)
+            if count is None:
+                continue
+            if count > 1:
+                counts[word] = count - 1
+                continue
+            del counts[word]
+            for gram in trigrams(word):
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(word)
+                    if not posting:
+                        del self._postings[gram]
+
+    def similar(self, word, limit=5):
+        """[(similarity, word)] best first, for indexed words that look like word
+
+        Trigrams are counted rarest first and any shared by more than
+        FUZZY_MAX_POSTING words are skipped, and only the FUZZY_MAX_CANDIDATES
+        words with the most trigrams in common are scored, so the work per query
+        stays flat however large the catalog gets.
+        """
+        grams = trigrams(word)
+        postings = sorted(
+            (posting for gram in grams if (posting := self._postings.get(gram))),
+            key=len
+        )
+        if not postings:
+            return []
+
+        shared = Counter()
+        # The rarest trigram is always used (capped if even that one is common) so something is scored
+        shared.update(islice(postings[0], FUZZY_MAX_POSTING))
+        for posting in postings[1:]:
+            if len(posting) > FUZZY_MAX_POSTING:
+                break
+            shared.update(posting)
+
+        scored = []
+        for candidate, _ in shared.most_common(FUZZY_MAX_CANDIDATES):
+            score = similarity(grams, trigrams(candidate))
+            if score >= FUZZY_MIN_SIMILARITY:
+                scored.append((score, candidate))
+        # Ties go to the more widely used word
+        return heapq.nlargest(limit, scored, key=lambda item: (item[0], self._counts[item[1]]))
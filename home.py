@@ -0,0 +1,150 @@
+import tkinter as tk
+import customtkinter as ctk
+import os
+
+from router import show_screen, load_image
+
+# ------------------- Main Application Class -------------------
+class LibraryManagementSystem:
+    def __init__(self, root, first_run=False):
+        self.root = root
+        self.root.title("Library Management System")
+        self.root.geometry("800x600")
+        
+        # Set appearance mode and default color theme
+        ctk.set_appearance_mode("light")
+        ctk.set_default_color_theme("green")
+        
+        # Create the main frame
+        self.main_frame = ctk.CTkFrame(self.root)
+        self.main_frame.pack(fill="both", expand=True)
+        
+        # Title and welcome message
+        title_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        title_frame.pack(fill="x", padx=20, pady=(50, 20))
+        
+        # Title
+        title_label = ctk.CTkLabel(
+            title_frame,
+            text="Library Management System",
+            font=ctk.CTkFont(size=28, weight="bold"),
+            text_color="#116636"
+        )
+        title_label.pack()
+        
+        # Subtitle
+        subtitle_label = ctk.CTkLabel(
+            title_frame,
+            text="Your Gateway to Knowledge and Discovery",
+            font=ctk.CTkFont(size=14),
+            text_color="#555555"
+        )
+        subtitle_label.pack(pady=(5, 0))
+        
+        # Try to load and display a library image
+        try:
+            self.setup_image()
+        except Exception as e:
+            print(f"Could not load image: {e}")
+        
+        # Buttons frame
+        buttons_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        buttons_frame.pack(pady=40)
+        
+        # Login button
+        login_button = ctk.CTkButton(
+            buttons_frame,
+            text="User Login",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            fg_color="#116636",
+            hover_color="#0d4f29",
+            width=200,
+            height=50,
+            corner_radius=8,
+            command=self.open_login
+        )
+        login_button.pack(pady=10)
+        
+        # Signup button
+        signup_button = ctk.CTkButton(
+            buttons_frame,
+            text="New User? Sign Up",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            fg_color="#2196f3",
+            hover_color="#1976d2",
+            width=200,
+            height=50,
+            corner_radius=8,
+            command=self.open_signup
+        )
+        signup_button.pack(pady=10)
+        
+        # Admin button
+        admin_button = ctk.CTkButton(
+            buttons_frame,
+            text="Admin Login",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            fg_color="#757575",
+            hover_color="#616161",
+            width=200,
+            height=50,
+            corner_radius=8,
+            command=self.open_admin
+        )
+        admin_button.pack(pady=10)
+        
+        # Footer with information
+        footer_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+        footer_frame.pack(side="bottom", fill="x", padx=20, pady=20)
+        
+        # Add default admin credentials if we just created the database
+        if first_run:
+            admin_info = ctk.CTkLabel(
+                footer_frame,
+                text="Default Admin Login: admin@library.com / Password: admin123",
+                font=ctk.CTkFont(size=12, weight="bold"),
+                text_color="#116636"
+            )
+            admin_info.pack()
+    
+    def setup_image(self):
+        """Try to load and display a library image"""
+        # Check for predefined image first
+        image_path = "images/library.png"
+        
+        if not os.path.exists(image_path):
+            # No image found - create a placeholder
+            image_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+            image_frame.pack(pady=20)
+            
+            placeholder = ctk.CTkLabel(
+                image_frame,
+                text="📚",
+                font=ctk.CTkFont(size=120),
+                text_color="#116636"
+            )
+            placeholder.pack()
+        else:
+            # Image found - display it
+            image_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
+            image_frame.pack(pady=20)
+            
+            # Load and resize the image (once per session)
+            img = load_image(image_path, (300, 200))
+            
+            # Create image label
+            image_label = tk.Label(image_frame, image=img, bg="#F0F0F0")
+            image_label.image = img  # Keep a reference to avoid garbage collection
+            image_label.pack()
+    
+    def open_login(self):
+        """Open the login page"""
+        show_screen("login")
+    
+    def open_signup(self):
+        """Open the signup page"""
+        show_screen("signup")
+    
+    def open_admin(self):
+        """Open the admin page"""
+        show_screen("admin_login")
@@ -0,0 +1,35 @@
+import re
+
+# ------------------- ISBN Normalization -------------------
+# Books.isbn holds the bare 13-digit form, so a scanned or typed ISBN in any
+# layout resolves through the UNIQUE index with a single equality lookup
+
+_SEPARATORS = re.compile(r"[\s-]")
+_ISBN_10 = re.compile(r"^\d{9}[\dX]$")
+_ISBN_13 = re.compile(r"^97[89]\d{10}$")
+
+def isbn10_check_digit(first_nine):
+    total = sum((10 - position) * int(digit) for position, digit in enumerate(first_nine))
+    check = (11 - total % 11) % 11
+    return "X" if check == 10 else str(check)
+
+def isbn13_check_digit(first_twelve):
+    total = sum(int(digit) * (3 if position % 2 else 1) for position, digit in enumerate(first_twelve))
+    return str((10 - total % 10) % 10)
+
+def normalize_isbn(text):
+    """The ISBN-13 digits for a valid ISBN-10 or ISBN-13 (hyphens and spaces allowed), else None"""
+    if not text:
+        return None
+    candidate = _SEPARATORS.sub("", str(text)).upper()
+    if candidate.startswith("ISBN"):
+        candidate = candidate[4:].lstrip(":")
+
+    if _ISBN_13.match(candidate):
+        return candidate if isbn13_check_digit(candidate[:12]) == candidate[12] else None
+    if _ISBN_10.match(candidate):
+        if isbn10_check_digit(candidate[:9]) != candidate[9]:
+            return None
+        body = "978" + candidate[:9]
+        return body + isbn13_check_digit(body)
+    return None
@@ -1,9 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import customtkinter as ctk
-import os
 
 from utils import connect_db, load_user_session, clear_user_session
+from router import show_screen
 
 # We'll create a stub file for now, since the librarian functionality
 # will be similar to a combination of admin and student functions
@@ -240,11 +240,8 @@ class LibrarianApp:
             # Clear the session
             clear_user_session()
             
-            # Close current window
-            self.root.destroy()
-            
-            # Open login page
-            os.system("python auth.py")
+            # Back to the login page, in the same window
+            show_screen("login")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to logout: {e}")
             self.root.destroy()
@@ -252,9 +249,7 @@ class LibrarianApp:
 # ------------------- Run Function -------------------
 def run_librarian():
     """Run the librarian application"""
-    root = ctk.CTk()
-    app = LibrarianApp(root)
-    root.mainloop()
+    show_screen("librarian")
 
 # ------------------- Main Execution -------------------
 if __name__ == "__main__":
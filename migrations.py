@@ -0,0 +1,368 @@
+import hashlib
+import logging
+from tkinter import messagebox
+
+from config import DB_NAME
+from db_backend import get_backend
+from utils import get_pool, generate_secret
+from isbn import normalize_isbn
+
+logger = logging.getLogger(__name__)
+
+# Rejected ISBNs listed by book id before the rest are only counted
+ISBN_REPORT_LIMIT = 10
+
+# ------------------- Migration Steps -------------------
+# A step is either a SQL string or a function taking the cursor. Every step must be
+# safe to run against a database that already has the change, because databases
+# created before schema_version existed start again from version 1.
+
+def per_backend(**statements):
+    """Step that runs the statement written for the configured backend, e.g. per_backend(mysql=..., sqlite=...)"""
+    def step(cursor):
+        cursor.execute(statements[get_backend().name])
+    return step
+
+def add_index(table, index, definition, online=True):
+    """Step that adds an index unless the table already has one with that name"""
+    def step(cursor):
+        if index_exists(cursor, table, index):
+            return
+        clause = get_backend().add_index_sql(table, definition, online)
+        if clause is None:
+            logger.info("Skipping index %s on %s: not supported by the %s backend", index, table, get_backend().name)
+            return
+        logger.info("Adding index %s to %s...", index, table)
+        cursor.execute(clause)
+    return step
+
+def add_column(table, column, definition):
+    """Step that adds a column unless the table already has it"""
+    def step(cursor):
+        if column_exists(cursor, table, column):
+            return
+        logger.info("Adding column %s to %s...", column, table)
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return step
+
+def index_exists(cursor, table, index):
+    return get_backend().index_exists(cursor, table, index)
+
+def column_exists(cursor, table, column):
+    return get_backend().column_exists(cursor, table, column)
+
+# Set once a migration run has created the default admin account - only then is its login worth showing
+default_admin_created = False
+
+def create_default_admin(cursor):
+    """Create the default admin account if there is no admin yet"""
+    global default_admin_created
+    cursor.execute("SELECT COUNT(*) FROM Users WHERE role = 'admin'")
+    if cursor.fetchone()[0] > 0:
+        return
+
+    default_password = hashlib.sha256("admin123".encode()).hexdigest()
+    cursor.execute("""
+        INSERT INTO Users (first_name, last_name, email, password, secret, role)
+        VALUES ('Admin', 'User', 'admin@library.com', %s, %s, 'admin')
+    """, (default_password, generate_secret()))
+    default_admin_created = True
+
+def insert_sample_books(cursor):
+    """Insert sample book data if the Books table is empty"""
+    cursor.execute("SELECT COUNT(*) FROM Books")
+    if cursor.fetchone()[0] > 0:
+        return
+
+    sample_books = [
+        ("The Great Gatsby", "F. Scott Fitzgerald", "9780743273565", 1925, "Fiction", "A novel about the American Dream", 5, 5),
+        ("To Kill a Mockingbird", "Harper Lee", "9780061120084", 1960, "Fiction", "Classic novel of racial injustice", 3, 3),
+        ("1984", "George Orwell", "9780451524935", 1949, "Dystopian", "Dystopian social science fiction", 4, 4),
+        ("Pride and Prejudice", "Jane Austen", "9780141439518", 1813, "Romance", "A romantic novel of manners", 2, 2),
+        ("The Hobbit", "J.R.R. Tolkien", "9780547928227", 1937, "Fantasy", "Fantasy novel and prelude to Lord of the Rings", 3, 3),
+        ("The Catcher in the Rye", "J.D. Salinger", "9780316769488", 1951, "Fiction", "Story of teenage angst and alienation", 2, 2),
+        ("The Lord of the Rings", "J.R.R. Tolkien", "9780618640157", 1954, "Fantasy", "Epic high-fantasy novel", 3, 3),
+        ("Animal Farm", "George Orwell", "9780451526342", 1945, "Satire", "Allegorical novella", 4, 4),
+        ("The Da Vinci Code", "Dan Brown", "9780307474278", 2003, "Mystery", "Mystery thriller novel", 5, 5),
+        ("Harry Potter and the Sorcerer's Stone", "J.K. Rowling", "9780590353427", 1997, "Fantasy", "Fantasy novel", 6, 6)
+    ]
+
+    cursor.executemany("""
+        INSERT INTO Books (title, author, isbn, publication_year, genre, description, total_copies, available_copies)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """, sample_books)
+
+def normalize_book_isbns(cursor):
+    """Rewrite stored ISBNs in the bare ISBN-13 form searches look up
+
+    Values that aren't valid ISBNs, or whose normalized form another book
+    already has, are left as they are and reported for the librarian in one summary.
+    """
+    cursor.execute("SELECT book_id, isbn FROM Books WHERE isbn IS NOT NULL")
+    rows = cursor.fetchall()
+    taken = {isbn for _, isbn in rows}
+
+    updates = []
+    rejected = []
+    for book_id, isbn in rows:
+        normalized = normalize_isbn(isbn)
+        if normalized == isbn:
+            continue
+        if normalized is None or normalized in taken:
+            rejected.append(book_id)
+            continue
+        taken.add(normalized)
+        updates.append((normalized, book_id))
+
+    if rejected:
+        listed = ", ".join(str(book_id) for book_id in rejected[:ISBN_REPORT_LIMIT])
+        more = f" and {len(rejected) - ISBN_REPORT_LIMIT} more" if len(rejected) > ISBN_REPORT_LIMIT else ""
+        logger.warning("%d ISBNs left unchanged (invalid or duplicate) - book ids %s%s", len(rejected), listed, more)
+    if updates:
+        logger.info("Normalizing %d ISBNs...", len(updates))
+        cursor.executemany("UPDATE Books SET isbn = %s WHERE book_id = %s", updates)
+
+# ------------------- Migrations -------------------
+# (version, description, steps) - append new versions at the end, never edit an applied one
+MIGRATIONS = [
+    (1, "Baseline tables", [
+        per_backend(
+            mysql="""
+            CREATE TABLE IF NOT EXISTS Users (
+                user_id INT AUTO_INCREMENT PRIMARY KEY,
+                first_name VARCHAR(50) NOT NULL,
+                last_name VARCHAR(50) NOT NULL,
+                email VARCHAR(100) NOT NULL UNIQUE,
+                password VARCHAR(255) NOT NULL,
+                secret VARCHAR(50) NOT NULL,
+                role ENUM('member', 'admin') DEFAULT 'member',
+                registration_date DATE DEFAULT (CURRENT_DATE),
+                CONSTRAINT email_unique UNIQUE (email)
+            )
+            """,
+            sqlite="""
+            CREATE TABLE IF NOT EXISTS Users (
+                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                first_name VARCHAR(50) NOT NULL,
+                last_name VARCHAR(50) NOT NULL,
+                email VARCHAR(100) NOT NULL UNIQUE,
+                password VARCHAR(255) NOT NULL,
+                secret VARCHAR(50) NOT NULL,
+                role TEXT DEFAULT 'member' CHECK (role IN ('member', 'admin')),
+                registration_date DATE DEFAULT (CURRENT_DATE)
+            )
+            """,
+        ),
+        per_backend(
+            mysql="""
+            CREATE TABLE IF NOT EXISTS Books (
+                book_id INT AUTO_INCREMENT PRIMARY KEY,
+                title VARCHAR(255) NOT NULL,
+                author VARCHAR(100) NOT NULL,
+                isbn VARCHAR(20) UNIQUE,
+                publication_year INT,
+                genre VARCHAR(50),
+                description TEXT,
+                total_copies INT DEFAULT 1,
+                available_copies INT DEFAULT 1
+            )
+            """,
+            sqlite="""
+            CREATE TABLE IF NOT EXISTS Books (
+                book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title VARCHAR(255) NOT NULL,
+                author VARCHAR(100) NOT NULL,
+                isbn VARCHAR(20) UNIQUE,
+                publication_year INT,
+                genre VARCHAR(50),
+                description TEXT,
+                total_copies INT DEFAULT 1,
+                available_copies INT DEFAULT 1
+            )
+            """,
+        ),
+        per_backend(
+            mysql="""
+            CREATE TABLE IF NOT EXISTS Loans (
+                loan_id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id INT,
+                book_id INT,
+                loan_date DATE DEFAULT (CURRENT_DATE),
+                due_date DATE,
+                return_date DATE NULL,
+                FOREIGN KEY (user_id) REFERENCES Users(user_id),
+                FOREIGN KEY (book_id) REFERENCES Books(book_id)
+            )
+            """,
+            sqlite="""
+            CREATE TABLE IF NOT EXISTS Loans (
+                loan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INT REFERENCES Users(user_id),
+                book_id INT REFERENCES Books(book_id),
+                loan_date DATE DEFAULT (CURRENT_DATE),
+                due_date DATE,
+                return_date DATE NULL
+            )
+            """,
+        ),
+        per_backend(
+            mysql="""
+            CREATE TABLE IF NOT EXISTS Fines (
+                fine_id INT AUTO_INCREMENT PRIMARY KEY,
+                loan_id INT,
+                amount DECIMAL(10, 2) NOT NULL,
+                description VARCHAR(255),
+                paid BOOLEAN DEFAULT FALSE,
+                payment_date DATE NULL,
+                FOREIGN KEY (loan_id) REFERENCES Loans(loan_id)
+            )
+            """,
+            sqlite="""
+            CREATE TABLE IF NOT EXISTS Fines (
+                fine_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                loan_id INT REFERENCES Loans(loan_id),
+                amount DECIMAL(10, 2) NOT NULL,
+                description VARCHAR(255),
+                paid BOOLEAN DEFAULT 0,
+                payment_date DATE NULL
+            )
+            """,
+        ),
+        create_default_admin,
+        insert_sample_books,
+    ]),
+    (2, "Catalog search indexes", [
+        add_index("Books", "idx_books_title", "INDEX idx_books_title (title)"),
+        # InnoDB cannot build a FULLTEXT index with LOCK=NONE (SQLite skips it - search uses LIKE there)
+        add_index("Books", "ft_books_search", "FULLTEXT INDEX ft_books_search (title, author, genre, isbn)",
+                  online=False),
+    ]),
+    (3, "Loans and Fines lookup indexes", [
+        # Per-user open loans: dashboard counts, My Books, browse "already borrowed"
+        add_index("Loans", "idx_loans_user_open", "INDEX idx_loans_user_open (user_id, return_date, due_date, book_id)"),
+        # Open loans of one book: borrow check and the admin delete guard
+        add_index("Loans", "idx_loans_book_open", "INDEX idx_loans_book_open (book_id, return_date, user_id)"),
+        # Overdue scans across all users
+        add_index("Loans", "idx_loans_due", "INDEX idx_loans_due (due_date)"),
+        # Unpaid fine totals without touching the Fines rows
+        add_index("Fines", "idx_fines_loan_paid", "INDEX idx_fines_loan_paid (loan_id, paid, amount)"),
+    ]),
+    (4, "Normalized ISBNs", [
+        normalize_book_isbns,
+    ]),
+    (5, "Fines change tracking", [
+        # Every write to Fines takes the next number from the 'fines' counter and stamps the row
+        # with it (cancelled fines leave a tombstone instead), so the admin tables can fetch
+        # just the fines written after the last number they saw
+        """
+        CREATE TABLE IF NOT EXISTS ChangeCounters (
+            name VARCHAR(50) PRIMARY KEY,
+            value BIGINT NOT NULL DEFAULT 0
+        )
+        """,
+        per_backend(
+            mysql="INSERT IGNORE INTO ChangeCounters (name, value) VALUES ('fines', 0)",
+            sqlite="INSERT OR IGNORE INTO ChangeCounters (name, value) VALUES ('fines', 0)",
+        ),
+        add_column("Fines", "change_seq", "BIGINT NOT NULL DEFAULT 0"),
+        add_index("Fines", "idx_fines_change", "INDEX idx_fines_change (change_seq)"),
+        """
+        CREATE TABLE IF NOT EXISTS FineTombstones (
+            fine_id INT PRIMARY KEY,
+            change_seq BIGINT NOT NULL
+        )
+        """,
+        add_index("FineTombstones", "idx_fine_tombstones_change",
+                  "INDEX idx_fine_tombstones_change (change_seq)"),
+    ]),
+    (6, "Fines paging index", [
+        # The admin fines tabs page through "unpaid first, newest first" (or one paid status,
+        # newest first) - read straight off this index, so a page costs its own rows only
+        add_index("Fines", "idx_fines_paid_id", "INDEX idx_fines_paid_id (paid, fine_id DESC)"),
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Serializes migrations when two copies of the app start at the same time
+MIGRATION_LOCK = f"{DB_NAME}_schema_migration"
+MIGRATION_LOCK_TIMEOUT = 60
+
+# ------------------- Migration Runner -------------------
+def get_schema_version():
+    """Return the applied schema version in one query, or 0 if the database is not set up"""
+    try:
+        connection = get_pool().get_connection()
+        cursor = connection.cursor()
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        return cursor.fetchone()[0] or 0
+    except Exception:
+        # Missing database or missing schema_version table both mean "not migrated"
+        return 0
+    finally:
+        if 'connection' in locals() and connection.is_connected():
+            cursor.close()
+            connection.close()
+
+def verify_schema():
+    """Check that the database is at the latest schema version"""
+    return get_schema_version() >= LATEST_VERSION
+
+def run_step(cursor, step):
+    if callable(step):
+        step(cursor)
+    else:
+        cursor.execute(step)
+
+def migrate(target=None):
+    """Create the database if needed and apply every pending migration up to target (default: latest)"""
+    if target is None:
+        target = LATEST_VERSION
+
+    backend = get_backend()
+    try:
+        # The database itself may not exist yet
+        connection = backend.connect_for_migration()
+        cursor = connection.cursor()
+
+        if not backend.acquire_migration_lock(cursor, MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT):
+            messagebox.showerror("Database Setup Error", "Another copy of the application is upgrading the database")
+            return False
+
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+
+            cursor.execute("SELECT MAX(version) FROM schema_version")
+            current = cursor.fetchone()[0] or 0
+
+            for version, description, steps in MIGRATIONS:
+                if version <= current or version > target:
+                    continue
+
+                logger.info("Applying migration %s: %s", version, description)
+                for step in steps:
+                    run_step(cursor, step)
+
+                # DDL commits implicitly, so a version is only recorded once all its steps ran
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (version, description)
+                )
+                connection.commit()
+        finally:
+            backend.release_migration_lock(cursor, MIGRATION_LOCK)
+
+        return True
+    except backend.Error as err:
+        messagebox.showerror("Database Setup Error", f"Failed to set up database: {err}")
+        return False
+    finally:
+        if 'connection' in locals() and connection.is_connected():
+            cursor.close()
+            connection.close()
@@ -0,0 +1,237 @@
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from config import SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_LOG_FILE, QUERY_REPORT_FILE, EXPLAIN_CAPTURE_ENABLED
+from explain_capture import explain_once
+
+# ------------------- Query Shapes -------------------
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(sql):
+    """Reduce a statement to its shape: literals and placeholders become ?, whitespace collapses"""
+    if isinstance(sql, bytes):
+        sql = sql.decode("utf-8", "replace")
+    shape = _STRING_LITERAL.sub("?", sql)
+    shape = shape.replace("%s", "?")
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+# Frames in these files are plumbing, not the caller we want to report
+_PLUMBING_FILES = {"query_stats.py", "db_pool.py", "explain_capture.py"}
+# Likewise repository.py's statement helpers and the work functions and lambdas they run
+_PLUMBING_FUNCTIONS = {
+    "repository.py": {"fetch_all", "fetch_one", "fetch_value", "execute", "insert", "next_change",
+                      "add_fine_tombstones", "_read", "_query", "_query_one", "_query_value", "_transaction", "work", "<lambda>"},
+}
+
+def find_caller():
+    """Name of the function that issued the query, e.g. repository.BookRepository.search
+    or admin_dashboard.get_dashboard_stats"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        if filename not in _PLUMBING_FILES and code.co_name not in _PLUMBING_FUNCTIONS.get(filename, ()):
+            module = os.path.splitext(filename)[0]
+            return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return "unknown"
+
+# ------------------- Statistics Registry -------------------
+# Latency samples kept per shape for the p95 - old samples fall off the end
+SAMPLES_PER_SHAPE = 1000
+
+class QueryStats:
+    """Thread-safe per-shape counters shared by every instrumented cursor"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shapes = {}
+
+    def _entry(self, shape):
+        entry = self._shapes.get(shape)
+        if entry is None:
+            entry = {
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "rows": 0,
+                "samples": deque(maxlen=SAMPLES_PER_SHAPE),
+                "callers": Counter(),
+            }
+            self._shapes[shape] = entry
+        return entry
+
+    def record(self, shape, elapsed_ms, caller):
+        with self._lock:
+            entry = self._entry(shape)
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["samples"].append(elapsed_ms)
+            entry["callers"][caller] += 1
+
+    def add_rows(self, shape, rows):
+        with self._lock:
+            self._entry(shape)["rows"] += rows
+
+    def reset(self):
+        with self._lock:
+            self._shapes = {}
+
+    def report(self, sort_by="total_ms", limit=None):
+        """Per-shape summary rows, hottest first"""
+        with self._lock:
+            snapshot = [(shape, dict(entry, samples=list(entry["samples"]), callers=entry["callers"].copy()))
+                        for shape, entry in self._shapes.items()]
+
+        rows = []
+        for shape, entry in snapshot:
+            samples = entry["samples"]
+            if len(samples) >= 2:
+                p95 = statistics.quantiles(samples, n=20)[-1]
+            else:
+                p95 = samples[0] if samples else 0.0
+            rows.append({
+                "shape": shape,
+                "count": entry["count"],
+                "total_ms": round(entry["total_ms"], 3),
+                "avg_ms": round(entry["total_ms"] / entry["count"], 3),
+                "p95_ms": round(p95, 3),
+                "max_ms": round(entry["max_ms"], 3),
+                "rows": entry["rows"],
+                "callers": dict(entry["callers"].most_common()),
+            })
+
+        rows.sort(key=lambda row: row[sort_by], reverse=True)
+        return rows[:limit] if limit else rows
+
+_stats = QueryStats()
+_slow_log_lock = threading.Lock()
+
+def get_query_stats():
+    """The process-wide QueryStats registry"""
+    return _stats
+
+def log_slow_query(shape, elapsed_ms, caller):
+    """Append one JSON line to the slow-query log"""
+    record = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "ms": round(elapsed_ms, 3),
+        "caller": caller,
+        "shape": shape,
+    }
+    try:
+        with _slow_log_lock:
+            with open(SLOW_QUERY_LOG_FILE, "a") as f:
+                f.write(json.dumps(record) + "\n")
+    except OSError as err:
+        print(f"Could not write slow-query log: {err}")
+
+# ------------------- Instrumented Cursor -------------------
+class InstrumentedCursor:
+    """Cursor wrapper that times every execute and counts the rows fetched"""
+    def __init__(self, cursor, connection=None, stats=None):
+        self._cursor = cursor
+        self._connection = connection  # Used to EXPLAIN new shapes in diagnostic mode
+        self._stats = stats or _stats
+        self._shape = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._count_rows(1)
+            yield row
+
+    def _timed(self, method, operation, *args, **kwargs):
+        shape = normalize_sql(operation)
+        caller = find_caller()
+        start = time.perf_counter()
+        try:
+            return method(operation, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._shape = shape
+            self._stats.record(shape, elapsed_ms, caller)
+            if elapsed_ms >= SLOW_QUERY_THRESHOLD_MS:
+                log_slow_query(shape, elapsed_ms, caller)
+
+    def execute(self, operation, *args, **kwargs):
+        if EXPLAIN_CAPTURE_ENABLED and self._connection is not None:
+            params = args[0] if args else kwargs.get("params")
+            explain_once(self._connection, normalize_sql(operation), operation, params, find_caller())
+        return self._timed(self._cursor.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._timed(self._cursor.executemany, operation, *args, **kwargs)
+
+    def _count_rows(self, rows):
+        if self._shape is not None and rows:
+            self._stats.add_rows(self._shape, rows)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count_rows(len(rows))
+        return rows
+
+def instrument_cursor(cursor, connection=None):
+    """ConnectionPool cursor_wrapper hook"""
+    return InstrumentedCursor(cursor, connection)
+
+# ------------------- Reports -------------------
+def format_query_report(rows):
+    """Plain-text table of report rows"""
+    lines = [f"{'count':>7} {'total ms':>10} {'avg ms':>8} {'p95 ms':>8} {'rows':>8}  caller / query"]
+    for row in rows:
+        top_caller = next(iter(row["callers"]), "")
+        lines.append(
+            f"{row['count']:>7} {row['total_ms']:>10.1f} {row['avg_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+            f"{row['rows']:>8}  {top_caller}"
+        )
+        lines.append(f"{'':>46}{row['shape'][:120]}")
+    return "\n".join(lines)
+
+def write_query_report(path=QUERY_REPORT_FILE, sort_by="total_ms"):
+    """Save the current per-shape summary as JSON and return the rows"""
+    rows = _stats.report(sort_by=sort_by)
+    with open(path, "w") as f:
+        json.dump({"generated": datetime.now().isoformat(timespec="seconds"), "queries": rows}, f, indent=2)
+    return rows
+
+def print_query_report(limit=20, sort_by="total_ms"):
+    """Print the hottest query shapes seen so far in this process"""
+    print(format_query_report(_stats.report(sort_by=sort_by, limit=limit)))
+
+# ------------------- Main Execution -------------------
+if __name__ == "__main__":
+    # Summarize a report written by a previous run: python query_stats.py [report.json] [sort key]
+    path = sys.argv[1] if len(sys.argv) > 1 else QUERY_REPORT_FILE
+    sort_by = sys.argv[2] if len(sys.argv) > 2 else "total_ms"
+    with open(path) as f:
+        report = json.load(f)
+    rows = sorted(report["queries"], key=lambda row: row[sort_by], reverse=True)
+    print(f"Query report generated {report['generated']}")
+    print(format_query_report(rows[:20]))
@@ -0,0 +1,782 @@
+from datetime import date, timedelta
+
+from config import FINE_RATE_PER_DAY, LOAN_PERIOD_DAYS
+from db_backend import get_backend
+from utils import connect_db, show_error, hash_password, generate_secret
+from catalog import BOOK_LIST_COLUMNS, build_search_filter
+from isbn import normalize_isbn
+
+# ------------------- Statement Helpers -------------------
+# Every statement goes through PooledConnection.prepared(), so each distinct SQL string
+# is prepared once per pooled connection and re-executed from then on. Keep SQL text
+# constant (values always as %s parameters) or the cache can't reuse it.
+
+def fetch_all(connection, sql, params=()):
+    """Run a SELECT and return its rows as dicts"""
+    cursor = connection.prepared(sql)
+    cursor.execute(sql, params)
+    columns = cursor.column_names
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def fetch_one(connection, sql, params=()):
+    rows = fetch_all(connection, sql, params)
+    return rows[0] if rows else None
+
+def fetch_value(connection, sql, params=()):
+    """First column of the first row, or None"""
+    cursor = connection.prepared(sql)
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    return rows[0][0] if rows else None
+
+def execute(connection, sql, params=()):
+    """Run an INSERT/UPDATE/DELETE and return the number of rows it touched"""
+    cursor = connection.prepared(sql)
+    cursor.execute(sql, params)
+    return cursor.rowcount
+
+def insert(connection, sql, params=()):
+    """Run an INSERT and return the new row's id"""
+    cursor = connection.prepared(sql)
+    cursor.execute(sql, params)
+    return cursor.lastrowid
+
+def next_change(connection, counter):
+    """Claim the next number from a ChangeCounters row for this transaction's writes
+
+    The counter row stays locked until commit, so numbers become visible in the order
+    they were handed out and readers can safely ask for "everything after N".
+    """
+    execute(connection, "UPDATE ChangeCounters SET value = value + 1 WHERE name = %s", (counter,))
+    return fetch_value(connection, "SELECT value FROM ChangeCounters WHERE name = %s", (counter,))
+
+def order_clause(sort_columns, sort, descending, tiebreaker):
+    """ORDER BY for one of a table's sort keys - sort_columns maps keys to SQL, so no caller
+    text reaches the statement - with tiebreaker (the primary key) keeping pages stable"""
+    direction = "DESC" if descending else "ASC"
+    return f" ORDER BY {sort_columns[sort]} {direction}, {tiebreaker} {direction}"
+
+def limit_clause(limit, offset, params):
+    """LIMIT/OFFSET for one page (nothing when limit is None), appending to params"""
+    if limit is None:
+        return ""
+    params.append(limit)
+    if not offset:
+        return " LIMIT %s"
+    params.append(offset)
+    return " LIMIT %s OFFSET %s"
+
+# ------------------- Base Repository -------------------
+class Repository:
+    """Connection handling shared by the repositories
+
+    Reads show the error and return a default; writes return (success, message)
+    like the screen functions always have.
+    """
+    def _read(self, work, default):
+        connection = connect_db()
+        if not connection:
+            return default
+        try:
+            return work(connection)
+        except Exception as err:
+            show_error("Database Error", str(err))
+            return default
+        finally:
+            connection.close()
+
+    def _query(self, sql, params=(), default=None):
+        """One SELECT on a pooled connection - [] on failure"""
+        return self._read(lambda connection: fetch_all(connection, sql, params),
+                          [] if default is None else default)
+
+    def _query_one(self, sql, params=()):
+        return self._read(lambda connection: fetch_one(connection, sql, params), None)
+
+    def _query_value(self, sql, params=(), default=0):
+        return self._read(lambda connection: fetch_value(connection, sql, params) or default, default)
+
+    def _transaction(self, work):
+        """Run work(connection), committing only if it returns (True, message)"""
+        connection = connect_db()
+        if not connection:
+            return False, "Database connection failed"
+        try:
+            success, message = work(connection)
+            if success:
+                connection.commit()
+            else:
+                connection.rollback()
+            return success, message
+        except Exception as err:
+            return False, f"Database Error: {err}"
+        finally:
+            connection.close()
+
+# ------------------- Books -------------------
+def book_in_facets(book, category="", availability="", decade=None):
+    """Whether a book row passes the browse filters"""
+    if category and book["genre"] != category:
+        return False
+    if availability and (book["available_copies"] > 0) != (availability == "available"):
+        return False
+    if decade is not None and not (book["publication_year"] and decade <= book["publication_year"] < decade + 10):
+        return False
+    return True
+
+# Columns the admin books table can sort by
+BOOK_SORT_COLUMNS = {
+    "book_id": "b.book_id",
+    "title": "b.title",
+    "author": "b.author",
+    "genre": "b.genre",
+    "isbn": "b.isbn",
+    "publication_year": "b.publication_year",
+    "available_copies": "b.available_copies",
+    "total_copies": "b.total_copies",
+}
+
+class BookRepository(Repository):
+    """Catalog reads and admin writes
+
+    Listeners added with add_listener are called as listener(action, book_id, book)
+    after an add/update/delete commits - book is None for deletes - and with
+    action "copies" and {"available_copies": n} after a borrow or return. In-memory
+    structures built from the catalog use this to stay current.
+    """
+    def __init__(self):
+        self._listeners = []
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def copies_changed(self, book_id, available_copies):
+        """Tell listeners a loan moved a copy on or off the shelf"""
+        self._notify("copies", book_id, {"available_copies": available_copies})
+
+    def _notify(self, action, book_id, book=None):
+        for listener in self._listeners:
+            try:
+                listener(action, book_id, book)
+            except Exception as err:
+                # The write is already committed - a broken listener must not report it as failed
+                print(f"Catalog listener failed: {err}")
+
+    def search(self, search_term="", category="", limit=None, offset=0, after=None, with_total=False,
+               include_description=False, availability="", decade=None, sort=None, descending=False):
+        """Search the catalog, best matches first, falling back to title order
+
+        Any result can be paged with limit/offset. Unranked listings are ordered by
+        (title, book_id) and can instead seek with after=(title, book_id) of the
+        previous page's last row (after is ignored for ranked searches). Returns
+        (books, total) - total is None unless with_total.
+        
+        A search term that is a valid ISBN is a single lookup on the isbn index.
+        availability and decade are the browse facet filters (see build_search_filter).
+        sort (a BOOK_SORT_COLUMNS key) overrides both orders, ascending unless descending.
+        """
+        isbn = normalize_isbn(search_term)
+        if isbn:
+            book = self.by_isbn(isbn, include_description)
+            if book and not book_in_facets(book, category, availability, decade):
+                book = None
+            # The one match is on the first page only
+            results = [book] if book and not offset and not after else []
+            return results, (1 if book else 0) if with_total else None
+
+        where, params, score, score_params = build_search_filter(search_term, category,
+                                                                 fulltext=get_backend().supports_fulltext,
+                                                                 availability=availability, decade=decade)
+
+        columns = BOOK_LIST_COLUMNS
+        if include_description:
+            columns += ", b.description"
+
+        query_params = []
+        if score:
+            columns += f", {score} AS score"
+            query_params.extend(score_params)
+        query_params.extend(params)
+
+        query = f"SELECT {columns} FROM Books b {where}"
+
+        if sort:
+            query += order_clause(BOOK_SORT_COLUMNS, sort, descending, "b.book_id")
+        elif score:
+            query += " ORDER BY score DESC, b.title, b.book_id"
+        else:
+            if after:
+                # Seek past the previous page instead of using OFFSET
+                last_title, last_id = after
+                query += " AND (b.title > %s OR (b.title = %s AND b.book_id > %s))"
+                query_params.extend([last_title, last_title, last_id])
+            query += " ORDER BY b.title, b.book_id"
+
+        query += limit_clause(limit, offset, query_params)
+
+        def work(connection):
+            total = None
+            if with_total:
+                total = fetch_value(connection, f"SELECT COUNT(*) FROM Books b {where}", params)
+            return fetch_all(connection, query, query_params), total
+
+        return self._read(work, ([], 0))
+
+    def get(self, book_id):
+        """A single book including its description"""
+        return self._query_one(f"SELECT {BOOK_LIST_COLUMNS}, b.description FROM Books b WHERE b.book_id = %s",
+                               (book_id,))
+
+    def by_isbn(self, isbn, include_description=False):
+        """The book with this normalized ISBN, or None"""
+        columns = BOOK_LIST_COLUMNS + (", b.description" if include_description else "")
+        return self._query_one(f"SELECT {columns} FROM Books b WHERE b.isbn = %s", (isbn,))
+
+    def get_many(self, book_ids):
+        """List rows for these books, in the order given"""
+        if not book_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(book_ids))
+        rows = self._query(f"SELECT {BOOK_LIST_COLUMNS} FROM Books b WHERE b.book_id IN ({placeholders})",
+                           list(book_ids))
+        by_id = {row["book_id"]: row for row in rows}
+        return [by_id[book_id] for book_id in book_ids if book_id in by_id]
+
+    def categories(self):
+        """All distinct genres, alphabetically"""
+        rows = self._query("SELECT DISTINCT genre FROM Books ORDER BY genre")
+        return [row["genre"] for row in rows]
+
+    def total_copies(self):
+        return self._query_value("SELECT SUM(total_copies) FROM Books")
+
+    def genre_counts(self, limit=5):
+        """(genre, count) for the largest genres"""
+        rows = self._query("""
+            SELECT genre, COUNT(*) AS count
+            FROM Books
+            GROUP BY genre
+            ORDER BY count DESC
+            LIMIT %s
+        """, (limit,))
+        return [(row["genre"], row["count"]) for row in rows]
+
+    def add(self, title, author, genre, isbn, publication_year, total_copies, description=""):
+        isbn = normalize_isbn(isbn)
+        if not isbn:
+            return False, "Invalid ISBN: enter a valid ISBN-10 or ISBN-13"
+        added = {}
+
+        def work(connection):
+            if fetch_one(connection, "SELECT book_id FROM Books WHERE isbn = %s", (isbn,)):
+                return False, "A book with this ISBN already exists"
+
+            added["book_id"] = insert(connection, """
+                INSERT INTO Books (
+                    title, author, genre, isbn, publication_year,
+                    total_copies, available_copies, description
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            """, (title, author, genre, isbn, publication_year, total_copies, total_copies, description))
+            return True, "Book added successfully"
+
+        success, message = self._transaction(work)
+        if success:
+            self._notify("add", added["book_id"], {
+                "title": title, "author": author, "genre": genre, "isbn": isbn,
+                "publication_year": publication_year, "available_copies": total_copies,
+            })
+        return success, message
+
+    def update(self, book_id, title, author, genre, isbn, publication_year, total_copies, description=""):
+        isbn = normalize_isbn(isbn)
+        if not isbn:
+            return False, "Invalid ISBN: enter a valid ISBN-10 or ISBN-13"
+        updated = {}
+
+        def work(connection):
+            book = fetch_one(connection, "SELECT total_copies, available_copies FROM Books WHERE book_id = %s",
+                             (book_id,))
+            if not book:
+                return False, "Book not found"
+            if fetch_one(connection, "SELECT book_id FROM Books WHERE isbn = %s AND book_id <> %s",
+                         (isbn, book_id)):
+                return False, "A book with this ISBN already exists"
+
+            # Copies out on loan stay out - only the shelf count follows the new total
+            borrowed_copies = book["total_copies"] - book["available_copies"]
+            new_available = updated["available_copies"] = max(0, total_copies - borrowed_copies)
+
+            execute(connection, """
+                UPDATE Books SET
+                    title = %s, author = %s, genre = %s, isbn = %s,
+                    publication_year = %s, total_copies = %s,
+                    available_copies = %s, description = %s
+                WHERE book_id = %s
+            """, (title, author, genre, isbn, publication_year,
+                  total_copies, new_available, description, book_id))
+            return True, "Book updated successfully"
+
+        success, message = self._transaction(work)
+        if success:
+            self._notify("update", book_id, {
+                "title": title, "author": author, "genre": genre, "isbn": isbn,
+                "publication_year": publication_year, "available_copies": updated["available_copies"],
+            })
+        return success, message
+
+    def delete(self, book_id):
+        def work(connection):
+            if fetch_value(connection, "SELECT COUNT(*) FROM Loans WHERE book_id = %s AND return_date IS NULL",
+                           (book_id,)):
+                return False, "Cannot delete book: it is currently borrowed by users"
+
+            execute(connection, "DELETE FROM Books WHERE book_id = %s", (book_id,))
+            return True, "Book deleted successfully"
+
+        success, message = self._transaction(work)
+        if success:
+            self._notify("delete", book_id)
+        return success, message
+
+# ------------------- Loans -------------------
+def days_overdue(due_date, today=None):
+    today = today or date.today()
+    return max(0, (today - due_date).days) if due_date else 0
+
+class LoanRepository(Repository):
+    def active_for_user(self, user_id):
+        """Books the user has out, soonest due first, with the fine accrued so far"""
+        loans = self._query("""
+            SELECT
+                l.loan_id, b.book_id, b.title, b.author,
+                l.loan_date, l.due_date, l.return_date
+            FROM Loans l
+            JOIN Books b ON b.book_id = l.book_id
+            WHERE l.user_id = %s AND l.return_date IS NULL
+            ORDER BY l.due_date
+        """, (user_id,))
+
+        today = date.today()
+        for loan in loans:
+            loan["fine_amount"] = days_overdue(loan["due_date"], today) * FINE_RATE_PER_DAY
+        return loans
+
+    def history_for_user(self, user_id):
+        """Returned loans, newest first, with the fines paid on each"""
+        return self._query("""
+            SELECT
+                l.loan_id, b.book_id, b.title, b.author,
+                l.loan_date, l.return_date,
+                COALESCE(SUM(f.amount), 0.00) AS fine_paid
+            FROM Loans l
+            JOIN Books b ON b.book_id = l.book_id
+            LEFT JOIN Fines f ON f.loan_id = l.loan_id AND f.paid = 1
+            WHERE l.user_id = %s AND l.return_date IS NOT NULL
+            GROUP BY l.loan_id, b.book_id, b.title, b.author, l.loan_date, l.return_date
+            ORDER BY l.return_date DESC
+        """, (user_id,))
+
+    def borrowed_book_ids(self, user_id):
+        rows = self._query("SELECT book_id FROM Loans WHERE user_id = %s AND return_date IS NULL", (user_id,))
+        return {row["book_id"] for row in rows}
+
+    def user_summary(self, user_id):
+        """(books out, books overdue, unpaid fines) for one user"""
+        def work(connection):
+            books_borrowed = fetch_value(connection,
+                "SELECT COUNT(*) FROM Loans WHERE user_id = %s AND return_date IS NULL", (user_id,))
+            due_books = fetch_value(connection,
+                "SELECT COUNT(*) FROM Loans WHERE user_id = %s AND return_date IS NULL AND due_date < %s",
+                (user_id, date.today()))
+            pending_fines = fetch_value(connection, """
+                SELECT COALESCE(SUM(f.amount), 0)
+                FROM Fines f
+                JOIN Loans l ON f.loan_id = l.loan_id
+                WHERE l.user_id = %s AND f.paid = 0
+            """, (user_id,))
+            return books_borrowed or 0, due_books or 0, pending_fines or 0
+        return self._read(work, (0, 0, 0))
+
+    def open_count(self):
+        return self._query_value("SELECT COUNT(*) FROM Loans WHERE return_date IS NULL")
+
+    def recent_open(self, limit=5):
+        """Latest loans still out, across all users"""
+        return self._query("""
+            SELECT b.title, u.first_name, u.last_name, l.loan_date, l.due_date
+            FROM Loans l
+            JOIN Books b ON l.book_id = b.book_id
+            JOIN Users u ON l.user_id = u.user_id
+            WHERE l.return_date IS NULL
+            ORDER BY l.loan_date DESC
+            LIMIT %s
+        """, (limit,))
+
+    def borrow(self, book_id, user_id):
+        shelf = {}
+
+        def work(connection):
+            if fetch_value(connection,
+                    "SELECT COUNT(*) FROM Loans WHERE book_id = %s AND user_id = %s AND return_date IS NULL",
+                    (book_id, user_id)):
+                return False, "You already have this book borrowed"
+
+            # Take a copy only if one is left - the check and the decrement are one statement
+            if not execute(connection,
+                    "UPDATE Books SET available_copies = available_copies - 1 WHERE book_id = %s AND available_copies > 0",
+                    (book_id,)):
+                return False, "This book is currently unavailable"
+            shelf["available_copies"] = fetch_value(connection,
+                "SELECT available_copies FROM Books WHERE book_id = %s", (book_id,))
+
+            today = date.today()
+            execute(connection,
+                "INSERT INTO Loans (user_id, book_id, loan_date, due_date) VALUES (%s, %s, %s, %s)",
+                (user_id, book_id, today, today + timedelta(days=LOAN_PERIOD_DAYS)))
+            return True, "Book borrowed successfully"
+
+        success, message = self._transaction(work)
+        if success:
+            books.copies_changed(book_id, shelf["available_copies"])
+        return success, message
+
+    def return_book(self, loan_id, user_id):
+        """Close a loan, put the copy back and raise a fine if it came back late"""
+        shelf = {}
+
+        def work(connection):
+            loan = fetch_one(connection,
+                "SELECT book_id, due_date FROM Loans WHERE loan_id = %s AND user_id = %s AND return_date IS NULL",
+                (loan_id, user_id))
+            if not loan:
+                return False, "This loan was not found or has already been returned"
+
+            today = date.today()
+            execute(connection, "UPDATE Loans SET return_date = %s WHERE loan_id = %s", (today, loan_id))
+            execute(connection, "UPDATE Books SET available_copies = available_copies + 1 WHERE book_id = %s",
+                    (loan["book_id"],))
+            shelf["book_id"] = loan["book_id"]
+            shelf["available_copies"] = fetch_value(connection,
+                "SELECT available_copies FROM Books WHERE book_id = %s", (loan["book_id"],))
+
+            late_days = days_overdue(loan["due_date"], today)
+            if late_days:
+                execute(connection,
+                    "INSERT INTO Fines (loan_id, amount, description, paid, change_seq) VALUES (%s, %s, %s, 0, %s)",
+                    (loan_id, late_days * FINE_RATE_PER_DAY, f"Late return fine: {late_days} days",
+                     next_change(connection, FINES_COUNTER)))
+            return True, "Book returned successfully"
+
+        success, message = self._transaction(work)
+        if success:
+            books.copies_changed(shelf["book_id"], shelf["available_copies"])
+        return success, message
+
+# ------------------- Fines -------------------
+# Every write to Fines is stamped with a number from this counter (see FineRepository.changes_since)
+FINES_COUNTER = "fines"
+
+def add_fine_tombstones(connection, fine_ids, change_seq):
+    """Tell the fines tables (see FineRepository.changes_since) these fines are gone
+
+    A fine id MySQL < 8 hands out again after a restart replaces its old tombstone.
+    """
+    sql = get_backend().upsert_sql("FineTombstones", ("fine_id", "change_seq"), ("change_seq",))
+    for fine_id in fine_ids:
+        execute(connection, sql, (fine_id, change_seq))
+
+FINE_LIST_SQL = """
+    SELECT
+        f.fine_id, f.loan_id, f.amount, f.description, f.paid, f.payment_date,
+        b.title, u.first_name, u.last_name, u.email,
+        l.due_date, l.return_date
+    FROM Fines f
+    JOIN Loans l ON f.loan_id = l.loan_id
+    JOIN Books b ON l.book_id = b.book_id
+    JOIN Users u ON l.user_id = u.user_id
+"""
+
+# Columns the admin fines tables can sort by
+FINE_SORT_COLUMNS = {
+    "fine_id": "f.fine_id",
+    "title": "b.title",
+    "user": "u.last_name",
+    "email": "u.email",
+    "amount": "f.amount",
+    "description": "f.description",
+    "paid": "f.paid",
+    "date": "COALESCE(f.payment_date, l.due_date)",
+}
+
+class FineRepository(Repository):
+    def pending_for_user(self, user_id):
+        return self._query("""
+            SELECT
+                f.fine_id, f.loan_id, f.amount, f.description,
+                l.due_date, b.title, b.author, b.book_id
+            FROM Fines f
+            JOIN Loans l ON f.loan_id = l.loan_id
+            JOIN Books b ON l.book_id = b.book_id
+            WHERE l.user_id = %s AND f.paid = 0
+            ORDER BY f.fine_id DESC
+        """, (user_id,))
+
+    def paid_for_user(self, user_id):
+        return self._query("""
+            SELECT
+                f.fine_id, f.loan_id, f.amount, f.description,
+                f.payment_date, b.title, b.author
+            FROM Fines f
+            JOIN Loans l ON f.loan_id = l.loan_id
+            JOIN Books b ON l.book_id = b.book_id
+            WHERE l.user_id = %s AND f.paid = 1
+            ORDER BY f.payment_date DESC
+        """, (user_id,))
+
+    def fine_free_returns(self, user_id, limit=10):
+        """The user's latest returns that never got a fine"""
+        return self._query("""
+            SELECT l.loan_id, l.return_date, b.title, b.author
+            FROM Loans l
+            JOIN Books b ON l.book_id = b.book_id
+            LEFT JOIN Fines f ON l.loan_id = f.loan_id
+            WHERE l.user_id = %s AND l.return_date IS NOT NULL AND f.fine_id IS NULL
+            ORDER BY l.return_date DESC
+            LIMIT %s
+        """, (user_id, limit))
+
+    def search(self, paid=None, limit=None, offset=0, sort=None, descending=False):
+        """Fines with their borrower and book (only paid or unpaid ones if paid is given),
+        unpaid first unless sorted by a FINE_SORT_COLUMNS key"""
+        sql = FINE_LIST_SQL
+        params = []
+        if paid is not None:
+            sql += " WHERE f.paid = %s"
+            params.append(int(paid))
+        if sort:
+            sql += order_clause(FINE_SORT_COLUMNS, sort, descending, "f.fine_id")
+        else:
+            sql += " ORDER BY f.paid, f.fine_id DESC"
+        sql += limit_clause(limit, offset, params)
+        return self._query(sql, params)
+
+    def count(self, paid=None):
+        if paid is None:
+            return self._query_value("SELECT COUNT(*) FROM Fines")
+        return self._query_value("SELECT COUNT(*) FROM Fines WHERE paid = %s", (int(paid),))
+
+    def pending_total(self):
+        return self._query_value("SELECT COALESCE(SUM(amount), 0) FROM Fines WHERE paid = 0")
+
+    def latest_change(self):
+        """The newest fines change number - take it before reading, then ask changes_since for it"""
+        return self._query_value("SELECT value FROM ChangeCounters WHERE name = %s", (FINES_COUNTER,))
+
+    def changes_since(self, change_seq):
+        """What happened to fines after change number change_seq
+
+        Returns (fines written since, ids of fines cancelled since, latest change number).
+        The number is read first, so a write committing meanwhile may be returned now and
+        again next time - applying a change twice is harmless, missing one is not.
+        """
+        def work(connection):
+            latest = fetch_value(connection, "SELECT value FROM ChangeCounters WHERE name = %s",
+                                 (FINES_COUNTER,)) or 0
+            changed = fetch_all(connection, FINE_LIST_SQL + " WHERE f.change_seq > %s ORDER BY f.change_seq",
+                                (change_seq,))
+            cancelled = fetch_all(connection, "SELECT fine_id FROM FineTombstones WHERE change_seq > %s",
+                                  (change_seq,))
+            return changed, [row["fine_id"] for row in cancelled], latest
+        return self._read(work, ([], [], change_seq))
+
+    def pay(self, fine_id, user_id):
+        """A member pays one of their own fines"""
+        def work(connection):
+            paid = execute(connection, """
+                UPDATE Fines SET paid = 1, payment_date = %s, change_seq = %s
+                WHERE fine_id = %s AND paid = 0
+                  AND loan_id IN (SELECT loan_id FROM Loans WHERE user_id = %s)
+            """, (date.today(), next_change(connection, FINES_COUNTER), fine_id, user_id))
+            if not paid:
+                return False, "Fine not found or already paid"
+            return True, "Payment successful"
+        return self._transaction(work)
+
+    def pay_for_loan(self, loan_id, user_id):
+        """A member pays every outstanding fine on one of their loans"""
+        def work(connection):
+            paid = execute(connection, """
+                UPDATE Fines SET paid = 1, payment_date = %s, change_seq = %s
+                WHERE loan_id = %s AND paid = 0
+                  AND loan_id IN (SELECT loan_id FROM Loans WHERE user_id = %s)
+            """, (date.today(), next_change(connection, FINES_COUNTER), loan_id, user_id))
+            if not paid:
+                return False, "There are no unpaid fines for this loan"
+            return True, "Payment successful"
+        return self._transaction(work)
+
+    def mark_paid(self, fine_id):
+        """Admin records a payment taken at the desk"""
+        def work(connection):
+            fine = fetch_one(connection, "SELECT paid FROM Fines WHERE fine_id = %s", (fine_id,))
+            if not fine:
+                return False, "Fine not found"
+            if fine["paid"]:
+                return False, "This fine has already been paid"
+
+            execute(connection, "UPDATE Fines SET paid = 1, payment_date = %s, change_seq = %s WHERE fine_id = %s",
+                    (date.today(), next_change(connection, FINES_COUNTER), fine_id))
+            return True, "Fine marked as paid successfully"
+        return self._transaction(work)
+
+    def cancel(self, fine_id):
+        def work(connection):
+            if not execute(connection, "DELETE FROM Fines WHERE fine_id = %s", (fine_id,)):
+                return False, "Fine not found"
+            # Tables showing the fine learn it is gone from the tombstone
+            add_fine_tombstones(connection, [fine_id], next_change(connection, FINES_COUNTER))
+            return True, "Fine cancelled successfully"
+        return self._transaction(work)
+
+# ------------------- Users -------------------
+USER_COLUMNS = "user_id, first_name, last_name, email, role"
+
+# Columns the admin users table can sort by
+USER_SORT_COLUMNS = {
+    "user_id": "user_id",
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "email": "email",
+    "role": "role",
+    "registration_date": "registration_date",
+}
+
+def user_search_filter(search_term):
+    """WHERE clause and params for a name/email fragment"""
+    if not search_term:
+        return "", []
+    pattern = f"%{search_term}%"
+    return " WHERE first_name LIKE %s OR last_name LIKE %s OR email LIKE %s", [pattern, pattern, pattern]
+
+class UserRepository(Repository):
+    def authenticate(self, email, password, role=None):
+        """The user with these credentials (and role, if given), or None"""
+        sql = f"SELECT {USER_COLUMNS} FROM Users WHERE email = %s AND password = %s"
+        params = [email, hash_password(password)]
+        if role:
+            sql += " AND role = %s"
+            params.append(role)
+        return self._query_one(sql, params)
+
+    def get_profile(self, user_id):
+        return self._query_one(f"SELECT {USER_COLUMNS}, registration_date FROM Users WHERE user_id = %s",
+                               (user_id,))
+
+    def search(self, search_term="", limit=None, offset=0, sort=None, descending=False):
+        """Users matching a name/email fragment, newest first unless sorted by a USER_SORT_COLUMNS key"""
+        where, params = user_search_filter(search_term)
+        sql = f"SELECT {USER_COLUMNS}, registration_date FROM Users{where}"
+        if sort:
+            sql += order_clause(USER_SORT_COLUMNS, sort, descending, "user_id")
+        else:
+            sql += " ORDER BY registration_date DESC, user_id DESC"
+        sql += limit_clause(limit, offset, params)
+        return self._query(sql, params)
+
+    def count(self, search_term=""):
+        where, params = user_search_filter(search_term)
+        return self._query_value(f"SELECT COUNT(*) FROM Users{where}", params)
+
+    def create(self, first_name, last_name, email, password, role="member", secret=None):
+        """Register a user - accounts made without a secret key get a generated one"""
+        def work(connection):
+            if fetch_one(connection, "SELECT user_id FROM Users WHERE email = %s", (email,)):
+                return False, "A user with this email already exists"
+
+            execute(connection, """
+                INSERT INTO Users (first_name, last_name, email, password, secret, role, registration_date)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, (first_name, last_name, email, hash_password(password), secret or generate_secret(),
+                  role, date.today()))
+            return True, "User created successfully"
+        return self._transaction(work)
+
+    def update(self, user_id, first_name, last_name, email, role, new_password=None):
+        def work(connection):
+            if not fetch_one(connection, "SELECT user_id FROM Users WHERE user_id = %s", (user_id,)):
+                return False, "User not found"
+
+            if new_password:
+                execute(connection, """
+                    UPDATE Users SET first_name = %s, last_name = %s, email = %s, role = %s, password = %s
+                    WHERE user_id = %s
+                """, (first_name, last_name, email, role, hash_password(new_password), user_id))
+            else:
+                execute(connection, """
+                    UPDATE Users SET first_name = %s, last_name = %s, email = %s, role = %s
+                    WHERE user_id = %s
+                """, (first_name, last_name, email, role, user_id))
+            return True, "User updated successfully"
+        return self._transaction(work)
+
+    def update_profile(self, user_id, first_name, last_name, email, current_password=None, new_password=None):
+        """A member edits their own details, optionally changing password"""
+        def work(connection):
+            if current_password and new_password:
+                stored_hash = fetch_value(connection, "SELECT password FROM Users WHERE user_id = %s", (user_id,))
+                if stored_hash is None:
+                    return False, "User not found"
+                if stored_hash != hash_password(current_password):
+                    return False, "Current password is incorrect."
+
+                execute(connection,
+                    "UPDATE Users SET first_name = %s, last_name = %s, email = %s, password = %s WHERE user_id = %s",
+                    (first_name, last_name, email, hash_password(new_password), user_id))
+            else:
+                execute(connection,
+                    "UPDATE Users SET first_name = %s, last_name = %s, email = %s WHERE user_id = %s",
+                    (first_name, last_name, email, user_id))
+            return True, "Profile updated successfully"
+        return self._transaction(work)
+
+    def reset_password(self, email, secret, new_password):
+        """Set a new password for the account matching email and secret key"""
+        def work(connection):
+            user_id = fetch_value(connection, "SELECT user_id FROM Users WHERE email = %s AND secret = %s",
+                                  (email, secret))
+            if user_id is None:
+                return False, "Invalid email or secret key"
+
+            execute(connection, "UPDATE Users SET password = %s WHERE user_id = %s",
+                    (hash_password(new_password), user_id))
+            return True, "Password updated successfully"
+        return self._transaction(work)
+
+    def delete(self, user_id):
+        """Remove a user with their loan and fine history - refused while they have books out"""
+        def work(connection):
+            if fetch_value(connection, "SELECT COUNT(*) FROM Loans WHERE user_id = %s AND return_date IS NULL",
+                           (user_id,)):
+                return False, "Cannot delete user: they have active loans"
+
+            fine_ids = [row["fine_id"] for row in fetch_all(connection,
+                "SELECT fine_id FROM Fines WHERE loan_id IN (SELECT loan_id FROM Loans WHERE user_id = %s)",
+                (user_id,))]
+            if fine_ids:
+                execute(connection, "DELETE FROM Fines WHERE loan_id IN (SELECT loan_id FROM Loans WHERE user_id = %s)",
+                        (user_id,))
+                add_fine_tombstones(connection, fine_ids, next_change(connection, FINES_COUNTER))
+            execute(connection, "DELETE FROM Loans WHERE user_id = %s", (user_id,))
+            execute(connection, "DELETE FROM Users WHERE user_id = %s", (user_id,))
+            return True, "User deleted successfully"
+        return self._transaction(work)
+
+# ------------------- Shared Instances -------------------
+books = BookRepository()
+loans = LoanRepository()
+fines = FineRepository()
+users = UserRepository()
@@ -0,0 +1,130 @@
+import importlib
+import customtkinter as ctk
+from PIL import Image, ImageTk
+
+# Screen name -> (module, class or function that builds the screen into the window)
+SCREENS = {
+    "main": ("home", "LibraryManagementSystem"),
+    "login": ("auth", "login_window"),
+    "signup": ("auth", "signup_window"),
+    "admin_login": ("auth", "admin_window"),
+    "password_reset": ("auth", "password_reset_window"),
+    "dashboard": ("student.dashboard", "LibraryApp"),
+    "browse": ("student.browse", "BrowseBooksApp"),
+    "borrowed": ("student.borrowed", "BorrowedBooksApp"),
+    "fines": ("student.fines", "FinesPaymentApp"),
+    "profile": ("student.profile", "ProfileApp"),
+    "admin": ("admin.admin_dashboard", "LibraryAdminApp"),
+    "librarian": ("librarian.dashboard", "LibrarianApp"),
+}
+
+# ------------------- Screen Router -------------------
+class Router:
+    """The one application window; navigating swaps the screen inside it
+
+    The root, its Tk fonts and images, the background dispatcher, the connection
+    pool and the cached session live for the whole run; showing a screen only
+    destroys the previous screen's widgets.
+    A screen is built by calling SCREENS[name](root, *args, **kwargs); if it has a
+    close() method that is called before its widgets are destroyed.
+    """
+    def __init__(self):
+        self.root = None
+        self.running = False
+        self.screen = None
+        self.current = None
+        self.generation = 0  # Bumped on every show - a screen that navigates while building wins
+        self.images = {}
+        self.fonts = {}
+
+    def get_root(self):
+        """The application window, created on first use"""
+        if self.root is None:
+            ctk.set_appearance_mode("light")
+            ctk.set_default_color_theme("green")
+            self.root = ctk.CTk()
+            self.images = {}  # Images and fonts belong to the Tk interpreter of this root
+            self.fonts = {}
+        return self.root
+
+    def show(self, name, *args, **kwargs):
+        """Replace the screen in the window with screen name"""
+        module_name, attribute = SCREENS[name]
+        builder = getattr(importlib.import_module(module_name), attribute)
+
+        root = self.get_root()
+        self.clear()
+        self.generation += 1
+        generation = self.generation
+        self.current = name
+        screen = builder(root, *args, **kwargs)
+        if generation == self.generation:
+            self.screen = screen
+
+    def clear(self):
+        """Tear down the screen on show, leaving the window as a fresh root would be"""
+        close = getattr(self.screen, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                print(f"Error closing screen: {e}")
+        self.screen = None
+
+        root = self.root
+        for widget in root.winfo_children():
+            widget.destroy()
+
+        # Undo layout and window settings a screen may have made on the root itself
+        columns, rows = root.grid_size()
+        for column in range(columns):
+            root.grid_columnconfigure(column, weight=0, minsize=0)
+        for row in range(rows):
+            root.grid_rowconfigure(row, weight=0, minsize=0)
+        root.resizable(True, True)
+
+    def run(self):
+        """Run the event loop until the window is closed"""
+        self.running = True
+        try:
+            self.root.mainloop()
+        finally:
+            self.running = False
+            self.root = None
+            self.screen = None
+            self.current = None
+
+_router = Router()
+
+def get_router():
+    """Return the process-wide router"""
+    return _router
+
+def show_screen(name, *args, **kwargs):
+    """Show a screen in the application window, starting the event loop if it is not running yet"""
+    _router.show(name, *args, **kwargs)
+    if not _router.running and _router.root is not None:
+        _router.run()
+
+# ------------------- Shared Resources -------------------
+def load_image(path, size):
+    """A PhotoImage of the image at path resized to size, loaded once per window"""
+    key = (path, tuple(size))
+    image = _router.images.get(key)
+    if image is None:
+        image = ImageTk.PhotoImage(Image.open(path).resize(size), master=_router.get_root())
+        _router.images[key] = image
+    return image
+
+def shared_font(size, weight="normal", family=None):
+    """A CTkFont kept for the whole session, for chrome rebuilt on every navigation"""
+    key = (size, weight, family)
+    font = _router.fonts.get(key)
+    if font is None:
+        _router.get_root()
+        if family:
+            font = ctk.CTkFont(family=family, size=size, weight=weight)
+        else:
+            font = ctk.CTkFont(size=size, weight=weight)
+        _router.fonts[key] = font
+    return font
@@ -1,180 +1,32 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import customtkinter as ctk
-from datetime import datetime
 
-from utils import connect_db, load_user_session, clear_user_session, format_date, is_overdue, format_currency
+from utils import load_user_session, clear_user_session, format_date, is_overdue, format_currency
+from repository import loans, fines
+from background import run_in_background
+from router import show_screen, shared_font
 
 # ------------------- Loan Functions -------------------
 def get_active_loans(user_id):
     """Get all active loans for a user"""
-    connection = connect_db()
-    if not connection:
-        return []
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT 
-                l.loan_id,
-                b.book_id, 
-                b.title, 
-                b.author, 
-                l.loan_date, 
-                l.due_date,
-                CASE 
-                    WHEN l.due_date < CURDATE() THEN 
-                        DATEDIFF(CURDATE(), l.due_date) * 0.5
-                    ELSE 0.00
-                END AS fine_amount
-            FROM 
-                Books b
-            JOIN 
-                Loans l ON b.book_id = l.book_id
-            WHERE 
-                l.user_id = %s AND
-                l.return_date IS NULL
-            ORDER BY 
-                l.due_date
-        """, (user_id,))
-        
-        return cursor.fetchall()
-    except Exception as err:
-        messagebox.showerror("Database Error", str(err))
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return loans.active_for_user(user_id)
 
 def get_loan_history(user_id):
     """Get loan history for a user"""
-    connection = connect_db()
-    if not connection:
-        return []
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT 
-                l.loan_id,
-                b.book_id, 
-                b.title, 
-                b.author, 
-                l.loan_date, 
-                l.return_date,
-                COALESCE(SUM(f.amount), 0.00) AS fine_paid
-            FROM 
-                Books b
-            JOIN 
-                Loans l ON b.book_id = l.book_id
-            LEFT JOIN 
-                Fines f ON l.loan_id = f.loan_id AND f.paid = 1
-            WHERE 
-                l.user_id = %s AND
-                l.return_date IS NOT NULL
-            GROUP BY
-                l.loan_id
-            ORDER BY 
-                l.return_date DESC
-        """, (user_id,))
-        
-        return cursor.fetchall()
-    except Exception as err:
-        messagebox.showerror("Database Error", str(err))
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return loans.history_for_user(user_id)
 
 def return_book(loan_id, user_id):
-    """Return a borrowed book"""
-    connection = connect_db()
-    if not connection:
-        return False
-    
-    try:
-        cursor = connection.cursor()
-        
-        # First get the book_id and due_date for this loan
-        cursor.execute("SELECT book_id, due_date FROM Loans WHERE loan_id = %s", (loan_id,))
-        loan_data = cursor.fetchone()
-        
-        if loan_data:
-            book_id, due_date = loan_data
-            
-            # Update loan return date
-            cursor.execute(
-                "UPDATE Loans SET return_date = CURDATE() WHERE loan_id = %s AND user_id = %s", 
-                (loan_id, user_id)
-            )
-            
-            # Increment available copies
-            cursor.execute(
-                "UPDATE Books SET available_copies = available_copies + 1 WHERE book_id = %s", 
-                (book_id,)
-            )
-            
-            # Check if book is overdue and create fine if needed
-            if due_date < datetime.now().date():
-                days_overdue = (datetime.now().date() - due_date).days
-                fine_amount = days_overdue * 0.50  # $0.50 per day
-                
-                # Create fine record
-                cursor.execute(
-                    "INSERT INTO Fines (loan_id, amount, description, paid) VALUES (%s, %s, %s, 0)",
-                    (loan_id, fine_amount, f"Late return fine: {days_overdue} days")
-                )
-            
-            connection.commit()
-            return True
-        return False
-    except Exception as err:
-        messagebox.showerror("Database Error", str(err))
-        return False
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    """Return a borrowed book - (success, message)"""
+    return loans.return_book(loan_id, user_id)
 
 def pay_fine(loan_id, user_id):
-    """Pay fine for an overdue book"""
-    connection = connect_db()
-    if not connection:
-        return False
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Check if there are unpaid fines for this loan
-        cursor.execute(
-            "SELECT fine_id FROM Fines WHERE loan_id = %s AND paid = 0", 
-            (loan_id,)
-        )
-        
-        fine_ids = [row[0] for row in cursor.fetchall()]
-        
-        if fine_ids:
-            # Update all fines as paid
-            for fine_id in fine_ids:
-                cursor.execute(
-                    "UPDATE Fines SET paid = 1, payment_date = CURDATE() WHERE fine_id = %s", 
-                    (fine_id,)
-                )
-            
-            connection.commit()
-            return True
-        return False
-    except Exception as err:
-        messagebox.showerror("Database Error", str(err))
-        return False
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    """Pay every outstanding fine on a loan - (success, message)"""
+    return fines.pay_for_loan(loan_id, user_id)
+
+def get_borrowed_page_data(user_id):
+    """Run the two queries behind the My Books page: (active loans, loan history)"""
+    return get_active_loans(user_id), get_loan_history(user_id)
 
 # ------------------- UI Class -------------------
 class BorrowedBooksApp:
@@ -219,14 +71,14 @@ class BorrowedBooksApp:
         sidebar.grid_propagate(False)  # Prevent the frame from shrinking
 
         # Sidebar Title
-        title_label = ctk.CTkLabel(sidebar, text="📑 Library System", font=ctk.CTkFont(size=16, weight="bold"), 
+        title_label = ctk.CTkLabel(sidebar, text="📑 Library System", font=shared_font(size=16, weight="bold"), 
                                   text_color="white", anchor="w", padx=10, pady=10)
         title_label.pack(fill="x", pady=(20, 10))
         
         # User welcome message
         user_welcome = ctk.CTkLabel(sidebar, 
                                  text=f"Welcome,\n{self.user['first_name']} {self.user['last_name']}", 
-                                 font=ctk.CTkFont(size=12, weight="bold"), 
+                                 font=shared_font(size=12, weight="bold"), 
                                  text_color="white", anchor="w", padx=10, pady=10)
         user_welcome.pack(fill="x", pady=(0, 20))
         
@@ -246,12 +98,12 @@ class BorrowedBooksApp:
 
         for text, command in menu_items:
             if command:  # Regular button
-                button = ctk.CTkButton(sidebar, text=text, font=ctk.CTkFont(size=12), 
+                button = ctk.CTkButton(sidebar, text=text, font=shared_font(size=12), 
                                      fg_color="transparent", text_color="white", anchor="w",
                                      hover_color="#0d4f29", corner_radius=0, height=40,
                                      command=command)
             else:  # Current page (highlight)
-                button = ctk.CTkButton(sidebar, text=text, font=ctk.CTkFont(size=12), 
+                button = ctk.CTkButton(sidebar, text=text, font=shared_font(size=12), 
                                      fg_color="#0d4f29", text_color="white", anchor="w",
                                      hover_color="#0d4f29", corner_radius=0, height=40)
             button.pack(fill="x", pady=2)
@@ -357,16 +209,34 @@ class BorrowedBooksApp:
             self.history_tree.heading(col, text=col)
     
     def load_data(self):
-        """Load borrowed books and history data"""
-        # Clear existing data
+        """Load borrowed books and history data in the background"""
+        self.clear_tables()
+        self.loan_ids = {}
+        
+        # Placeholder rows until the queries return
+        self.current_tree.insert("", "end", values=("Loading...", "", "", "", "", ""))
+        self.history_tree.insert("", "end", values=("Loading...", "", "", "", ""))
+        
+        run_in_background(self.current_tree, get_borrowed_page_data, self.user['user_id'],
+                          on_success=self.show_data, group="loans")
+    
+    def clear_tables(self):
+        """Remove all rows and the action buttons placed over the active loans table"""
+        for widget in self.current_tree.winfo_children():
+            widget.destroy()
+        
         for item in self.current_tree.get_children():
             self.current_tree.delete(item)
         
         for item in self.history_tree.get_children():
             self.history_tree.delete(item)
+    
+    def show_data(self, data):
+        """Display the loans returned by get_borrowed_page_data"""
+        loans, history = data
+        self.clear_tables()
         
         # Load active loans
-        loans = get_active_loans(self.user['user_id'])
         self.loan_ids = {}
         
         for loan in loans:
@@ -398,8 +268,6 @@ class BorrowedBooksApp:
             ))
         
         # Load loan history
-        history = get_loan_history(self.user['user_id'])
-        
         for record in history:
             loan_date = format_date(record['loan_date'])
             return_date = format_date(record['return_date'])
@@ -483,12 +351,16 @@ class BorrowedBooksApp:
         
         result = messagebox.askyesno("Confirm Return", "Are you sure you want to return this book?")
         if result:
-            success = return_book(loan_id, self.user['user_id'])
-            if success:
-                messagebox.showinfo("Success", "Book returned successfully!")
-                self.load_data()  # Refresh data
-            else:
-                messagebox.showerror("Error", "Failed to return book.")
+            run_in_background(self.current_tree, return_book, loan_id, self.user['user_id'],
+                              on_success=self.on_return_done)
+    
+    def on_return_done(self, result):
+        success, message = result
+        if success:
+            messagebox.showinfo("Success", "Book returned successfully!")
+            self.load_data()  # Refresh data
+        else:
+            messagebox.showerror("Error", f"Failed to return book: {message}")
     
     def pay_fine_action(self, tree_item):
         """Handle pay fine action"""
@@ -501,36 +373,32 @@ class BorrowedBooksApp:
         
         result = messagebox.askyesno("Confirm Payment", f"Pay fine of {fine_amount}?")
         if result:
-            success = pay_fine(loan_id, self.user['user_id'])
-            if success:
-                messagebox.showinfo("Success", "Fine paid successfully!")
-                self.load_data()  # Refresh data
-            else:
-                messagebox.showerror("Error", "Failed to process payment.")
+            run_in_background(self.current_tree, pay_fine, loan_id, self.user['user_id'],
+                              on_success=self.on_payment_done)
+    
+    def on_payment_done(self, result):
+        success, message = result
+        if success:
+            messagebox.showinfo("Success", "Fine paid successfully!")
+            self.load_data()  # Refresh data
+        else:
+            messagebox.showerror("Error", f"Failed to process payment: {message}")
     
     def open_dashboard(self):
         """Open the dashboard page"""
-        self.root.destroy()
-        from student.dashboard import run_dashboard
-        run_dashboard()
+        show_screen("dashboard")
     
     def open_search(self):
         """Open the search books page"""
-        self.root.destroy()
-        from student.browse import run_browse
-        run_browse()
+        show_screen("browse")
     
     def open_fines(self):
         """Open the fines page"""
-        self.root.destroy()
-        from student.fines import run_fines
-        run_fines()
+        show_screen("fines")
     
     def open_profile(self):
         """Open the profile page"""
-        self.root.destroy()
-        from student.profile import run_profile
-        run_profile()
+        show_screen("profile")
     
     def logout(self):
         """Logout and return to login page"""
@@ -538,12 +406,8 @@ class BorrowedBooksApp:
             # Clear the session
             clear_user_session()
             
-            # Close current window
-            self.root.destroy()
-            
-            # Open login page
-            import os
-            os.system("python auth.py")
+            # Back to the login page, in the same window
+            show_screen("login")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to logout: {e}")
             self.root.destroy()
@@ -551,9 +415,7 @@ class BorrowedBooksApp:
 # ------------------- Run Function -------------------
 def run_borrowed():
     """Run the borrowed books application"""
-    root = ctk.CTk()
-    app = BorrowedBooksApp(root)
-    root.mainloop()
+    show_screen("borrowed")
 
 # ------------------- Main Execution -------------------
 if __name__ == "__main__":
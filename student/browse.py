@@ -1,156 +1,418 @@
 import tkinter as tk
-from tkinter import messagebox
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import os
 import math
+from collections import OrderedDict
 from datetime import datetime
 
-from utils import connect_db, load_user_session, clear_user_session
+from config import SEARCH_DEBOUNCE_MS, AUTOCOMPLETE_MIN_CHARS, AUTOCOMPLETE_MAX_SUGGESTIONS, SCROLL_WINDOW_SIZE, SCROLL_MAX_WINDOWS
+from utils import load_user_session, clear_user_session, show_error
+from repository import books, loans
+from catalog_index import get_catalog_index, warm_catalog_index
+from catalog_facets import get_facet_index, warm_facet_index, bitmap_from_ids
+from catalog_cache import page_cache, catalog_version
+from isbn import normalize_isbn
+from background import run_in_background, get_dispatcher
+from router import show_screen, shared_font
 
 # ------------------- Book Functions -------------------
 
 def get_books(search_term="", category=""):
     """Get books from database with optional search and category filters"""
-    connection = connect_db()
-    if not connection:
-        return []
+    results, _ = books.search(search_term, category, include_description=True)
+    return results
+
+def get_books_page(search_term="", category="", availability="", decade=None, limit=6, after=None, offset=0,
+                   with_total=False):
+    """Get one page of books plus, if with_total is set, the number of matches and facet counts
+    
+    Returns (books, total, facets) - facets is {facet: {value: count}} for the genre,
+    availability and decade filters, or None when not asked for or not available.
+    Searches come from the catalog index, best matches first, and are paged by
+    offset; plain listings are in (title, book_id) order and seek past after,
+    the last key of the previous page. Pages are served from page_cache until
+    the catalog next changes.
+    """
+    key = (" ".join(search_term.lower().split()), category, availability, decade, limit, after, offset, with_total)
+    found, page = page_cache.get(key)
+    if found:
+        return page
+    
+    version = catalog_version()
+    page = read_books_page(search_term, category, availability, decade, limit, after, offset, with_total)
+    if page[0]:  # An empty page may be a failed read - don't pin it
+        page_cache.put(key, version, page)
+    return page
+
+def read_books_page(search_term, category, availability, decade, limit, after, offset, with_total):
+    """get_books_page without the cache"""
+    filters = {"genre": category, "availability": availability, "decade": decade}
     
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        query = """
-            SELECT 
-                b.book_id, 
-                b.title, 
-                b.author, 
-                b.genre,
-                b.publication_year,
-                b.available_copies,
-                b.total_copies,
-                b.isbn,
-                b.description
-            FROM 
-                Books b
-            WHERE 1=1
-        """
-        
-        params = []
-        
-        if search_term:
-            query += """ AND (
-                b.title LIKE %s OR 
-                b.author LIKE %s OR 
-                b.genre LIKE %s OR
-                b.isbn LIKE %s
-            )"""
-            search_param = f"%{search_term}%"
-            params.extend([search_param, search_param, search_param, search_param])
-        
-        if category:
-            query += " AND b.genre = %s"
-            params.append(category)
-        
-        query += " ORDER BY b.title"
-        
-        cursor.execute(query, params)
-        return cursor.fetchall()
-    except Exception as err:
-        messagebox.showerror("Database Error", str(err))
+    if search_term.strip() and not normalize_isbn(search_term):
+        # Searches are answered from the in-memory indexes; only the page's rows come from the database
+        # (an ISBN goes straight to the isbn index instead)
+        index = get_catalog_index()
+        facet_index = get_facet_index()
+        if index is not None and facet_index is not None:
+            matches = index.match(search_term)
+            filtered = facet_index.filter_ids(matches, **filters)
+            results = books.get_many(index.rank(search_term, filtered, limit, offset))
+            if not with_total:
+                return results, None, None
+            return results, len(filtered), facet_index.counts(bitmap_from_ids(matches), **filters)
+    
+    results, total = books.search(search_term, category, limit=limit, offset=offset, after=after,
+                                  with_total=with_total, availability=availability, decade=decade)
+    facets = None
+    if with_total and not search_term.strip():
+        facet_index = get_facet_index()
+        if facet_index is not None:
+            facets = facet_index.counts(**filters)
+    return results, total, facets
+
+def get_suggested_page(search_term, category="", availability="", decade=None, limit=6):
+    """For a search that found nothing: (respelled search, first page, total, facets), or None
+    
+    Respellings are tried closest first and the first that finds books wins.
+    """
+    index = get_catalog_index()
+    if index is None:
+        return None
+    for suggestion in index.suggest(search_term):
+        results, total, facets = get_books_page(suggestion, category, availability, decade, limit=limit,
+                                                with_total=True)
+        if total:
+            return suggestion, results, total, facets
+    return None
+
+def get_completions(search_term):
+    """Completions of the word being typed in the search box (none until the index is loaded)"""
+    words = search_term.split()
+    if not words or len(words[-1]) < AUTOCOMPLETE_MIN_CHARS:
         return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    index = get_catalog_index()
+    if index is None:
+        return []
+    return index.complete(search_term, limit=AUTOCOMPLETE_MAX_SUGGESTIONS)
+
+def get_book_description(book_id):
+    """Get the description of a single book"""
+    book = books.get(book_id)
+    return book["description"] if book else None
 
 def get_book_categories():
-    """Get all unique book categories/genres"""
-    connection = connect_db()
-    if not connection:
-        return []
+    """Get all unique book categories/genres (from the facet index when it is loaded)"""
+    facet_index = get_facet_index()
+    if facet_index is not None:
+        return facet_index.values("genre")
+    return books.categories()
+
+def get_borrowed_book_ids(user_id):
+    """Get the set of book_ids the user currently has on loan (one query for the whole page)"""
+    return loans.borrowed_book_ids(user_id)
+
+def borrow_book(book_id, user_id):
+    """Borrow a book"""
+    return loans.borrow(book_id, user_id)
+
+# ------------------- Book Card -------------------
+class BookCard:
+    """A book card built once and refilled with show() as pages change
     
-    try:
-        cursor = connection.cursor()
+    Creating CTk widgets (and their fonts) is what makes a page flip slow, so the
+    browse grid keeps one card per slot and only reconfigures what changed.
+    """
+    def __init__(self, parent, fonts, on_borrow, on_details):
+        self.book = None
+        self._applied = {}  # widget name -> options last passed to configure
+        
+        # Create a book card frame with white background and slight shadow
+        self.frame = ctk.CTkFrame(
+            parent,
+            width=350,
+            height=200,
+            fg_color="white",
+            corner_radius=10,
+            border_width=1,
+            border_color="#cccccc"
+        )
+        self.frame.grid_propagate(False)  # Prevent frame from shrinking
         
-        cursor.execute("SELECT DISTINCT genre FROM Books ORDER BY genre")
+        self.widgets = {}
+        for name, font, color, y in (("title", "title", "#000000", 15), ("author", "body", "#444444", 45),
+                                     ("genre", "body", "#444444", 75), ("year", "body", "#444444", 105)):
+            label = ctk.CTkLabel(self.frame, text="", font=fonts[font], anchor="w", text_color=color)
+            label.place(x=15, y=y)
+            self.widgets[name] = label
         
-        # Extract first element from each tuple in result
-        return [category[0] for category in cursor.fetchall()]
-    except Exception as err:
-        messagebox.showerror("Database Error", str(err))
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def is_book_borrowed_by_user(book_id, user_id):
-    """Check if a user has already borrowed a specific book"""
-    connection = connect_db()
-    if not connection:
-        return False
-    
-    try:
-        cursor = connection.cursor()
-        
-        cursor.execute(
-            "SELECT COUNT(*) FROM Loans WHERE book_id = %s AND user_id = %s AND return_date IS NULL", 
-            (book_id, user_id)
+        # Status with colored indicator
+        ctk.CTkLabel(
+            self.frame,
+            text="Status: ",
+            font=fonts["body"],
+            anchor="w",
+            text_color="#444444"
+        ).place(x=15, y=135)
+        
+        self.widgets["status"] = ctk.CTkLabel(self.frame, text="", font=fonts["bold"])
+        self.widgets["status"].place(x=70, y=135)
+        
+        self.widgets["copies"] = ctk.CTkLabel(self.frame, text="", font=fonts["small"], text_color="#777777")
+        self.widgets["copies"].place(x=200, y=135)
+        
+        # Action button - its look and command depend on the book shown
+        self.widgets["action"] = ctk.CTkButton(
+            self.frame,
+            text="",
+            font=fonts["body"],
+            width=120,
+            height=30,
+            corner_radius=15,
+            command=lambda: on_borrow(self.book["book_id"])
         )
+        self.widgets["action"].place(x=15, y=165)
         
-        return cursor.fetchone()[0] > 0
-    except Exception as err:
-        print(f"Database Error: {err}")
-        return False
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
-
-def borrow_book(book_id, user_id):
-    """Borrow a book"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
+        # Details button
+        ctk.CTkButton(
+            self.frame,
+            text="View Details",
+            font=fonts["body"],
+            fg_color="#f0f0f0",
+            text_color="#116636",
+            hover_color="#e0e0e0",
+            width=100,
+            height=30,
+            corner_radius=15,
+            command=lambda: on_details(self.book)
+        ).place(x=145, y=165)
+    
+    def _configure(self, name, **options):
+        """configure() a widget only if its options changed - each call redraws it"""
+        if self._applied.get(name) != options:
+            self.widgets[name].configure(**options)
+            self._applied[name] = options
+    
+    def show(self, book, already_borrowed, row, col):
+        """Fill the card with book and put it in the grid at (row, col)"""
+        self.fill(book, already_borrowed)
+        self.frame.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
     
-    try:
-        cursor = connection.cursor()
+    def fill(self, book, already_borrowed):
+        """Show book on the card without moving it"""
+        self.book = book
+        is_available = book["available_copies"] > 0
+        
+        self._configure("title", text=book["title"])
+        self._configure("author", text=f"Author: {book['author']}")
+        self._configure("genre", text=f"Genre: {book['genre']}")
+        self._configure("year", text=f"Year: {book['publication_year']}")
+        
+        if is_available:
+            self._configure("status", text="Available", text_color="#4CAF50")  # Green
+        else:
+            self._configure("status", text="Unavailable", text_color="#F44336")  # Red
+        self._configure("copies", text=f"Copies: {book['available_copies']}/{book['total_copies']}")
         
-        # Check if user already has this book
-        cursor.execute(
-            "SELECT COUNT(*) FROM Loans WHERE book_id = %s AND user_id = %s AND return_date IS NULL", 
-            (book_id, user_id)
+        if already_borrowed:
+            # Already borrowed - show indicator
+            self._configure("action", text="✓ Borrowed", fg_color="#8bc34a", text_color="white",
+                            hover_color="#7cb342", state="disabled")
+        elif is_available:
+            self._configure("action", text="Borrow Book", fg_color="#116636", text_color="white",
+                            hover_color="#0d4f29", state="normal")
+        else:
+            self._configure("action", text="Unavailable", fg_color="#cccccc", text_color="#777777",
+                            hover_color="#bbbbbb", state="disabled")
+    
+    def hide(self):
+        manager = self.frame.winfo_manager()
+        if manager == "grid":
+            self.frame.grid_remove()
+        elif manager == "place":
+            self.frame.place_forget()
+
+# ------------------- Virtual Grid -------------------
+CARD_HEIGHT = 200
+ROW_HEIGHT = CARD_HEIGHT + 20  # Card plus its padding
+
+class VirtualBookGrid:
+    """Scrolling grid over a whole result set that only has cards for the rows on screen
+    
+    Cards are placed by hand at their scroll position and refilled as rows scroll
+    past, so the widget count depends on the window height, never on the number
+    of results. Books are fetched SCROLL_WINDOW_SIZE at a time by offset, and only
+    the SCROLL_MAX_WINDOWS most recently used windows are kept.
+    """
+    def __init__(self, parent, app, cols=3):
+        self.app = app
+        self.cols = cols
+        
+        self.frame = ctk.CTkFrame(parent, fg_color="transparent")
+        self.viewport = ctk.CTkFrame(self.frame, fg_color="transparent")
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.scrollbar = ctk.CTkScrollbar(self.frame, command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        
+        self.cards = []  # One per visible slot
+        self.windows = OrderedDict()  # window number -> books, least recently used first
+        self.pending = set()  # Window numbers being fetched
+        self.total = 0
+        self.top = 0  # Pixels scrolled
+        self.generation = 0  # Bumped by reset() so windows of an older query are dropped
+        
+        self.viewport.bind("<Configure>", lambda event: self.render())
+    
+    # ---- data ----
+    def reset(self):
+        """Start over for the app's current search and filters"""
+        self.generation += 1
+        self.windows.clear()
+        self.pending.clear()
+        self.total = 0
+        self.top = 0
+        self.fetch_window(0, with_total=True)
+        self.render()
+    
+    def refresh(self):
+        """Re-read the loaded rows in place (after a borrow), keeping the scroll position"""
+        top = self.top
+        self.reset()
+        self.top = top
+    
+    def fetch_window(self, number, with_total=False):
+        if number in self.pending:
+            return
+        self.pending.add(number)
+        generation = self.generation
+        app = self.app
+        run_in_background(
+            self.viewport,
+            get_books_page,
+            app.current_search,
+            app.current_category,
+            app.current_availability,
+            app.current_decade,
+            limit=SCROLL_WINDOW_SIZE,
+            offset=number * SCROLL_WINDOW_SIZE,
+            with_total=with_total,
+            on_success=lambda result: self.on_window(generation, number, result, with_total),
+            on_error=lambda error: self.on_window_failed(generation, number, error)
         )
-        if cursor.fetchone()[0] > 0:
-            return False, "You already have this book borrowed"
-        
-        # Check if book has available copies
-        cursor.execute("SELECT available_copies FROM Books WHERE book_id = %s", (book_id,))
-        result = cursor.fetchone()
-        
-        if result and result[0] > 0:
-            # Create loan record with due date 14 days from now
-            cursor.execute(
-                "INSERT INTO Loans (user_id, book_id, loan_date, due_date) VALUES (%s, %s, CURDATE(), DATE_ADD(CURDATE(), INTERVAL 14 DAY))", 
-                (user_id, book_id)
-            )
-            
-            # Decrement available copies
-            cursor.execute(
-                "UPDATE Books SET available_copies = available_copies - 1 WHERE book_id = %s", 
-                (book_id,)
-            )
-            
-            connection.commit()
-            return True, "Book borrowed successfully"
+    
+    def on_window(self, generation, number, result, with_total):
+        if generation != self.generation:
+            return  # The search changed while this window was loading
+        self.pending.discard(number)
+        books, total, facets = result
+        
+        if with_total:
+            self.total = total or 0
+            self.app.total_books = self.total
+            self.app.update_results_info()
+            self.app.show_facets(facets)
+        
+        if books or number * SCROLL_WINDOW_SIZE >= self.total:
+            self.windows[number] = books
+            while len(self.windows) > SCROLL_MAX_WINDOWS:
+                self.windows.popitem(last=False)
+        elif not with_total:
+            return  # A failed read (the error was shown) - left unloaded so the next scroll asks again
+        self.render()
+    
+    def on_window_failed(self, generation, number, error):
+        if generation == self.generation:
+            self.pending.discard(number)  # Not cached, so the next scroll fetches it again
+        show_error("Database Error", str(error))
+    
+    def book_at(self, index):
+        """The book at position index of the results, or None if its window isn't loaded yet"""
+        number, position = divmod(index, SCROLL_WINDOW_SIZE)
+        books = self.windows.get(number)
+        if books is None:
+            if index < self.total:
+                self.fetch_window(number)
+            return None
+        self.windows.move_to_end(number)
+        return books[position] if position < len(books) else None
+    
+    # ---- layout ----
+    def content_height(self):
+        return math.ceil(self.total / self.cols) * ROW_HEIGHT
+    
+    def render(self):
+        """Place and fill the cards for the rows currently in view"""
+        height = self.viewport.winfo_height()
+        width = self.viewport.winfo_width()
+        if height <= 1:
+            return  # Not laid out yet - <Configure> will call back
+        
+        self.top = max(0, min(self.top, self.content_height() - height))
+        first_row, shift = divmod(int(self.top), ROW_HEIGHT)
+        rows = height // ROW_HEIGHT + 2  # A partly visible row at the top and bottom
+        
+        while len(self.cards) < rows * self.cols:
+            self.cards.append(BookCard(self.viewport, self.app.card_fonts,
+                                       self.app.borrow_book_action, self.app.show_book_details))
+        
+        column_width = width / self.cols
+        for slot, card in enumerate(self.cards):
+            row, col = divmod(slot, self.cols)
+            index = (first_row + row) * self.cols + col
+            book = self.book_at(index) if row < rows and index < self.total else None
+            if book is None:
+                card.hide()
+                continue
+            card.fill(book, book["book_id"] in self.app.borrowed_book_ids)
+            card.frame.place(x=col * column_width + 10, y=row * ROW_HEIGHT - shift + 10,
+                             width=column_width - 20, height=CARD_HEIGHT)
+        
+        # Have the next screenful on hand before it is scrolled into view
+        last_index = (first_row + rows) * self.cols
+        if last_index < self.total:
+            self.book_at(min(self.total - 1, last_index + rows * self.cols))
+        
+        content = self.content_height()
+        if content > height:
+            self.scrollbar.set(self.top / content, (self.top + height) / content)
+        else:
+            self.scrollbar.set(0, 1)
+    
+    def scroll_to(self, top):
+        self.top = top
+        self.render()
+    
+    def on_scrollbar(self, action, amount, unit=None):
+        """CTkScrollbar command: ("moveto", fraction) or ("scroll", steps, "units"/"pages")"""
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.content_height())
+        elif unit == "pages":
+            self.scroll_to(self.top + int(amount) * self.viewport.winfo_height())
+        else:
+            self.scroll_to(self.top + int(amount) * ROW_HEIGHT // 4)
+    
+    def bind_wheel(self):
+        """Scroll with the mouse wheel - events go to whatever card is under the pointer, so bind them all"""
+        self.viewport.bind_all("<MouseWheel>", self.on_wheel)
+        self.viewport.bind_all("<Button-4>", self.on_wheel)
+        self.viewport.bind_all("<Button-5>", self.on_wheel)
+    
+    def unbind_wheel(self):
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.viewport.unbind_all(sequence)
+    
+    def on_wheel(self, event):
+        under = self.viewport.winfo_containing(event.x_root, event.y_root)
+        if under is None or not str(under).startswith(str(self.viewport)):
+            return
+        if event.num == 4:
+            steps = 1
+        elif event.num == 5:
+            steps = -1
         else:
-            return False, "This book is currently unavailable"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+            # Windows reports multiples of 120 per notch, macOS small deltas
+            steps = event.delta / 120 if abs(event.delta) >= 120 else event.delta
+        self.scroll_to(self.top - steps * ROW_HEIGHT / 2)
 
 # ------------------- UI Functions -------------------
 class BrowseBooksApp:
@@ -175,12 +437,33 @@ class BrowseBooksApp:
         self.books_per_page = 6
         self.current_search = initial_search if initial_search else ""
         self.current_category = ""
-        self.all_books = []
+        self.current_availability = ""  # "", "available" or "unavailable"
+        self.current_decade = None  # e.g. 1950 for books published 1950-1959
+        self.facets = None  # Facet counts for the current search, from the last page with totals
+        self.current_books = []  # Only the page on screen is held in memory
+        self.total_books = 0
+        self.page_starts = [None]  # Keyset (title, book_id) each visited page starts after
+        
+        # Search-as-you-type state
+        self.search_after_id = None  # Pending debounced search
+        self.page_task = None  # The page request still in flight, cancelled when superseded
+        self.offer_suggestion = True  # Only a submitted search may swap in a "did you mean"
+        
+        # Books the user has on loan - fetched once and kept in sync on borrow
+        self.borrowed_book_ids = set()
+        
+        # Category names, fetched once for the filter buttons
+        self.categories = None
         
         # Create main frame layout
         self.create_layout()
         
+        # Build the search and facet indexes while the first page loads
+        warm_catalog_index()
+        warm_facet_index()
+        
         # Load initial books
+        self.load_borrowed_book_ids()
         self.load_books()
         
         # If there was an initial search, perform it
@@ -213,7 +496,7 @@ class BrowseBooksApp:
         library_label = ctk.CTkLabel(
             self.sidebar, 
             text="📚 Library System", 
-            font=ctk.CTkFont(size=20, weight="bold"),
+            font=shared_font(size=20, weight="bold"),
             text_color="white"
         )
         library_label.pack(anchor="w", padx=20, pady=(20, 5))
@@ -222,7 +505,7 @@ class BrowseBooksApp:
         user_welcome = ctk.CTkLabel(
             self.sidebar,
             text=f"Welcome,\n{self.user['first_name']} {self.user['last_name']}",
-            font=ctk.CTkFont(size=12, weight="bold"),
+            font=shared_font(size=12, weight="bold"),
             text_color="white"
         )
         user_welcome.pack(anchor="w", padx=20, pady=(0, 20))
@@ -247,7 +530,7 @@ class BrowseBooksApp:
                     self.sidebar,
                     text=text,
                     anchor="w",
-                    font=ctk.CTkFont(size=14),
+                    font=shared_font(size=14),
                     fg_color="#0d4f29",  # Highlight color
                     text_color="white",
                     hover_color="#0d4f29",
@@ -258,7 +541,7 @@ class BrowseBooksApp:
                     self.sidebar,
                     text=text,
                     anchor="w",
-                    font=ctk.CTkFont(size=14),
+                    font=shared_font(size=14),
                     fg_color="transparent",
                     text_color="white",
                     hover_color="#0d4f29",
@@ -275,7 +558,7 @@ class BrowseBooksApp:
             self.sidebar,
             text="🚪 Logout",
             anchor="w",
-            font=ctk.CTkFont(size=14),
+            font=shared_font(size=14),
             fg_color="transparent",
             text_color="white",
             hover_color="#0d4f29",
@@ -308,8 +591,11 @@ class BrowseBooksApp:
         )
         self.search_entry.pack(side="left")
         
-        # Bind Enter key to search
+        # Bind Enter key to search, and search as the user types
         self.search_entry.bind("<Return>", lambda event: self.search_books())
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Escape>", lambda event: self.hide_completions())
+        self.search_entry.bind("<FocusOut>", lambda event: self.root.after(150, self.hide_completions))
         
         search_button = ctk.CTkButton(
             search_frame,
@@ -323,6 +609,15 @@ class BrowseBooksApp:
         )
         search_button.pack(side="left", padx=(10, 0))
         
+        # Autocomplete dropdown, placed under the search entry while there are completions
+        self.completions_frame = ctk.CTkFrame(
+            self.content,
+            fg_color="white",
+            border_width=1,
+            border_color="#cccccc",
+            corner_radius=6
+        )
+        
         # Categories Label
         categories_label = ctk.CTkLabel(
             self.content,
@@ -339,6 +634,11 @@ class BrowseBooksApp:
         # Create category buttons
         self.create_category_buttons()
         
+        # Availability and publication decade filters
+        self.filters_frame = ctk.CTkFrame(self.content, fg_color="transparent")
+        self.filters_frame.pack(fill="x", padx=30, pady=(0, 15))
+        self.create_filter_controls()
+        
         # Frame for result info and pagination
         self.results_frame = ctk.CTkFrame(self.content, fg_color="transparent")
         self.results_frame.pack(fill="x", padx=30, pady=(0, 10))
@@ -356,9 +656,44 @@ class BrowseBooksApp:
         self.pagination_frame = ctk.CTkFrame(self.results_frame, fg_color="transparent")
         self.pagination_frame.pack(side="right")
         
+        # Switch between pages and one scrolling list
+        self.view_button = ctk.CTkButton(
+            self.results_frame,
+            text="⇅ Scroll view",
+            font=ctk.CTkFont(size=12),
+            fg_color="#C5E1A5",
+            text_color="#333333",
+            hover_color="#A5D6A7",
+            width=110,
+            height=30,
+            corner_radius=15,
+            command=self.toggle_scroll_mode
+        )
+        self.view_button.pack(side="right", padx=(0, 10))
+        
         # Books Grid Frame - will contain book cards
         self.books_frame = ctk.CTkFrame(self.content, fg_color="transparent")
         self.books_frame.pack(fill="both", expand=True, padx=30, pady=(0, 20))
+        
+        # The grid's widgets are made once and reused for every page
+        self.card_fonts = {
+            "title": ctk.CTkFont(size=16, weight="bold"),
+            "body": ctk.CTkFont(size=14),
+            "bold": ctk.CTkFont(size=14, weight="bold"),
+            "small": ctk.CTkFont(size=12),
+        }
+        self.book_cards = []
+        
+        # Scroll mode swaps the page grid for one virtual grid over every result
+        self.scroll_mode = False
+        self.virtual_grid = VirtualBookGrid(self.content, self)
+        
+        self.loading_label = ctk.CTkLabel(
+            self.books_frame,
+            text="Loading books...",
+            font=self.card_fonts["body"],
+            text_color="gray"
+        )
     
     def create_category_buttons(self):
         """Create category filter buttons"""
@@ -381,13 +716,16 @@ class BrowseBooksApp:
         )
         all_btn.pack(side="left", padx=(0, 5))
         
-        # Get categories from database
-        categories = get_book_categories()
+        # Get categories from database the first time, then reuse them
+        if self.categories is None:
+            run_in_background(self.categories_frame, get_book_categories,
+                              on_success=self.show_categories, group="categories")
+            return
         
-        for category in categories:
+        for category in self.categories:
             cat_button = ctk.CTkButton(
                 self.categories_frame,
-                text=category,
+                text=self.facet_label(category, "genre", category),
                 font=ctk.CTkFont(size=12),
                 fg_color="#116636" if self.current_category == category else "#C5E1A5",
                 text_color="white" if self.current_category == category else "#333333",
@@ -399,15 +737,88 @@ class BrowseBooksApp:
             )
             cat_button.pack(side="left", padx=(0, 5))
     
+    def show_categories(self, categories):
+        """Store the fetched categories and add their filter buttons"""
+        self.categories = categories
+        self.create_category_buttons()
+    
+    def facet_label(self, text, facet, value):
+        """Button text with the number of matching books, once facet counts are known"""
+        if self.facets is None:
+            return text
+        return f"{text} ({self.facets[facet].get(value, 0)})"
+    
+    def create_filter_controls(self):
+        """Availability buttons and the publication decade menu"""
+        for widget in self.filters_frame.winfo_children():
+            widget.destroy()
+        
+        ctk.CTkLabel(
+            self.filters_frame,
+            text="Availability:",
+            font=ctk.CTkFont(size=14, weight="bold")
+        ).pack(side="left", padx=(0, 10))
+        
+        for text, value in (("Any", ""), ("Available now", "available"), ("Checked out", "unavailable")):
+            selected = self.current_availability == value
+            ctk.CTkButton(
+                self.filters_frame,
+                text=self.facet_label(text, "availability", value) if value else text,
+                font=ctk.CTkFont(size=12),
+                fg_color="#116636" if selected else "#C5E1A5",
+                text_color="white" if selected else "#333333",
+                hover_color="#0d4f29" if selected else "#A5D6A7",
+                width=120,
+                height=30,
+                corner_radius=15,
+                command=lambda value=value: self.filter_by_availability(value)
+            ).pack(side="left", padx=(0, 5))
+        
+        ctk.CTkLabel(
+            self.filters_frame,
+            text="Published:",
+            font=ctk.CTkFont(size=14, weight="bold")
+        ).pack(side="left", padx=(20, 10))
+        
+        # Menu label -> decade; only decades with books in the current results are offered
+        decades = {"Any decade": None}
+        known = set(self.facets["decade"]) if self.facets else set()
+        if self.current_decade is not None:
+            known.add(self.current_decade)
+        for decade in sorted(known, reverse=True):
+            decades[self.facet_label(f"{decade}s", "decade", decade)] = decade
+        
+        current = next(label for label, decade in decades.items() if decade == self.current_decade)
+        decade_menu = ctk.CTkOptionMenu(
+            self.filters_frame,
+            values=list(decades),
+            width=160,
+            height=30,
+            fg_color="#116636",
+            button_color="#0d4f29",
+            button_hover_color="#0d4f29",
+            command=lambda label: self.filter_by_decade(decades[label])
+        )
+        decade_menu.set(current)
+        decade_menu.pack(side="left")
+    
+    def show_facets(self, facets):
+        """Refresh the filter buttons with new facet counts"""
+        self.facets = facets
+        self.create_category_buttons()
+        self.create_filter_controls()
+    
     def create_pagination(self):
         """Create pagination controls"""
         # Clear existing pagination controls
         for widget in self.pagination_frame.winfo_children():
             widget.destroy()
         
+        if self.scroll_mode:
+            return  # The scrollbar replaces paging
+        
         # Calculate total pages
-        total_books = len(self.all_books)
-        total_pages = max(1, math.ceil(total_books / self.books_per_page))
+        total_pages = self.get_total_pages()
         
         # Only show pagination if there's more than one page
         if total_pages > 1:
@@ -453,13 +864,86 @@ class BrowseBooksApp:
             )
             next_btn.pack(side="left", padx=(5, 0))
     
+    def get_total_pages(self):
+        """Number of pages for the current filters"""
+        return max(1, math.ceil(self.total_books / self.books_per_page))
+    
     def load_books(self):
-        """Load books from database with current filters"""
-        # Get books with current search and category
-        self.all_books = get_books(self.current_search, self.current_category)
-        
-        # Update results info
-        self.update_results_info()
+        """Load the first page of books with current filters"""
+        self.current_page = 0
+        self.page_starts = [None]
+        if self.scroll_mode:
+            self.virtual_grid.reset()
+        else:
+            self.load_page(with_total=True)
+    
+    def toggle_scroll_mode(self):
+        """Swap between the paged grid and the virtual scrolling grid"""
+        self.scroll_mode = not self.scroll_mode
+        if self.scroll_mode:
+            self.books_frame.pack_forget()
+            self.virtual_grid.frame.pack(fill="both", expand=True, padx=30, pady=(0, 20))
+            self.virtual_grid.bind_wheel()
+            self.view_button.configure(text="▦ Page view")
+        else:
+            self.virtual_grid.unbind_wheel()
+            self.virtual_grid.frame.pack_forget()
+            self.books_frame.pack(fill="both", expand=True, padx=30, pady=(0, 20))
+            self.view_button.configure(text="⇅ Scroll view")
+        self.create_pagination()
+        self.load_books()
+    
+    def load_page(self, with_total=False):
+        """Fetch the current page - by relevance offset when searching, else by keyset boundary"""
+        if self.current_search:
+            after = None
+            offset = self.current_page * self.books_per_page
+        else:
+            after = self.page_starts[self.current_page]
+            offset = 0
+        
+        # Next stays inert until this page's last book is known
+        self.current_books = []
+        self.show_loading()
+        
+        # A newer page request makes this one stale: it is dropped if it hasn't started
+        # yet, and its result is ignored if it has
+        if self.page_task is not None:
+            self.page_task.cancel()
+        self.page_task = run_in_background(
+            self.books_frame,
+            get_books_page,
+            self.current_search,
+            self.current_category,
+            self.current_availability,
+            self.current_decade,
+            limit=self.books_per_page,
+            after=after,
+            offset=offset,
+            with_total=with_total,
+            on_success=lambda result: self.show_page(result, with_total),
+            group="books"
+        )
+    
+    def show_loading(self):
+        """Hide the book grid behind a loading placeholder"""
+        for card in self.book_cards:
+            card.hide()
+        self.loading_label.grid(row=0, column=0, columnspan=3, pady=40)
+    
+    def show_page(self, result, with_total):
+        """Show a page returned by get_books_page"""
+        books, total, facets = result
+        self.current_books = books
+        
+        if with_total:
+            self.total_books = total
+            self.update_results_info()
+            self.show_facets(facets)
+            
+            if total == 0 and self.current_search.strip() and self.offer_suggestion:
+                self.load_suggestion()
+                return
         
         # Create pagination
         self.create_pagination()
@@ -467,16 +951,49 @@ class BrowseBooksApp:
         # Display current page of books
         self.display_books()
     
-    def display_books(self):
-        """Display the current page of books"""
-        # Clear current book display
-        for widget in self.books_frame.winfo_children():
-            widget.destroy()
+    def load_suggestion(self):
+        """Look for a respelling of a search that found nothing"""
+        self.show_loading()
+        run_in_background(
+            self.books_frame,
+            get_suggested_page,
+            self.current_search,
+            self.current_category,
+            self.current_availability,
+            self.current_decade,
+            limit=self.books_per_page,
+            on_success=self.show_suggestion,
+            group="books"
+        )
+    
+    def show_suggestion(self, result):
+        """Show the "did you mean" results, or the empty page if there were none"""
+        if result is None:
+            self.create_pagination()
+            self.display_books()
+            return
         
-        # Calculate slice for current page
-        start_idx = self.current_page * self.books_per_page
-        end_idx = start_idx + self.books_per_page
-        current_books = self.all_books[start_idx:end_idx]
+        suggestion, books, total, facets = result
+        original = self.current_search
+        
+        # Carry on as if the suggestion had been typed, so paging works as usual
+        self.current_search = suggestion
+        self.search_entry.delete(0, "end")
+        self.search_entry.insert(0, suggestion)
+        self.current_books = books
+        self.total_books = total
+        self.show_facets(facets)
+        
+        self.results_info.configure(
+            text=f"No books match '{original}'. Did you mean '{suggestion}'? Showing {total} books"
+        )
+        self.create_pagination()
+        self.display_books()
+    
+    def display_books(self):
+        """Display the current page of books in the recycled cards"""
+        self.loading_label.grid_remove()
+        current_books = self.current_books
         
         # Configure grid columns and rows
         cols = 3  # Number of books per row
@@ -488,175 +1005,21 @@ class BrowseBooksApp:
         for i in range(rows):
             self.books_frame.grid_rowconfigure(i, weight=1)
         
-        # Create book cards
-        for i, book in enumerate(current_books):
-            row = i // cols
-            col = i % cols
-            
-            # Create the book card
-            self.create_book_card(book, row, col)
-    
-    def create_book_card(self, book, row, col):
-        """Create a card for an individual book"""
-        # Create a book card frame with white background and slight shadow
-        book_card = ctk.CTkFrame(
-            self.books_frame,
-            width=350,
-            height=200,
-            fg_color="white",
-            corner_radius=10,
-            border_width=1,
-            border_color="#cccccc"
-        )
-        book_card.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
-        book_card.grid_propagate(False)  # Prevent frame from shrinking
-        
-        # Book title
-        title_label = ctk.CTkLabel(
-            book_card,
-            text=book["title"],
-            font=ctk.CTkFont(size=16, weight="bold"),
-            anchor="w",
-            text_color="#000000"
-        )
-        title_label.place(x=15, y=15)
-        
-        # Author
-        author_label = ctk.CTkLabel(
-            book_card,
-            text=f"Author: {book['author']}",
-            font=ctk.CTkFont(size=14),
-            anchor="w",
-            text_color="#444444"
-        )
-        author_label.place(x=15, y=45)
-        
-        # Genre
-        genre_label = ctk.CTkLabel(
-            book_card,
-            text=f"Genre: {book['genre']}",
-            font=ctk.CTkFont(size=14),
-            anchor="w",
-            text_color="#444444"
-        )
-        genre_label.place(x=15, y=75)
-        
-        # Year
-        year_label = ctk.CTkLabel(
-            book_card,
-            text=f"Year: {book['publication_year']}",
-            font=ctk.CTkFont(size=14),
-            anchor="w",
-            text_color="#444444"
-        )
-        year_label.place(x=15, y=105)
-        
-        # Status with colored indicator
-        status_text = "Status: "
-        status_label = ctk.CTkLabel(
-            book_card,
-            text=status_text,
-            font=ctk.CTkFont(size=14),
-            anchor="w",
-            text_color="#444444"
-        )
-        status_label.place(x=15, y=135)
-        
-        # Check if book is available
-        is_available = book["available_copies"] > 0
-        
-        # Check if user already has this book borrowed
-        already_borrowed = is_book_borrowed_by_user(book["book_id"], self.user["user_id"])
-        
-        # Status indicator
-        if is_available:
-            status = "Available"
-            status_color = "#4CAF50"  # Green
-        else:
-            status = "Unavailable"
-            status_color = "#F44336"  # Red
-        
-        status_indicator = ctk.CTkLabel(
-            book_card,
-            text=status,
-            font=ctk.CTkFont(size=14, weight="bold"),
-            text_color=status_color
-        )
-        status_indicator.place(x=70, y=135)
-        
-        # Add copies indicator
-        copies_text = f"Copies: {book['available_copies']}/{book['total_copies']}"
-        copies_label = ctk.CTkLabel(
-            book_card,
-            text=copies_text,
-            font=ctk.CTkFont(size=12),
-            text_color="#777777"
-        )
-        copies_label.place(x=200, y=135)
+        # Cards are only ever created here, the first time a page has that many books
+        while len(self.book_cards) < len(current_books):
+            self.book_cards.append(BookCard(self.books_frame, self.card_fonts,
+                                            self.borrow_book_action, self.show_book_details))
         
-        # Action button
-        if already_borrowed:
-            # Already borrowed - show indicator
-            action_button = ctk.CTkButton(
-                book_card,
-                text="✓ Borrowed",
-                font=ctk.CTkFont(size=14),
-                fg_color="#8bc34a",  # Light green
-                text_color="white",
-                hover_color="#7cb342",
-                width=120,
-                height=30,
-                corner_radius=15,
-                state="disabled"
-            )
-        elif is_available:
-            # Borrow button
-            action_button = ctk.CTkButton(
-                book_card,
-                text="Borrow Book",
-                font=ctk.CTkFont(size=14),
-                fg_color="#116636",
-                hover_color="#0d4f29",
-                width=120,
-                height=30,
-                corner_radius=15,
-                command=lambda b_id=book["book_id"]: self.borrow_book_action(b_id)
-            )
-        else:
-            # Unavailable status
-            action_button = ctk.CTkButton(
-                book_card,
-                text="Unavailable",
-                font=ctk.CTkFont(size=14),
-                fg_color="#cccccc",
-                text_color="#777777",
-                hover_color="#bbbbbb",
-                width=120,
-                height=30,
-                corner_radius=15,
-                state="disabled"
-            )
-        
-        action_button.place(x=15, y=165)
-        
-        # Details button
-        details_button = ctk.CTkButton(
-            book_card,
-            text="View Details",
-            font=ctk.CTkFont(size=14),
-            fg_color="#f0f0f0",
-            text_color="#116636",
-            hover_color="#e0e0e0",
-            width=100,
-            height=30,
-            corner_radius=15,
-            command=lambda: self.show_book_details(book)
-        )
-        details_button.place(x=145, y=165)
+        for i, card in enumerate(self.book_cards):
+            if i < len(current_books):
+                book = current_books[i]
+                card.show(book, book["book_id"] in self.borrowed_book_ids, i // cols, i % cols)
+            else:
+                card.hide()
     
     def update_results_info(self):
         """Update the results info text"""
-        total_books = len(self.all_books)
+        total_books = self.total_books
         
         if self.current_search and self.current_category:
             self.results_info.configure(text=f"Found {total_books} books matching '{self.current_search}' in category '{self.current_category}'")
@@ -664,16 +1027,86 @@ class BrowseBooksApp:
             self.results_info.configure(text=f"Found {total_books} books matching '{self.current_search}'")
         elif self.current_category:
             self.results_info.configure(text=f"Showing {total_books} books in category '{self.current_category}'")
+        elif self.current_availability or self.current_decade is not None:
+            self.results_info.configure(text=f"Showing {total_books} books")
         else:
             self.results_info.configure(text=f"Showing all {total_books} books")
     
     # ------------------- Action Functions -------------------
-    def search_books(self):
+    def search_books(self, live=False):
         """Search for books with the current search term"""
+        self.cancel_live_search()
+        if not live:
+            self.hide_completions()
+        self.offer_suggestion = not live  # Never rewrite the entry while the user is still typing
         self.current_page = 0  # Reset to first page
         self.current_search = self.search_entry.get()
         self.load_books()
     
+    def on_search_key(self, event):
+        """Restart the debounce timer - the search runs once typing pauses"""
+        if event.keysym in ("Return", "KP_Enter", "Escape", "Tab", "Up", "Down", "Left", "Right",
+                            "Shift_L", "Shift_R", "Control_L", "Control_R", "Alt_L", "Alt_R"):
+            return
+        self.cancel_live_search()
+        self.search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.live_search)
+    
+    def cancel_live_search(self):
+        """Drop a debounced search that hasn't fired yet"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+            self.search_after_id = None
+    
+    def live_search(self):
+        """Debounced search: refresh the completions and, if the text changed, the results"""
+        self.search_after_id = None
+        search_term = self.search_entry.get()
+        
+        run_in_background(self.completions_frame, get_completions, search_term,
+                          on_success=self.show_completions, group="completions")
+        
+        if search_term != self.current_search:
+            self.search_books(live=True)
+    
+    def show_completions(self, completions):
+        """Fill the dropdown under the search entry (or hide it if there is nothing to offer)"""
+        for widget in self.completions_frame.winfo_children():
+            widget.destroy()
+        
+        # The user may have moved on from the search box while these were being fetched
+        focused = self.root.focus_get()
+        if not completions or focused is None or not str(focused).startswith(str(self.search_entry)):
+            self.hide_completions()
+            return
+        
+        for completion in completions:
+            ctk.CTkButton(
+                self.completions_frame,
+                text=completion,
+                font=ctk.CTkFont(size=14),
+                anchor="w",
+                fg_color="transparent",
+                text_color="black",
+                hover_color="#e6f2ea",
+                height=30,
+                command=lambda completion=completion: self.choose_completion(completion)
+            ).pack(fill="x", padx=4, pady=1)
+        
+        self.completions_frame.place(in_=self.search_entry, relx=0, rely=1, relwidth=1, y=2)
+        self.completions_frame.lift()
+    
+    def hide_completions(self):
+        """Take the dropdown off screen (a completion that arrives later is ignored)"""
+        get_dispatcher(self.root).cancel_group("completions")
+        if self.completions_frame.winfo_exists():  # Gone if focus left for another screen
+            self.completions_frame.place_forget()
+    
+    def choose_completion(self, completion):
+        """Put the chosen completion in the entry and search for it"""
+        self.search_entry.delete(0, "end")
+        self.search_entry.insert(0, completion)
+        self.search_books()
+    
     def filter_by_category(self, category):
         """Filter books by category"""
         self.current_page = 0  # Reset to first page
@@ -683,40 +1116,62 @@ class BrowseBooksApp:
         # Refresh category buttons to show the active one
         self.create_category_buttons()
     
+    def filter_by_availability(self, availability):
+        """Show only books on the shelf, or only books that are all out on loan"""
+        self.current_availability = availability
+        self.load_books()
+        self.create_filter_controls()
+    
+    def filter_by_decade(self, decade):
+        """Show only books published in one decade (None for any)"""
+        self.current_decade = decade
+        self.load_books()
+        self.create_filter_controls()
+    
     def next_page(self):
         """Go to next page of books"""
-        total_pages = math.ceil(len(self.all_books) / self.books_per_page)
-        if self.current_page < total_pages - 1:
+        if self.current_page < self.get_total_pages() - 1 and self.current_books:
+            last_book = self.current_books[-1]
             self.current_page += 1
-            self.create_pagination()
-            self.display_books()
+            
+            # Remember where this page starts so Prev can seek back to it
+            if len(self.page_starts) <= self.current_page:
+                self.page_starts.append((last_book["title"], last_book["book_id"]))
+            
+            self.load_page()
     
     def previous_page(self):
         """Go to previous page of books"""
         if self.current_page > 0:
             self.current_page -= 1
-            self.create_pagination()
-            self.display_books()
+            self.load_page()
     
     def borrow_book_action(self, book_id):
         """Handle the borrow book action"""
-        success, message = borrow_book(book_id, self.user["user_id"])
+        run_in_background(self.content, borrow_book, book_id, self.user["user_id"],
+                          on_success=lambda result: self.on_borrow_done(book_id, result))
+    
+    def on_borrow_done(self, book_id, result):
+        """Show the outcome of a borrow request"""
+        success, message = result
         
         if success:
+            self.borrowed_book_ids.add(book_id)
+            
             # Show success message
-            messagebox = ctk.CTkToplevel(self.root)
-            messagebox.title("Success")
-            messagebox.geometry("300x150")
-            messagebox.resizable(False, False)
-            messagebox.grab_set()  # Make it modal
+            dialog = ctk.CTkToplevel(self.root)
+            dialog.title("Success")
+            dialog.geometry("300x150")
+            dialog.resizable(False, False)
+            dialog.grab_set()  # Make it modal
             
-            # Center the messagebox on screen
+            # Center the dialog on screen
             messageX = self.root.winfo_x() + (self.root.winfo_width() // 2) - 150
             messageY = self.root.winfo_y() + (self.root.winfo_height() // 2) - 75
-            messagebox.geometry(f"+{messageX}+{messageY}")
+            dialog.geometry(f"+{messageX}+{messageY}")
             
             # Add message and button
-            frame = ctk.CTkFrame(messagebox, fg_color="transparent")
+            frame = ctk.CTkFrame(dialog, fg_color="transparent")
             frame.pack(fill="both", expand=True, padx=20, pady=20)
             
             label = ctk.CTkLabel(
@@ -732,28 +1187,28 @@ class BrowseBooksApp:
                 font=ctk.CTkFont(size=14),
                 fg_color="#116636",
                 hover_color="#0d4f29",
-                command=lambda: [messagebox.destroy(), self.refresh_page()]
+                command=lambda: [dialog.destroy(), self.refresh_page()]
             )
             ok_button.pack()
             
             # Set focus and bind Return key
             ok_button.focus_set()
-            messagebox.bind("<Return>", lambda event: [messagebox.destroy(), self.refresh_page()])
+            dialog.bind("<Return>", lambda event: [dialog.destroy(), self.refresh_page()])
         else:
             # Show error message
-            messagebox = ctk.CTkToplevel(self.root)
-            messagebox.title("Error")
-            messagebox.geometry("300x150")
-            messagebox.resizable(False, False)
-            messagebox.grab_set()  # Make it modal
+            dialog = ctk.CTkToplevel(self.root)
+            dialog.title("Error")
+            dialog.geometry("300x150")
+            dialog.resizable(False, False)
+            dialog.grab_set()  # Make it modal
             
-            # Center the messagebox on screen
+            # Center the dialog on screen
             messageX = self.root.winfo_x() + (self.root.winfo_width() // 2) - 150
             messageY = self.root.winfo_y() + (self.root.winfo_height() // 2) - 75
-            messagebox.geometry(f"+{messageX}+{messageY}")
+            dialog.geometry(f"+{messageX}+{messageY}")
             
             # Add message and button
-            frame = ctk.CTkFrame(messagebox, fg_color="transparent")
+            frame = ctk.CTkFrame(dialog, fg_color="transparent")
             frame.pack(fill="both", expand=True, padx=20, pady=20)
             
             label = ctk.CTkLabel(
@@ -770,13 +1225,13 @@ class BrowseBooksApp:
                 font=ctk.CTkFont(size=14),
                 fg_color="#116636",
                 hover_color="#0d4f29",
-                command=messagebox.destroy
+                command=dialog.destroy
             )
             ok_button.pack()
             
             # Set focus and bind Return key
             ok_button.focus_set()
-            messagebox.bind("<Return>", lambda event: messagebox.destroy())
+            dialog.bind("<Return>", lambda event: dialog.destroy())
     
     def show_book_details(self, book):
         """Show detailed information about a book"""
@@ -845,10 +1300,6 @@ class BrowseBooksApp:
         )
         desc_label.pack(anchor="w", pady=(10, 5))
         
-        description = book.get("description", "No description available.")
-        if not description:
-            description = "No description available."
-        
         desc_text = ctk.CTkTextbox(
             details_frame,
             font=ctk.CTkFont(size=12),
@@ -860,15 +1311,19 @@ class BrowseBooksApp:
             activate_scrollbars=True
         )
         desc_text.pack(fill="x", pady=(0, 15))
-        desc_text.insert("1.0", description)
+        desc_text.insert("1.0", "Loading description...")
         desc_text.configure(state="disabled")  # Make read-only
         
+        # Descriptions are not part of the page query - fetch this one now
+        run_in_background(desc_text, get_book_description, book["book_id"],
+                          on_success=lambda description: self.show_description(desc_text, description))
+        
         # Action buttons
         button_frame = ctk.CTkFrame(details_frame, fg_color="transparent")
         button_frame.pack(fill="x", pady=(10, 0))
         
         # Check if user already has this book borrowed
-        already_borrowed = is_book_borrowed_by_user(book["book_id"], self.user["user_id"])
+        already_borrowed = book["book_id"] in self.borrowed_book_ids
         
         # Close button (always show)
         close_button = ctk.CTkButton(
@@ -927,33 +1382,56 @@ class BrowseBooksApp:
         
         status_button.pack(side="right", padx=5)
     
+    def show_description(self, desc_text, description):
+        """Put a fetched description into the details dialog"""
+        desc_text.configure(state="normal")
+        desc_text.delete("1.0", "end")
+        desc_text.insert("1.0", description or "No description available.")
+        desc_text.configure(state="disabled")
+    
+    def load_borrowed_book_ids(self):
+        """Fetch the user's open loans and redraw the cards once they arrive"""
+        run_in_background(self.content, get_borrowed_book_ids, self.user["user_id"],
+                          on_success=self.set_borrowed_book_ids, group="borrowed")
+    
+    def set_borrowed_book_ids(self, book_ids):
+        self.borrowed_book_ids = book_ids
+        if self.scroll_mode:
+            self.virtual_grid.render()
+        elif self.current_books:
+            self.display_books()
+    
     def refresh_page(self):
         """Refresh the current page"""
-        self.load_books()
+        self.load_borrowed_book_ids()
+        if self.scroll_mode:
+            self.virtual_grid.refresh()
+        else:
+            self.load_page(with_total=True)
+    
+    def close(self):
+        """Drop the global wheel bindings and pending search before the router replaces this screen"""
+        if getattr(self, "search_after_id", None) is not None:
+            self.root.after_cancel(self.search_after_id)
+            self.search_after_id = None
+        if getattr(self, "scroll_mode", False):
+            self.virtual_grid.unbind_wheel()
     
     def open_dashboard(self):
         """Open the dashboard page"""
-        self.root.destroy()
-        from student.dashboard import run_dashboard
-        run_dashboard()
+        show_screen("dashboard")
     
     def open_borrowed(self):
         """Open the borrowed books page"""
-        self.root.destroy()
-        from student.borrowed import run_borrowed
-        run_borrowed()
+        show_screen("borrowed")
     
     def open_fines(self):
         """Open the fines page"""
-        self.root.destroy()
-        from student.fines import run_fines
-        run_fines()
+        show_screen("fines")
     
     def open_profile(self):
         """Open the profile page"""
-        self.root.destroy()
-        from student.profile import run_profile
-        run_profile()
+        show_screen("profile")
     
     def logout(self):
         """Logout and return to login page"""
@@ -961,12 +1439,8 @@ class BrowseBooksApp:
             # Clear the session
             clear_user_session()
             
-            # Close current window
-            self.root.destroy()
-            
-            # Open login page
-            import os
-            os.system("python auth.py")
+            # Back to the login page, in the same window
+            show_screen("login")
         except Exception as e:
             print(f"Logout Error: {e}")
             self.root.destroy()
@@ -974,15 +1448,11 @@ class BrowseBooksApp:
 # ------------------- Run Functions -------------------
 def run_browse():
     """Run the browse books application"""
-    root = ctk.CTk()
-    app = BrowseBooksApp(root)
-    root.mainloop()
+    show_screen("browse")
 
 def run_browse_with_search(search_term):
     """Run the browse books application with an initial search term"""
-    root = ctk.CTk()
-    app = BrowseBooksApp(root, search_term)
-    root.mainloop()
+    show_screen("browse", search_term)
 
 # ------------------- Main Execution -------------------
 if __name__ == "__main__":
@@ -4,218 +4,42 @@ import customtkinter as ctk
 import subprocess
 import os
 from datetime import datetime
-from utils import connect_db, load_user_session, clear_user_session, format_date, is_overdue, calculate_fine
+from utils import load_user_session, clear_user_session, format_date, is_overdue, calculate_fine
+from repository import books, loans
+from catalog_index import warm_catalog_index
+from catalog_facets import warm_facet_index
+from background import run_in_background
+from router import show_screen, shared_font
 
 # ------------------- Dashboard Functions -------------------
 def get_user_summary(user_id):
     """Get summary data for dashboard"""
-    connection = connect_db()
-    if not connection:
-        return {"books_borrowed": 0, "due_books": 0, "pending_fines": "$0.00"}
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Get count of borrowed books
-        cursor.execute(
-            "SELECT COUNT(*) FROM Loans WHERE user_id = %s AND return_date IS NULL", 
-            (user_id,)
-        )
-        books_borrowed = cursor.fetchone()[0]
-        
-        # Get count of overdue books
-        cursor.execute(
-            "SELECT COUNT(*) FROM Loans WHERE user_id = %s AND return_date IS NULL AND due_date < CURDATE()", 
-            (user_id,)
-        )
-        due_books = cursor.fetchone()[0]
-        
-        # Get sum of unpaid fines
-        cursor.execute("""
-            SELECT COALESCE(SUM(f.amount), 0) 
-            FROM Fines f
-            JOIN Loans l ON f.loan_id = l.loan_id
-            WHERE l.user_id = %s AND f.paid = 0
-        """, (user_id,))
-        pending_fines = cursor.fetchone()[0]
-        
-        print(f"User summary loaded: {books_borrowed} books, {due_books} overdue, ${pending_fines:.2f} in fines")
-        
-        return {
-            "books_borrowed": books_borrowed,
-            "due_books": due_books,
-            "pending_fines": f"${pending_fines:.2f}"
-        }
-    except Exception as err:
-        print(f"Error getting user summary: {err}")
-        return {"books_borrowed": 0, "due_books": 0, "pending_fines": "$0.00"}
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    books_borrowed, due_books, pending_fines = loans.user_summary(user_id)
+    return {
+        "books_borrowed": books_borrowed,
+        "due_books": due_books,
+        "pending_fines": f"${pending_fines:.2f}"
+    }
 
 def get_user_borrowed_books(user_id):
     """Get all books borrowed by a user"""
-    connection = connect_db()
-    if not connection:
-        return []
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT 
-                l.loan_id,
-                b.book_id, 
-                b.title, 
-                b.author, 
-                l.loan_date, 
-                l.due_date,
-                l.return_date
-            FROM 
-                Books b
-            JOIN 
-                Loans l ON b.book_id = l.book_id
-            WHERE 
-                l.user_id = %s AND
-                l.return_date IS NULL
-            ORDER BY 
-                l.due_date
-        """, (user_id,))
-        
-        results = cursor.fetchall()
-        print(f"Borrowed books: {len(results)} books found for user {user_id}")
-        return results
-    except Exception as err:
-        print(f"Error getting borrowed books: {err}")
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return loans.active_for_user(user_id)
 
 def search_books(query=""):
     """Search for books based on query, or get all books if query is empty"""
-    connection = connect_db()
-    if not connection:
-        print("Database connection failed in search_books")
-        return []
+    if query and len(query.strip()) > 0:
+        # Ranked full-text search
+        results, _ = books.search(query)
+    else:
+        # Get the first 20 books
+        results, _ = books.search(limit=20)
     
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        if query and len(query.strip()) > 0:
-            # Search with filter
-            search_query = f"%{query}%"
-            
-            cursor.execute("""
-                SELECT 
-                    b.book_id, 
-                    b.title, 
-                    b.author, 
-                    b.isbn,
-                    b.publication_year,
-                    b.genre,
-                    b.available_copies
-                FROM 
-                    Books b
-                WHERE 
-                    b.title LIKE %s OR 
-                    b.author LIKE %s OR 
-                    b.genre LIKE %s OR
-                    b.isbn LIKE %s
-                ORDER BY 
-                    b.title
-            """, (search_query, search_query, search_query, search_query))
-        else:
-            # Get all books
-            cursor.execute("""
-                SELECT 
-                    b.book_id, 
-                    b.title, 
-                    b.author, 
-                    b.isbn,
-                    b.publication_year,
-                    b.genre,
-                    b.available_copies
-                FROM 
-                    Books b
-                ORDER BY 
-                    b.title
-                LIMIT 20
-            """)
-        
-        results = cursor.fetchall()
-        print(f"Search results: {len(results)} books found")
-        return results
-    except Exception as err:
-        print(f"Error in search_books: {err}")
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    print(f"Search results: {len(results)} books found")
+    return results
 
 def return_book(loan_id, user_id):
-    """Return a borrowed book"""
-    connection = connect_db()
-    if not connection:
-        return False
-    
-    try:
-        cursor = connection.cursor()
-        
-        # First get the book_id for this loan to update available copies
-        cursor.execute("SELECT book_id, due_date FROM Loans WHERE loan_id = %s", (loan_id,))
-        result = cursor.fetchone()
-        
-        if not result:
-            print(f"No loan found with ID {loan_id}")
-            return False
-        
-        book_id, due_date = result
-        
-        # Update loan return date
-        cursor.execute(
-            "UPDATE Loans SET return_date = CURDATE() WHERE loan_id = %s AND user_id = %s", 
-            (loan_id, user_id)
-        )
-        
-        # Check if any rows were affected
-        if cursor.rowcount == 0:
-            print(f"No rows updated for loan {loan_id}")
-            return False
-        
-        # Increment available copies
-        cursor.execute(
-            "UPDATE Books SET available_copies = available_copies + 1 WHERE book_id = %s", 
-            (book_id,)
-        )
-        
-        # Check if the book is overdue and create fine if needed
-        if is_overdue(due_date):
-            from datetime import datetime, timedelta
-            
-            days_overdue = (datetime.now() - due_date).days if isinstance(due_date, datetime) else \
-                          (datetime.now() - datetime.strptime(str(due_date), '%Y-%m-%d')).days
-                          
-            fine_amount = days_overdue * 0.50  # $0.50 per day
-            
-            # Create fine record
-            cursor.execute(
-                "INSERT INTO Fines (loan_id, amount, description, paid) VALUES (%s, %s, %s, 0)",
-                (loan_id, fine_amount, f"Late return fine: {days_overdue} days")
-            )
-        
-        connection.commit()
-        return True
-    except Exception as err:
-        print(f"Error returning book: {err}")
-        return False
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    """Return a borrowed book - (success, message)"""
+    return loans.return_book(loan_id, user_id)
             
 # ------------------- Library User Dashboard Class -------------------
 class LibraryApp:
@@ -237,6 +61,10 @@ class LibraryApp:
         
         print(f"User session loaded successfully: {self.user['first_name']} {self.user['last_name']}")
         
+        # Students usually search next - have the catalog indexes ready by then
+        warm_catalog_index()
+        warm_facet_index()
+        
         # Initialize frames dictionary to keep track of different pages
         self.frames = {}
         
@@ -263,9 +91,7 @@ class LibraryApp:
     
     def run_browse_script(self):
         """Run the browse.py script"""
-        self.root.destroy()
-        from student.browse import run_browse
-        run_browse()
+        show_screen("browse")
     
     def create_sidebar(self):
         """Create the sidebar with navigation buttons"""
@@ -274,14 +100,14 @@ class LibraryApp:
         sidebar.grid_propagate(False)  # Prevent the frame from shrinking
 
         # Sidebar Title
-        title_label = ctk.CTkLabel(sidebar, text="📑 Library System", font=ctk.CTkFont(size=16, weight="bold"), 
+        title_label = ctk.CTkLabel(sidebar, text="📑 Library System", font=shared_font(size=16, weight="bold"), 
                                   text_color="white", anchor="w", padx=10, pady=10)
         title_label.pack(fill="x", pady=(20, 10))
         
         # User welcome message
         user_welcome = ctk.CTkLabel(sidebar, 
                                   text=f"Welcome,\n{self.user['first_name']} {self.user['last_name']}", 
-                                  font=ctk.CTkFont(size=12, weight="bold"), 
+                                  font=shared_font(size=12, weight="bold"), 
                                   text_color="white", anchor="w", padx=10, pady=10)
         user_welcome.pack(fill="x", pady=(0, 20))
         
@@ -301,7 +127,7 @@ class LibraryApp:
         ]
 
         for text, command in menu_items:
-            button = ctk.CTkButton(sidebar, text=text, font=ctk.CTkFont(size=12), 
+            button = ctk.CTkButton(sidebar, text=text, font=shared_font(size=12), 
                                   fg_color="transparent", text_color="white", anchor="w",
                                   hover_color="#0d4f29", corner_radius=0, height=40,
                                   command=command)
@@ -347,37 +173,29 @@ class LibraryApp:
         separator_frame = ctk.CTkFrame(self.main_frame, height=1, fg_color="#d1d1d1")
         separator_frame.grid(row=1, column=0, sticky="ew", pady=5)
         
-        # Get user summary data
-        summary_data = get_user_summary(self.user['user_id'])
-        
-        # Dashboard Summary Boxes
+        # Dashboard Summary Boxes - filled in once the summary query returns
         summary_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         summary_frame.grid(row=2, column=0, sticky="ew", pady=20)
         summary_frame.grid_columnconfigure(0, weight=1)
         summary_frame.grid_columnconfigure(1, weight=1)
         summary_frame.grid_columnconfigure(2, weight=1)
 
-        summary_boxes = [
-            ("Books Borrowed", str(summary_data["books_borrowed"])),
-            ("Due Books", str(summary_data["due_books"])),
-            ("Pending Fines", summary_data["pending_fines"])
-        ]
-
-        for i, (title, value) in enumerate(summary_boxes):
+        self.summary_labels = {}
+        for i, title in enumerate(["Books Borrowed", "Due Books", "Pending Fines"]):
             box_frame = ctk.CTkFrame(summary_frame, fg_color="white", border_width=1, border_color="#d1d1d1", corner_radius=5)
             box_frame.grid(row=0, column=i, padx=10, sticky="nsew", ipadx=15, ipady=15)
             
             summary_title = ctk.CTkLabel(box_frame, text=title, font=ctk.CTkFont(size=12))
             summary_title.pack(anchor="center")
             
-            # Make the value red if it's a positive number of due books or a non-zero fine
-            text_color = "#d9534f" if ((title == "Due Books" and value != "0") or 
-                                      (title == "Pending Fines" and value != "$0.00")) else "black"
-            
-            summary_value = ctk.CTkLabel(box_frame, text=value, 
+            summary_value = ctk.CTkLabel(box_frame, text="…", 
                                         font=ctk.CTkFont(size=24, weight="bold"),
-                                        text_color=text_color)
+                                        text_color="gray")
             summary_value.pack(anchor="center", pady=10)
+            self.summary_labels[title] = summary_value
+        
+        run_in_background(summary_frame, get_user_summary, self.user['user_id'],
+                          on_success=self.show_summary_data)
 
         # Quick Search Box
         search_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
@@ -402,9 +220,6 @@ class LibraryApp:
         # Bind Enter key to search function
         search_entry.bind("<Return>", lambda event: self.show_search_results(search_entry.get()))
         
-        # Get borrowed books for the preview section
-        borrowed_books = get_user_borrowed_books(self.user['user_id'])
-        
         # Recent Borrowed Books Section
         books_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         books_frame.grid(row=4, column=0, sticky="nsew", pady=10)
@@ -444,6 +259,30 @@ class LibraryApp:
         for col in columns:
             borrowed_books_tree.heading(col, text=col)
 
+        # Placeholder row until the loans query returns
+        borrowed_books_tree.insert("", "end", values=("Loading your books...", "", "", "", ""))
+        
+        run_in_background(borrowed_books_tree, get_user_borrowed_books, self.user['user_id'],
+                          on_success=lambda books: self.show_dashboard_books(borrowed_books_tree, books))
+    
+    def show_summary_data(self, summary_data):
+        """Fill the dashboard summary boxes"""
+        summary_values = {
+            "Books Borrowed": str(summary_data["books_borrowed"]),
+            "Due Books": str(summary_data["due_books"]),
+            "Pending Fines": summary_data["pending_fines"]
+        }
+        
+        for title, value in summary_values.items():
+            # Make the value red if it's a positive number of due books or a non-zero fine
+            text_color = "#d9534f" if ((title == "Due Books" and value != "0") or 
+                                      (title == "Pending Fines" and value != "$0.00")) else "black"
+            self.summary_labels[title].configure(text=value, text_color=text_color)
+    
+    def show_dashboard_books(self, borrowed_books_tree, borrowed_books):
+        """Fill the recent borrowed books table"""
+        borrowed_books_tree.delete(*borrowed_books_tree.get_children())
+        
         # Add data and store loan_ids
         self.dashboard_loan_ids = {}
         
@@ -465,16 +304,23 @@ class LibraryApp:
                 self.dashboard_loan_ids[item_id] = book['loan_id']
             
             
+            def on_return_done(result):
+                success, message = result
+                if success:
+                    messagebox.showinfo("Success", "Book returned successfully!")
+                    self.show_dashboard()  # Refresh dashboard
+                else:
+                    messagebox.showerror("Error", f"Failed to return book: {message}")
+            
             def on_return_click(tree_item):
                 loan_id = self.dashboard_loan_ids.get(tree_item)
                 if loan_id:
-                    if return_book(loan_id, self.user['user_id']):
-                        messagebox.showinfo("Success", "Book returned successfully!")
-                        self.show_dashboard()  # Refresh dashboard
-                    else:
-                        messagebox.showerror("Error", "Failed to return book.")
+                    run_in_background(borrowed_books_tree, return_book, loan_id, self.user['user_id'],
+                                      on_success=on_return_done)
             
             def create_return_buttons():
+                if not borrowed_books_tree.winfo_exists():
+                    return  # Navigated to another screen meanwhile
                 for item in borrowed_books_tree.get_children():
                     bbox = borrowed_books_tree.bbox(item, column="Action")
                     if bbox:
@@ -504,27 +350,19 @@ class LibraryApp:
             
     def show_search_results(self, query):
         """Switch to the browse page with the search query"""
-        self.root.destroy()
-        from student.browse import run_browse_with_search
-        run_browse_with_search(query)
+        show_screen("browse", query)
     
     def show_borrowed_books(self):
         """Show the borrowed books page"""
-        self.root.destroy()
-        from student.borrowed import run_borrowed
-        run_borrowed()
+        show_screen("borrowed")
     
     def show_fines(self):
         """Show the fines page"""
-        self.root.destroy()
-        from student.fines import run_fines
-        run_fines()
+        show_screen("fines")
     
     def show_profile(self):
         """Show the profile page"""
-        self.root.destroy()
-        from student.profile import run_profile
-        run_profile()
+        show_screen("profile")
     
     def logout(self):
         """Logout and return to login page"""
@@ -532,12 +370,8 @@ class LibraryApp:
             # Clear the session
             clear_user_session()
             
-            # Close current window
-            self.root.destroy()
-            
-            # Open login page
-            import os
-            os.system("python auth.py")
+            # Back to the login page, in the same window
+            show_screen("login")
         except Exception as e:
             print(f"Error during logout: {e}")
             messagebox.showerror("Error", f"Failed to logout: {e}")
@@ -546,9 +380,7 @@ class LibraryApp:
 # ------------------- Run Dashboard Function -------------------
 def run_dashboard():
     """Run the dashboard application"""
-    root = ctk.CTk()
-    app = LibraryApp(root)
-    root.mainloop()
+    show_screen("dashboard")
 
 # ------------------- Main Execution -------------------
 if __name__ == "__main__":
@@ -1,165 +1,34 @@
 import tkinter as tk
+from tkinter import ttk
 import customtkinter as ctk
 from PIL import Image, ImageTk
 from datetime import datetime
 
-from utils import connect_db, load_user_session, clear_user_session, format_date, format_currency
+from utils import load_user_session, clear_user_session, format_date, format_currency
+from repository import fines
+from background import run_in_background
+from router import show_screen, shared_font
 
 # ------------------- Fine Functions -------------------
 def get_pending_fines(user_id):
     """Get pending (unpaid) fines for a user"""
-    connection = connect_db()
-    if not connection:
-        return []
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT 
-                f.fine_id,
-                f.loan_id,
-                f.amount,
-                f.description,
-                l.due_date,
-                b.title,
-                b.author,
-                b.book_id
-            FROM 
-                Fines f
-            JOIN 
-                Loans l ON f.loan_id = l.loan_id
-            JOIN 
-                Books b ON l.book_id = b.book_id
-            WHERE 
-                l.user_id = %s AND
-                f.paid = 0
-            ORDER BY 
-                f.fine_id DESC
-        """, (user_id,))
-        
-        return cursor.fetchall()
-    except Exception as err:
-        print(f"Database Error: {err}")
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return fines.pending_for_user(user_id)
 
 def get_payment_history(user_id):
     """Get payment history for a user"""
-    connection = connect_db()
-    if not connection:
-        return []
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT 
-                f.fine_id,
-                f.loan_id,
-                f.amount,
-                f.description,
-                f.payment_date,
-                b.title,
-                b.author
-            FROM 
-                Fines f
-            JOIN 
-                Loans l ON f.loan_id = l.loan_id
-            JOIN 
-                Books b ON l.book_id = b.book_id
-            WHERE 
-                l.user_id = %s AND
-                f.paid = 1
-            ORDER BY 
-                f.payment_date DESC
-        """, (user_id,))
-        
-        return cursor.fetchall()
-    except Exception as err:
-        print(f"Database Error: {err}")
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return fines.paid_for_user(user_id)
 
 def get_loans_with_no_fines(user_id):
     """Get loans that were returned without fines"""
-    connection = connect_db()
-    if not connection:
-        return []
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT 
-                l.loan_id,
-                l.return_date,
-                b.title,
-                b.author
-            FROM 
-                Loans l
-            JOIN 
-                Books b ON l.book_id = b.book_id
-            LEFT JOIN 
-                Fines f ON l.loan_id = f.loan_id
-            WHERE 
-                l.user_id = %s AND
-                l.return_date IS NOT NULL AND
-                f.fine_id IS NULL
-            ORDER BY 
-                l.return_date DESC
-            LIMIT 10
-        """, (user_id,))
-        
-        return cursor.fetchall()
-    except Exception as err:
-        print(f"Database Error: {err}")
-        return []
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return fines.fine_free_returns(user_id)
 
 def pay_fine(fine_id, user_id):
     """Pay a fine"""
-    connection = connect_db()
-    if not connection:
-        return False, "Database connection failed"
-    
-    try:
-        cursor = connection.cursor()
-        
-        # Verify that this fine belongs to the user
-        cursor.execute("""
-            SELECT f.fine_id 
-            FROM Fines f
-            JOIN Loans l ON f.loan_id = l.loan_id
-            WHERE f.fine_id = %s AND l.user_id = %s AND f.paid = 0
-        """, (fine_id, user_id))
-        
-        if not cursor.fetchone():
-            return False, "Fine not found or already paid"
-        
-        # Update fine as paid
-        cursor.execute(
-            "UPDATE Fines SET paid = 1, payment_date = CURDATE() WHERE fine_id = %s", 
-            (fine_id,)
-        )
-        
-        connection.commit()
-        return True, "Payment successful"
-    except Exception as err:
-        return False, f"Database Error: {err}"
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    return fines.pay(fine_id, user_id)
+
+def get_fines_page_data(user_id):
+    """Run the three queries behind the Fines page: (pending fines, payment history, no-fine loans)"""
+    return get_pending_fines(user_id), get_payment_history(user_id), get_loans_with_no_fines(user_id)
 
 # ------------------- UI Class -------------------
 class FinesPaymentApp:
@@ -211,7 +80,7 @@ class FinesPaymentApp:
         library_label = ctk.CTkLabel(
             self.sidebar, 
             text="📚 Library System", 
-            font=ctk.CTkFont(size=20, weight="bold"),
+            font=shared_font(size=20, weight="bold"),
             text_color="white"
         )
         library_label.pack(anchor="w", padx=20, pady=(20, 5))
@@ -220,7 +89,7 @@ class FinesPaymentApp:
         user_welcome = ctk.CTkLabel(
             self.sidebar,
             text=f"Welcome,\n{self.user['first_name']} {self.user['last_name']}",
-            font=ctk.CTkFont(size=12, weight="bold"),
+            font=shared_font(size=12, weight="bold"),
             text_color="white"
         )
         user_welcome.pack(anchor="w", padx=20, pady=(0, 20))
@@ -245,7 +114,7 @@ class FinesPaymentApp:
                     self.sidebar,
                     text=text,
                     anchor="w",
-                    font=ctk.CTkFont(size=14),
+                    font=shared_font(size=14),
                     fg_color="transparent",
                     text_color="white",
                     hover_color="#0d4f29",
@@ -256,7 +125,7 @@ class FinesPaymentApp:
                     self.sidebar,
                     text=text,
                     anchor="w",
-                    font=ctk.CTkFont(size=14),
+                    font=shared_font(size=14),
                     fg_color="#0d4f29",
                     text_color="white",
                     hover_color="#0d4f29"
@@ -272,7 +141,7 @@ class FinesPaymentApp:
             self.sidebar,
             text="🚪 Logout",
             anchor="w",
-            font=ctk.CTkFont(size=14),
+            font=shared_font(size=14),
             fg_color="transparent",
             text_color="white",
             hover_color="#0d4f29",
@@ -321,51 +190,65 @@ class FinesPaymentApp:
         )
         pending_label.pack(anchor="w", padx=30, pady=(10, 10))
         
-        # Scrollable frame for pending fines
-        self.pending_outer_frame = ctk.CTkFrame(self.content, fg_color="transparent")
-        self.pending_outer_frame.pack(fill="x", padx=30, pady=(0, 20))
-        
-        # Create canvas for scrolling
-        self.pending_canvas = ctk.CTkCanvas(
-            self.pending_outer_frame,bg="#e6f4e6",
-            highlightthickness=0
+        # Both tables are Treeviews: Tk draws only the rows in view, so a long history
+        # costs rows in the tree rather than a label per cell
+        style = ttk.Style()
+        style.theme_use("clam")
+        style.configure("Fines.Treeview", background="white", fieldbackground="white", foreground="black", rowheight=28)
+        style.configure("Fines.Treeview.Heading", background="#333333", foreground="white", font=("Arial", 10, "bold"))
+        style.map("Fines.Treeview", background=[("selected", "#116636")], foreground=[("selected", "white")])
+        style.map("Fines.Treeview.Heading", background=[("active", "#333333")])
+        
+        pending_tree_frame = ctk.CTkFrame(self.content, fg_color="transparent")
+        pending_tree_frame.pack(fill="x", padx=30)
+        
+        self.pending_headers = ("Title", "Due Date", "Fine Amount")
+        self.pending_tree = ttk.Treeview(
+            pending_tree_frame,
+            columns=self.pending_headers,
+            show="headings",
+            style="Fines.Treeview",
+            height=5,
+            selectmode="browse"
         )
-        self.pending_canvas.pack(side="left", fill="both", expand=True)
+        self.pending_tree.pack(side="left", fill="x", expand=True)
         
-        # Add a scrollbar
-        scrollbar = ctk.CTkScrollbar(
-            self.pending_outer_frame,
-            orientation="vertical",
-            command=self.pending_canvas.yview
-        )
+        scrollbar = ttk.Scrollbar(pending_tree_frame, orient="vertical", command=self.pending_tree.yview)
         scrollbar.pack(side="right", fill="y")
+        self.pending_tree.configure(yscrollcommand=scrollbar.set)
         
-        # Configure the canvas
-        self.pending_canvas.configure(yscrollcommand=scrollbar.set)
-        self.pending_canvas.bind('<Configure>', 
-            lambda e: self.pending_canvas.configure(scrollregion=self.pending_canvas.bbox("all"))
+        for col, width in zip(self.pending_headers, [350, 150, 150]):
+            self.pending_tree.heading(col, text=col)
+            self.pending_tree.column(col, width=width, anchor="w")
+        
+        # One Pay button for the selected fine instead of one per row; double-click pays too
+        pay_frame = ctk.CTkFrame(self.content, fg_color="transparent")
+        pay_frame.pack(fill="x", padx=30, pady=(10, 10))
+        
+        self.pay_hint_label = ctk.CTkLabel(
+            pay_frame,
+            text="",
+            font=ctk.CTkFont(size=13),
+            text_color="#555555",
+            anchor="w"
         )
+        self.pay_hint_label.pack(side="left")
         
-        # Create a frame inside the canvas
-        self.pending_frame = ctk.CTkFrame(self.pending_canvas, fg_color="#f0f4f0")
-        self.pending_canvas.create_window((0, 0), window=self.pending_frame, anchor="nw")
-        
-        # Table headers for pending fines
-        self.pending_headers = ["Title", "Due Date", "Fine Amount", "Action"]
-        self.pending_col_widths = [350, 150, 150, 150]
-        
-        for i, header in enumerate(self.pending_headers):
-            header_label = ctk.CTkLabel(
-                self.pending_frame,
-                text=header,
-                fg_color="#333333",
-                corner_radius=0,
-                text_color="white",
-                font=ctk.CTkFont(weight="bold"),
-                width=self.pending_col_widths[i],
-                height=30
-            )
-            header_label.grid(row=0, column=i, sticky="ew")
+        self.pay_button = ctk.CTkButton(
+            pay_frame,
+            text="$ Pay Now",
+            fg_color="#d32f2f",
+            text_color="white",
+            hover_color="#b71c1c",
+            width=100,
+            height=28,
+            font=ctk.CTkFont(size=12),
+            command=self.pay_selected_fine
+        )
+        self.pay_button.pack(side="right")
+        
+        self.pending_tree.bind("<<TreeviewSelect>>", lambda event: self.update_pay_button())
+        self.pending_tree.bind("<Double-1>", lambda event: self.pay_selected_fine())
         
         # Payment History Section
         history_label = ctk.CTkLabel(
@@ -374,135 +257,72 @@ class FinesPaymentApp:
             font=ctk.CTkFont(size=16, weight="bold"),
             anchor="w"
         )
-        history_label.pack(anchor="w", padx=30, pady=(20, 10))
-        
-        # Scrollable frame for payment history
-        self.history_outer_frame = ctk.CTkFrame(self.content, fg_color="transparent")
-        self.history_outer_frame.pack(fill="both", expand=True, padx=30, pady=(0, 20))
-        
-        # Create canvas for scrolling
-        self.history_canvas = ctk.CTkCanvas(
-            self.history_outer_frame,
-            bg="#e6f4e6",
-            highlightthickness=0
+        history_label.pack(anchor="w", padx=30, pady=(10, 10))
+        
+        history_tree_frame = ctk.CTkFrame(self.content, fg_color="transparent")
+        history_tree_frame.pack(fill="both", expand=True, padx=30, pady=(0, 20))
+        
+        self.history_headers = ("Title", "Paid Amount", "Payment Date", "Status")
+        self.history_tree = ttk.Treeview(
+            history_tree_frame,
+            columns=self.history_headers,
+            show="headings",
+            style="Fines.Treeview",
+            height=10,
+            selectmode="none"
         )
-        self.history_canvas.pack(side="left", fill="both", expand=True)
+        self.history_tree.pack(side="left", fill="both", expand=True)
         
-        # Add a scrollbar
-        history_scrollbar = ctk.CTkScrollbar(
-            self.history_outer_frame,
-            orientation="vertical",
-            command=self.history_canvas.yview
-        )
+        history_scrollbar = ttk.Scrollbar(history_tree_frame, orient="vertical", command=self.history_tree.yview)
         history_scrollbar.pack(side="right", fill="y")
+        self.history_tree.configure(yscrollcommand=history_scrollbar.set)
         
-        # Configure the canvas
-        self.history_canvas.configure(yscrollcommand=history_scrollbar.set)
-        self.history_canvas.bind('<Configure>', 
-            lambda e: self.history_canvas.configure(scrollregion=self.history_canvas.bbox("all"))
-        )
+        for col, width in zip(self.history_headers, [350, 150, 150, 150]):
+            self.history_tree.heading(col, text=col)
+            self.history_tree.column(col, width=width, anchor="center" if col == "Status" else "w")
         
-        # Create a frame inside the canvas
-        self.history_frame = ctk.CTkFrame(self.history_canvas, fg_color="#f0f4f0")
-        self.history_canvas.create_window((0, 0), window=self.history_frame, anchor="nw")
-        
-        # Table headers for payment history
-        self.history_headers = ["Title", "Paid Amount", "Payment Date", "Status"]
-        self.history_col_widths = [350, 150, 150, 150]
-        
-        for i, header in enumerate(self.history_headers):
-            header_label = ctk.CTkLabel(
-                self.history_frame,
-                text=header,
-                fg_color="#333333",
-                corner_radius=0,
-                text_color="white",
-                font=ctk.CTkFont(weight="bold"),
-                width=self.history_col_widths[i],
-                height=30
-            )
-            header_label.grid(row=0, column=i, sticky="ew")
-        
-        # Configure grid columns to expand properly
-        for frame in [self.pending_frame, self.history_frame]:
-            for i in range(4):
-                frame.grid_columnconfigure(i, weight=1)
+        # Status colours, in place of the pill drawn in each row
+        self.history_tree.tag_configure("paid", foreground="#4caf50")
+        self.history_tree.tag_configure("no_fine", foreground="#2196f3")
     
     def load_data(self):
-        """Load fines and payment history data"""
-        # Get pending fines
-        pending_fines = get_pending_fines(self.user['user_id'])
+        """Load fines and payment history data in the background"""
+        self.clear_table_rows()
+        self.amount_label.configure(text="…")
         
-        # Get payment history
-        payment_history = get_payment_history(self.user['user_id'])
+        # Placeholder rows until the queries return
+        self.pending_tree.insert("", "end", values=("Loading...", "", ""))
+        self.history_tree.insert("", "end", values=("Loading...", "", "", ""))
+        self.update_pay_button()
         
-        # Get loans with no fines
-        no_fine_loans = get_loans_with_no_fines(self.user['user_id'])
+        run_in_background(self.content, get_fines_page_data, self.user['user_id'],
+                          on_success=self.show_data, group="fines")
+    
+    def clear_table_rows(self):
+        """Remove every row from both tables"""
+        for tree in [self.pending_tree, self.history_tree]:
+            tree.delete(*tree.get_children())
+    
+    def show_data(self, data):
+        """Display the fines and payment history returned by get_fines_page_data"""
+        pending_fines, payment_history, no_fine_loans = data
+        self.clear_table_rows()
         
         # Calculate total outstanding amount
         total_outstanding = sum(float(fine['amount']) for fine in pending_fines)
         self.amount_label.configure(text=format_currency(total_outstanding))
         
-        # Display pending fines
-        if pending_fines:
-            for idx, fine in enumerate(pending_fines, 1):
-                # Title
-                title_label = ctk.CTkLabel(
-                    self.pending_frame,
-                    text=fine['title'],
-                    anchor="w",
-                    fg_color="#ffffff",
-                    corner_radius=0,
-                    height=30
-                )
-                title_label.grid(row=idx, column=0, sticky="ew", padx=1, pady=1)
-                
-                # Due Date
-                due_date_label = ctk.CTkLabel(
-                    self.pending_frame,
-                    text=format_date(fine['due_date']),
-                    anchor="w",
-                    fg_color="#ffffff",
-                    corner_radius=0,
-                    height=30
-                )
-                due_date_label.grid(row=idx, column=1, sticky="ew", padx=1, pady=1)
-                
-                # Fine Amount
-                amount_label = ctk.CTkLabel(
-                    self.pending_frame,
-                    text=format_currency(fine['amount']),
-                    anchor="w",
-                    fg_color="#ffffff",
-                    corner_radius=0,
-                    height=30
-                )
-                amount_label.grid(row=idx, column=2, sticky="ew", padx=1, pady=1)
-                
-                # Pay Button
-                pay_button = ctk.CTkButton(
-                    self.pending_frame,
-                    text="$ Pay Now",
-                    fg_color="#d32f2f",
-                    text_color="white",
-                    hover_color="#b71c1c",
-                    width=80,
-                    height=25,
-                    font=ctk.CTkFont(size=12),
-                    command=lambda f_id=fine['fine_id']: self.pay_fine(f_id)
-                )
-                pay_button.grid(row=idx, column=3, padx=5, pady=5)
-        else:
-            # No pending fines message
-            no_fines_label = ctk.CTkLabel(
-                self.pending_frame,
-                text="No pending fines",
-                anchor="w",
-                fg_color="#ffffff",
-                corner_radius=0,
-                height=30
-            )
-            no_fines_label.grid(row=1, column=0, columnspan=4, sticky="ew", padx=1, pady=1)
+        # Display pending fines - the row iid is the fine id the Pay button acts on
+        for fine in pending_fines:
+            self.pending_tree.insert("", "end", iid=str(fine['fine_id']), values=(
+                fine['title'],
+                format_date(fine['due_date']),
+                format_currency(fine['amount'])
+            ))
+        
+        if not pending_fines:
+            self.pending_tree.insert("", "end", values=("No pending fines", "", ""))
+        self.update_pay_button()
         
         # Combine payment history with no-fine loans
         history_data = []
@@ -529,83 +349,42 @@ class FinesPaymentApp:
         history_data.sort(key=lambda x: x['date'] if x['date'] else datetime.min, reverse=True)
         
         # Display payment history
-        if history_data:
-            for idx, item in enumerate(history_data, 1):
-                # Title
-                title_label = ctk.CTkLabel(
-                    self.history_frame,
-                    text=item['title'],
-                    anchor="w",
-                    fg_color="#ffffff",
-                    corner_radius=0,
-                    height=30
-                )
-                title_label.grid(row=idx, column=0, sticky="ew", padx=1, pady=1)
-                
-                # Amount
-                amount_label = ctk.CTkLabel(
-                    self.history_frame,
-                    text=format_currency(item['amount']),
-                    anchor="w",
-                    fg_color="#ffffff",
-                    corner_radius=0,
-                    height=30
-                )
-                amount_label.grid(row=idx, column=1, sticky="ew", padx=1, pady=1)
-                
-                # Date
-                date_label = ctk.CTkLabel(
-                    self.history_frame,
-                    text=format_date(item['date']),
-                    anchor="w",
-                    fg_color="#ffffff",
-                    corner_radius=0,
-                    height=30
-                )
-                date_label.grid(row=idx, column=2, sticky="ew", padx=1, pady=1)
-                
-                # Status
-                if item['status'] == 'Paid':
-                    status_frame = ctk.CTkFrame(self.history_frame, fg_color="#4caf50", corner_radius=10, height=22)
-                    status_label = ctk.CTkLabel(
-                        status_frame, 
-                        text=item['status'],
-                        text_color="white",
-                        font=ctk.CTkFont(size=12),
-                        width=60
-                    )
-                    status_label.pack(padx=5, pady=2)
-                    status_frame.grid(row=idx, column=3, padx=5, pady=5)
-                else:
-                    status_frame = ctk.CTkFrame(self.history_frame, fg_color="#2196f3", corner_radius=10, height=22)
-                    status_label = ctk.CTkLabel(
-                        status_frame, 
-                        text=item['status'],
-                        text_color="white",
-                        font=ctk.CTkFont(size=12),
-                        width=60
-                    )
-                    status_label.pack(padx=5, pady=2)
-                    status_frame.grid(row=idx, column=3, padx=5, pady=5)
+        for item in history_data:
+            self.history_tree.insert("", "end", values=(
+                item['title'],
+                format_currency(item['amount']),
+                format_date(item['date']),
+                item['status']
+            ), tags=("paid" if item['status'] == 'Paid' else "no_fine",))
+        
+        if not history_data:
+            self.history_tree.insert("", "end", values=("No payment history", "", "", ""))
+    
+    def selected_fine_id(self):
+        """Fine id of the selected pending row, or None (no selection, or a placeholder row)"""
+        selection = self.pending_tree.selection()
+        if not selection or not selection[0].isdigit() or not self.pending_tree.exists(selection[0]):
+            return None
+        return int(selection[0])
+    
+    def update_pay_button(self):
+        """Match the Pay button and its hint to the selected pending fine"""
+        fine_id = self.selected_fine_id()
+        if fine_id is None:
+            self.pay_hint_label.configure(text="Select a fine to pay it")
+            self.pay_button.configure(state="disabled")
         else:
-            # No history message
-            no_history_label = ctk.CTkLabel(
-                self.history_frame,
-                text="No payment history",
-                anchor="w",
-                fg_color="#ffffff",
-                corner_radius=0,
-                height=30
-            )
-            no_history_label.grid(row=1, column=0, columnspan=4, sticky="ew", padx=1, pady=1)
-        
-        # Update canvas scrollregion
-        self.pending_canvas.update_idletasks()
-        self.pending_canvas.configure(scrollregion=self.pending_canvas.bbox("all"))
-        
-        self.history_canvas.update_idletasks()
-        self.history_canvas.configure(scrollregion=self.history_canvas.bbox("all"))
+            title, _, amount = self.pending_tree.item(str(fine_id), "values")
+            self.pay_hint_label.configure(text=f"{title}: {amount}")
+            self.pay_button.configure(state="normal")
+    
+    def pay_selected_fine(self):
+        """Pay the selected pending fine"""
+        fine_id = self.selected_fine_id()
+        if fine_id is not None:
+            self.pay_fine(fine_id)
     
+
     def pay_fine(self, fine_id):
         """Handle pay fine action"""
         # Show payment confirmation dialog
@@ -656,15 +435,19 @@ class FinesPaymentApp:
         cancel_button.pack(side="left", padx=5)
         
         # Confirm button
-        def confirm_payment():
-            dialog.destroy()
-            success, message = pay_fine(fine_id, self.user['user_id'])
+        def on_payment_done(result):
+            success, message = result
             if success:
                 self.show_success_message(message)
                 self.load_data()  # Refresh data
             else:
                 self.show_error_message(message)
         
+        def confirm_payment():
+            dialog.destroy()
+            run_in_background(self.content, pay_fine, fine_id, self.user['user_id'],
+                              on_success=on_payment_done)
+        
         confirm_button = ctk.CTkButton(
             button_frame,
             text="Confirm Payment",
@@ -745,27 +528,19 @@ class FinesPaymentApp:
     
     def open_dashboard(self):
         """Open the dashboard page"""
-        self.root.destroy()
-        from student.dashboard import run_dashboard
-        run_dashboard()
+        show_screen("dashboard")
     
     def open_search(self):
         """Open the search books page"""
-        self.root.destroy()
-        from student.browse import run_browse
-        run_browse()
+        show_screen("browse")
     
     def open_borrowed(self):
         """Open the borrowed books page"""
-        self.root.destroy()
-        from student.borrowed import run_borrowed
-        run_borrowed()
+        show_screen("borrowed")
     
     def open_profile(self):
         """Open the profile page"""
-        self.root.destroy()
-        from student.profile import run_profile
-        run_profile()
+        show_screen("profile")
     
     def logout(self):
         """Logout and return to login page"""
@@ -773,21 +548,15 @@ class FinesPaymentApp:
             # Clear the session
             clear_user_session()
             
-            # Close current window
-            self.root.destroy()
-            
-            # Open login page
-            import os
-            os.system("python auth.py")
+            # Back to the login page, in the same window
+            show_screen("login")
         except Exception as e:
             print(f"Logout Error: {e}")
 
 # ------------------- Run Function -------------------
 def run_fines():
     """Run the fines payment application"""
-    root = ctk.CTk()
-    app = FinesPaymentApp(root)
-    root.mainloop()
+    show_screen("fines")
 
 # ------------------- Main Execution -------------------
 if __name__ == "__main__":
@@ -1,99 +1,23 @@
 import tkinter as tk
 from tkinter import messagebox
 import customtkinter as ctk
-import hashlib
 
-from utils import connect_db, load_user_session, save_user_session, clear_user_session
+from utils import load_user_session, save_user_session, clear_user_session
+from repository import users
+from background import run_in_background
+from router import show_screen, shared_font
 
 # ------------------- Profile Functions -------------------
 def get_user_profile(user_id):
     """Get user profile information"""
-    connection = connect_db()
-    if not connection:
-        return None
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        cursor.execute("""
-            SELECT 
-                user_id, 
-                first_name, 
-                last_name, 
-                email, 
-                role,
-                DATE_FORMAT(registration_date, '%Y-%m-%d') AS registration_date
-            FROM 
-                Users 
-            WHERE 
-                user_id = %s
-        """, (user_id,))
-        
-        result = cursor.fetchone()
-        print(f"User profile loaded for user {user_id}")
-        return result
-    except Exception as err:
-        print(f"Error getting user profile: {err}")
-        messagebox.showerror("Database Error", str(err))
-        return None
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    profile = users.get_profile(user_id)
+    if profile and profile["registration_date"]:
+        profile["registration_date"] = profile["registration_date"].strftime('%Y-%m-%d')
+    return profile
 
 def update_user_profile(user_id, first_name, last_name, email, current_password=None, new_password=None):
-    """Update user profile information"""
-    connection = connect_db()
-    if not connection:
-        return False
-    
-    try:
-        cursor = connection.cursor()
-        
-        # If changing password, verify current password
-        if current_password and new_password:
-            # Hash the provided current password
-            hashed_current = hashlib.sha256(current_password.encode()).hexdigest()
-            
-            # Check if the current password matches
-            cursor.execute("SELECT password FROM Users WHERE user_id = %s", (user_id,))
-            result = cursor.fetchone()
-            
-            if not result:
-                print(f"No user found with ID {user_id}")
-                return False
-            
-            stored_hash = result[0]
-            
-            if stored_hash != hashed_current:
-                messagebox.showerror("Password Error", "Current password is incorrect.")
-                return False
-            
-            # Hash the new password
-            hashed_new = hashlib.sha256(new_password.encode()).hexdigest()
-            
-            # Update user with new password
-            cursor.execute(
-                "UPDATE Users SET first_name = %s, last_name = %s, email = %s, password = %s WHERE user_id = %s", 
-                (first_name, last_name, email, hashed_new, user_id)
-            )
-        else:
-            # Update user without changing password
-            cursor.execute(
-                "UPDATE Users SET first_name = %s, last_name = %s, email = %s WHERE user_id = %s", 
-                (first_name, last_name, email, user_id)
-            )
-        
-        connection.commit()
-        return True
-    except Exception as err:
-        print(f"Error updating profile: {err}")
-        messagebox.showerror("Database Error", str(err))
-        return False
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+    """Update user profile information - (success, message)"""
+    return users.update_profile(user_id, first_name, last_name, email, current_password, new_password)
 
 # ------------------- UI Class -------------------
 class ProfileApp:
@@ -140,14 +64,14 @@ class ProfileApp:
         sidebar.grid_propagate(False)  # Prevent the frame from shrinking
 
         # Sidebar Title
-        title_label = ctk.CTkLabel(sidebar, text="📑 Library System", font=ctk.CTkFont(size=16, weight="bold"), 
+        title_label = ctk.CTkLabel(sidebar, text="📑 Library System", font=shared_font(size=16, weight="bold"), 
                                   text_color="white", anchor="w", padx=10, pady=10)
         title_label.pack(fill="x", pady=(20, 10))
         
         # User welcome message
         user_welcome = ctk.CTkLabel(sidebar, 
                                  text=f"Welcome,\n{self.user['first_name']} {self.user['last_name']}", 
-                                 font=ctk.CTkFont(size=12, weight="bold"), 
+                                 font=shared_font(size=12, weight="bold"), 
                                  text_color="white", anchor="w", padx=10, pady=10)
         user_welcome.pack(fill="x", pady=(0, 20))
         
@@ -167,20 +91,30 @@ class ProfileApp:
 
         for text, command in menu_items:
             if command:  # Regular button
-                button = ctk.CTkButton(sidebar, text=text, font=ctk.CTkFont(size=12), 
+                button = ctk.CTkButton(sidebar, text=text, font=shared_font(size=12), 
                                      fg_color="transparent", text_color="white", anchor="w",
                                      hover_color="#0d4f29", corner_radius=0, height=40,
                                      command=command)
             else:  # Current page (highlight)
-                button = ctk.CTkButton(sidebar, text=text, font=ctk.CTkFont(size=12), 
+                button = ctk.CTkButton(sidebar, text=text, font=shared_font(size=12), 
                                      fg_color="#0d4f29", text_color="white", anchor="w",
                                      hover_color="#0d4f29", corner_radius=0, height=40)
             button.pack(fill="x", pady=2)
     
     def load_profile(self):
-        """Load and display user profile data"""
-        # Get user profile data
-        profile = get_user_profile(self.user['user_id'])
+        """Load user profile data in the background"""
+        loading_label = ctk.CTkLabel(self.main_frame, text="Loading profile...", 
+                                   font=ctk.CTkFont(size=14), text_color="gray")
+        loading_label.grid(row=0, column=0, pady=40)
+        
+        run_in_background(loading_label, get_user_profile, self.user['user_id'],
+                          on_success=self.show_profile)
+    
+    def show_profile(self, profile):
+        """Display user profile data"""
+        for widget in self.main_frame.winfo_children():
+            widget.destroy()
+        
         if not profile:
             messagebox.showerror("Error", "Failed to load profile data.")
             return
@@ -296,26 +230,27 @@ class ProfileApp:
                 if new_password != confirm_password:
                     messagebox.showwarning("Password Error", "New passwords do not match.")
                     return
-                
-                # Update profile with password change
-                if update_user_profile(profile['user_id'], first_name, last_name, email, current_password, new_password):
-                    messagebox.showinfo("Success", "Profile updated successfully with new password.")
-                    # Update session info
-                    self.user['first_name'] = first_name
-                    self.user['last_name'] = last_name
-                    self.user['email'] = email
-                    save_user_session(self.user)
-                    self.refresh_page()  # Refresh page
             else:
-                # Update profile without changing password
-                if update_user_profile(profile['user_id'], first_name, last_name, email):
+                current_password = new_password = None
+            
+            def on_saved(result):
+                success, message = result
+                if not success:
+                    messagebox.showerror("Update Failed", message)
+                    return
+                if new_password:
+                    messagebox.showinfo("Success", "Profile updated successfully with new password.")
+                else:
                     messagebox.showinfo("Success", "Profile updated successfully.")
-                    # Update session info
-                    self.user['first_name'] = first_name
-                    self.user['last_name'] = last_name
-                    self.user['email'] = email
-                    save_user_session(self.user)
-                    self.refresh_page()  # Refresh page
+                # Update session info
+                self.user['first_name'] = first_name
+                self.user['last_name'] = last_name
+                self.user['email'] = email
+                save_user_session(self.user)
+                self.refresh_page()  # Refresh page
+            
+            run_in_background(save_button, update_user_profile, profile['user_id'], first_name, last_name, email,
+                              current_password, new_password, on_success=on_saved)
         
         # Save button
         save_button = ctk.CTkButton(button_frame, text="Save Changes", font=ctk.CTkFont(size=14), 
@@ -334,27 +269,19 @@ class ProfileApp:
     
     def open_dashboard(self):
         """Open the dashboard page"""
-        self.root.destroy()
-        from student.dashboard import run_dashboard
-        run_dashboard()
+        show_screen("dashboard")
     
     def open_search(self):
         """Open the search books page"""
-        self.root.destroy()
-        from student.browse import run_browse
-        run_browse()
+        show_screen("browse")
     
     def open_borrowed(self):
         """Open the borrowed books page"""
-        self.root.destroy()
-        from student.borrowed import run_borrowed
-        run_borrowed()
+        show_screen("borrowed")
     
     def open_fines(self):
         """Open the fines page"""
-        self.root.destroy()
-        from student.fines import run_fines
-        run_fines()
+        show_screen("fines")
     
     def logout(self):
         """Logout and return to login page"""
@@ -362,12 +289,8 @@ class ProfileApp:
             # Clear the session
             clear_user_session()
             
-            # Close current window
-            self.root.destroy()
-            
-            # Open login page
-            import os
-            os.system("python auth.py")
+            # Back to the login page, in the same window
+            show_screen("login")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to logout: {e}")
             self.root.destroy()
@@ -375,9 +298,7 @@ class ProfileApp:
 # ------------------- Run Function -------------------
 def run_profile():
     """Run the profile application"""
-    root = ctk.CTk()
-    app = ProfileApp(root)
-    root.mainloop()
+    show_screen("profile")
 
 # ------------------- Main Execution -------------------
 if __name__ == "__main__":
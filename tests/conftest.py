@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+
+# Every test runs against one private in-memory SQLite database
+config.DB_BACKEND = "sqlite"
+config.SQLITE_PATH = ":memory:"
+config.QUERY_STATS_ENABLED = False
+
+@pytest.fixture(scope="session")
+def schema():
+    """The in-memory database, migrated to the latest version"""
+    from migrations import migrate
+    assert migrate()
@@ -0,0 +1,87 @@
+import time
+import tkinter
+import tkinter.ttk
+
+import pytest
+
+ctk = pytest.importorskip("customtkinter")
+
+from admin.admin_books import show_books_management
+from admin.admin_fines import show_fines_management
+from admin.admin_users import show_users_management
+from utils import get_pool
+
+REFRESHES = 100
+
+@pytest.fixture(scope="module")
+def window(schema):
+    try:
+        root = ctk.CTk()
+    except tkinter.TclError:
+        pytest.skip("no display")
+    root.geometry("1300x800")
+    yield root
+    root.destroy()
+
+@pytest.fixture(scope="module")
+def catalog(schema):
+    """Enough books and users for a few table pages"""
+    connection = get_pool().get_connection()
+    cursor = connection.cursor()
+    cursor.executemany(
+        "INSERT INTO Books (title, author, genre, isbn, publication_year, total_copies, available_copies) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+        [(f"Widget Book {i}", f"Author {i}", "Fiction", f"WIDGETS{i:06d}", 1990, 2, 1) for i in range(300)])
+    cursor.executemany(
+        "INSERT INTO Users (first_name, last_name, email, password, secret) VALUES (%s, %s, %s, %s, %s)",
+        [(f"First{i}", f"Last{i}", f"widgets{i}@example.com", "x", "x") for i in range(300)])
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+def find_trees(widget):
+    trees = []
+    for child in widget.winfo_children():
+        if isinstance(child, tkinter.ttk.Treeview):
+            trees.append(child)
+        trees.extend(find_trees(child))
+    return trees
+
+def count_live(widget):
+    return 1 + sum(count_live(child) for child in widget.winfo_children())
+
+def settle(root, trees, timeout=10):
+    """Pump events until every table has landed its rows"""
+    end = time.monotonic() + timeout
+    while any(tree.table.loading for tree in trees):
+        assert time.monotonic() < end, "a table never finished loading"
+        root.update()
+        time.sleep(0.001)
+    root.update()
+
+@pytest.mark.parametrize("show_screen", [show_books_management, show_users_management, show_fines_management])
+def test_refreshing_admin_tables_creates_no_widgets(window, catalog, show_screen):
+    content_frame = ctk.CTkFrame(window, fg_color="transparent")
+    content_frame.pack(fill="both", expand=True)
+    show_screen(content_frame)
+    trees = find_trees(content_frame)
+    assert trees
+    for tree in trees:
+        tree.table.refresh()  # Tabs the screen has not loaded yet
+    settle(window, trees)
+
+    # Select a row so the action bar is live, as it is when an admin works the table
+    for tree in trees:
+        rows = tree.get_children()
+        if rows:
+            tree.selection_set(rows[0])
+    window.update()
+
+    live_before = count_live(window)
+    for _ in range(REFRESHES):
+        for tree in trees:
+            tree.table.refresh()
+        settle(window, trees)
+
+    assert count_live(window) == live_before
+    content_frame.destroy()
@@ -0,0 +1,99 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import background
+from background import Dispatcher, submit_from_button
+
+class FakeRoot:
+    """Stands in for the Tk root: after() callbacks are run by drain()"""
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+
+class FakeButton:
+    """A submit button on a FakeRoot"""
+    def __init__(self, root):
+        self.root = root
+        self.state = "normal"
+
+    def cget(self, option):
+        return getattr(self, option)
+
+    def configure(self, state):
+        self.state = state
+
+    def winfo_toplevel(self):
+        return self.root
+
+    def winfo_exists(self):
+        return True
+
+def drain(root, limit=100):
+    """Run scheduled callbacks until none are left - a poll loop that never stops fails the test"""
+    for _ in range(limit):
+        if not root.scheduled:
+            return
+        root.scheduled.pop(0)()
+    raise AssertionError("the dispatcher kept polling")
+
+def test_task_cancelled_after_a_worker_picked_it_up_releases_its_slot(monkeypatch):
+    picked_up = threading.Event()
+    cancelled = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    class PausingExecutor:
+        """Holds the task between the worker picking it up and running it"""
+        def submit(self, work):
+            def run():
+                picked_up.set()
+                cancelled.wait(5)
+                work()
+            return executor.submit(run)
+
+    monkeypatch.setattr(background, "get_executor", lambda: PausingExecutor())
+    root = FakeRoot()
+    dispatcher = Dispatcher(root)
+    results = []
+
+    task = dispatcher.submit(lambda: "result", on_success=results.append)
+    assert picked_up.wait(5)
+    task.cancel()  # Too late for the future - the worker is already running it
+    assert not task.future.cancelled()
+    cancelled.set()
+    task.future.result(5)
+    executor.shutdown()
+
+    drain(root)
+    assert results == []
+    assert dispatcher._pending == 0
+    assert not dispatcher._polling
+
+def test_finished_task_delivers_its_result():
+    root = FakeRoot()
+    dispatcher = Dispatcher(root)
+    results = []
+
+    task = dispatcher.submit(lambda: 42, on_success=results.append)
+    task.future.result(5)
+
+    drain(root)
+    assert results == [42]
+    assert dispatcher._pending == 0
+
+def test_submit_button_stays_disabled_until_the_call_answers():
+    root = FakeRoot()
+    button = FakeButton(root)
+    release = threading.Event()
+    results = []
+
+    task = submit_from_button(button, lambda: release.wait(5) and "signed in", on_success=results.append)
+    assert button.state == "disabled"
+    assert submit_from_button(button, lambda: "again", on_success=results.append) is None
+
+    release.set()
+    task.future.result(5)
+    drain(root)
+    assert results == ["signed in"]
+    assert button.state == "normal"
@@ -0,0 +1,26 @@
+from catalog_index import CatalogIndex
+
+def make_index():
+    index = CatalogIndex()
+    index.load([
+        (1, "A History of Gardens", "Ann Baker", "Gardening", "9780000000011"),
+        (2, "Gardens", "Tom Gardener", "Gardening", "9780000000028"),
+        (3, "Baking Bread", "Garden Press", "Cooking", "9780000000035"),
+        (4, "Zen and the Garden", "Lee Holt", "Philosophy", "9780000000042"),
+    ])
+    return index
+
+def test_matches_are_ranked_by_where_the_words_are_found():
+    index = make_index()
+    ids, total = index.search("garden")
+    # A whole title word beats the prefix in title, author and genre, which beats
+    # the prefix in title and genre, which beats a whole author word
+    assert ids == [4, 2, 1, 3]
+    assert total == 4
+    assert index.rank("garden", [3, 1]) == [1, 3]
+
+def test_ranking_follows_incremental_updates():
+    index = make_index()
+    index.add(3, "Garden Bread", "Garden Press", "Cooking", "9780000000035")
+    index.remove(2)
+    assert index.search("garden", limit=2) == ([3, 4], 3)
@@ -0,0 +1,39 @@
+import json
+import os
+
+from explain_capture import compare_reports, load_report, meta_path, plan_access, save_entry
+
+MYSQL_PLAN = [{"id": 1, "select_type": "SIMPLE", "table": "Books", "type": "ref", "key": "idx_books_title",
+               "rows": 120, "filtered": 100.0, "Extra": None}]
+
+def test_access_leaves_out_row_estimates():
+    assert plan_access(MYSQL_PLAN) == [["Books", "ref", "idx_books_title"]]
+    assert plan_access([dict(MYSQL_PLAN[0], rows=90000)]) == plan_access(MYSQL_PLAN)
+    assert plan_access([{"id": 3, "parent": 0, "notused": 0, "detail": "SCAN Books"}]) == ["SCAN Books"]
+
+def test_report_is_written_without_a_timestamp(tmp_path):
+    path = str(tmp_path / "explain_report.json")
+    entry = {"caller": "repository.BookRepository.search", "access": plan_access(MYSQL_PLAN), "flags": []}
+    save_entry("SELECT ...", entry, path=path)
+    first = open(path).read()
+    save_entry("SELECT ...", entry, path=path)
+
+    assert open(path).read() == first
+    assert "generated" not in json.loads(first)
+    assert os.path.exists(meta_path(path))
+
+def test_compare_reports_by_access_type_and_key(tmp_path):
+    old = {"statements": {
+        "SELECT a": {"access": [["Books", "ref", "idx_books_title"]]},
+        "SELECT b": {"access": [["Loans", "ref", "idx_loans_user"]]},
+    }}
+    new = {"statements": {
+        "SELECT a": {"access": [["Books", "ref", "idx_books_title"]]},
+        "SELECT b": {"access": [["Loans", "ALL", None]]},
+        "SELECT c": {"access": [["Fines", "ref", "idx_fines_paid_id"]]},
+    }}
+    assert compare_reports(old, new) == [
+        ("SELECT b", [["Loans", "ref", "idx_loans_user"]], [["Loans", "ALL", None]]),
+        ("SELECT c", None, [["Fines", "ref", "idx_fines_paid_id"]]),
+    ]
+    assert load_report(str(tmp_path / "missing.json")) == {"statements": {}}
@@ -0,0 +1,14 @@
+from query_stats import InstrumentedCursor, QueryStats
+from repository import books
+from utils import get_pool
+
+def test_repository_queries_are_reported_under_the_repository_method(schema, monkeypatch):
+    stats = QueryStats()
+    pool = get_pool()
+    monkeypatch.setattr(pool, "cursor_wrapper", lambda cursor, raw: InstrumentedCursor(cursor, raw, stats))
+    monkeypatch.setattr(pool, "_statements", {})  # Prepared cursors opened before the wrapper was set
+
+    books.search("caller attribution", with_total=True)
+
+    callers = {caller for row in stats.report() for caller in row["callers"]}
+    assert callers == {"repository.BookRepository.search"}
@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from repository import books, execute, fines, loans, users
+from utils import connect_db
+
+def run_sql(sql, params=()):
+    connection = connect_db()
+    try:
+        execute(connection, sql, params)
+        connection.commit()
+    finally:
+        connection.close()
+
+def member_with_fine(name, isbn):
+    """(user_id, fine ids) of a new member who returned a book three days late"""
+    email = f"{name}@example.com"
+    assert users.create(name, "Reader", email, "Late#Pass123")[0]
+    user_id = users.authenticate(email, "Late#Pass123")["user_id"]
+    assert books.add(f"Overdue Title {name}", "An Author", "Fiction", isbn, 2001, 2)[0]
+    book_id = books.by_isbn(isbn)["book_id"]
+
+    assert loans.borrow(book_id, user_id)[0]
+    loan_id = loans.active_for_user(user_id)[0]["loan_id"]
+    run_sql("UPDATE Loans SET due_date = %s WHERE loan_id = %s", (date.today() - timedelta(days=3), loan_id))
+    assert loans.return_book(loan_id, user_id)[0]
+    fine_ids = [fine["fine_id"] for fine in fines.pending_for_user(user_id)]
+    assert fine_ids
+    return user_id, fine_ids
+
+def test_deleting_a_user_reports_their_fines_as_cancelled(schema):
+    user_id, fine_ids = member_with_fine("late.reader", "9780306406157")
+
+    seen = fines.latest_change()
+    assert users.delete(user_id)[0]
+
+    changed, cancelled, latest = fines.changes_since(seen)
+    assert sorted(cancelled) == sorted(fine_ids)
+    assert changed == []
+    assert latest > seen
+
+def test_cancelling_a_reused_fine_id_replaces_its_tombstone(schema):
+    user_id, (fine_id,) = member_with_fine("reused.fine", "9780131103627")
+    loan_id = fines.pending_for_user(user_id)[0]["loan_id"]
+    assert fines.cancel(fine_id)[0]
+
+    # The id comes back, as after a MySQL < 8 restart reset AUTO_INCREMENT
+    run_sql("INSERT INTO Fines (fine_id, loan_id, amount, description, paid) VALUES (%s, %s, 1, 'Reused', 0)",
+            (fine_id, loan_id))
+    seen = fines.latest_change()
+    assert fines.cancel(fine_id) == (True, "Fine cancelled successfully")
+    assert fines.changes_since(seen)[1] == [fine_id]
@@ -1,205 +1,134 @@
-import mysql.connector
 from tkinter import messagebox
 import os
 import json
 import hashlib
 import random
 import string
+import threading
+import atexit
 from datetime import datetime, timedelta
-from config import DB_CONFIG, DB_NAME, USER_SESSION_FILE, ADMIN_SESSION_FILE
+from config import USER_SESSION_FILE, ADMIN_SESSION_FILE, QUERY_STATS_ENABLED, EXPLAIN_CAPTURE_ENABLED
+from db_pool import ConnectionPool, PoolExhaustedError
+from db_backend import get_backend
+from query_stats import instrument_cursor, write_query_report
 
 # ------------------- Database Utility Functions -------------------
-def connect_db():
-    """Connect to the database"""
+_pool = None
+_pool_lock = threading.Lock()
+
+def _open_connection():
+    """Open a brand-new connection on the configured backend (used by the pool only)"""
+    return get_backend().connect()
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                size = get_backend().pool_size
+                if QUERY_STATS_ENABLED or EXPLAIN_CAPTURE_ENABLED:  # EXPLAIN capture runs on the instrumented cursors
+                    _pool = ConnectionPool(_open_connection, size=size, cursor_wrapper=instrument_cursor)
+                    atexit.register(_write_query_report_on_exit)
+                else:
+                    _pool = ConnectionPool(_open_connection, size=size)
+    return _pool
+
+def _write_query_report_on_exit():
     try:
-        return mysql.connector.connect(**DB_CONFIG)
-    except mysql.connector.Error as err:
-        messagebox.showerror("Database Connection Error", f"Failed to connect to database: {err}")
-        return None
+        write_query_report()
+    except OSError as err:
+        print(f"Could not write query report: {err}")
 
-def verify_database():
-    """Verify that the database and tables exist"""
-    try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        if not connection:
-            return False
-        
-        cursor = connection.cursor()
-        
-        # Check if tables exist
-        tables = ["Books", "Users", "Loans", "Fines"]
-        for table in tables:
-            cursor.execute(f"SHOW TABLES LIKE '{table}'")
-            if not cursor.fetchone():
-                return False
-        
-        return True
-    except mysql.connector.Error:
-        return False
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+def get_pool_stats():
+    """Checkout wait time, exhaustion and reconnect counters for the connection pool"""
+    return get_pool().stats()
+
+# Called instead of messagebox when an error is raised on a worker thread
+_error_reporter = None
+
+def set_error_reporter(reporter):
+    """Install the function that delivers worker-thread errors to the Tk thread"""
+    global _error_reporter
+    _error_reporter = reporter
 
-def create_database():
-    """Create the library_system database and tables"""
+def show_error(title, message):
+    """Show an error dialog - safe to call from data functions running on a worker thread"""
+    if threading.current_thread() is threading.main_thread() or _error_reporter is None:
+        messagebox.showerror(title, message)
+    else:
+        _error_reporter(title, message)
+
+def connect_db():
+    """Check out a pooled database connection - close() returns it to the pool"""
     try:
-        # Connect without database selected
-        connection = mysql.connector.connect(
-            host=DB_CONFIG["host"],
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"]
-        )
-        cursor = connection.cursor()
-        
-        # Create database
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_NAME}")
-        cursor.execute(f"USE {DB_NAME}")
-        
-        # Create Users table with secret column
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Users (
-                user_id INT AUTO_INCREMENT PRIMARY KEY,
-                first_name VARCHAR(50) NOT NULL,
-                last_name VARCHAR(50) NOT NULL,
-                email VARCHAR(100) NOT NULL UNIQUE,
-                password VARCHAR(255) NOT NULL,
-                secret VARCHAR(50) NOT NULL,
-                role ENUM('member', 'admin') DEFAULT 'member',
-                registration_date DATE DEFAULT (CURRENT_DATE),
-                CONSTRAINT email_unique UNIQUE (email)
-            )
-        """)
-        
-        # Create Books table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Books (
-                book_id INT AUTO_INCREMENT PRIMARY KEY,
-                title VARCHAR(255) NOT NULL,
-                author VARCHAR(100) NOT NULL,
-                isbn VARCHAR(20) UNIQUE,
-                publication_year INT,
-                genre VARCHAR(50),
-                description TEXT,
-                total_copies INT DEFAULT 1,
-                available_copies INT DEFAULT 1
-            )
-        """)
-        
-        # Create Loans table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Loans (
-                loan_id INT AUTO_INCREMENT PRIMARY KEY,
-                user_id INT,
-                book_id INT,
-                loan_date DATE DEFAULT (CURRENT_DATE),
-                due_date DATE,
-                return_date DATE NULL,
-                FOREIGN KEY (user_id) REFERENCES Users(user_id),
-                FOREIGN KEY (book_id) REFERENCES Books(book_id)
-            )
-        """)
-        
-        # Create Fines table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Fines (
-                fine_id INT AUTO_INCREMENT PRIMARY KEY,
-                loan_id INT,
-                amount DECIMAL(10, 2) NOT NULL,
-                description VARCHAR(255),
-                paid BOOLEAN DEFAULT FALSE,
-                payment_date DATE NULL,
-                FOREIGN KEY (loan_id) REFERENCES Loans(loan_id)
-            )
-        """)
-        
-        # Check if there's at least one admin user
-        cursor.execute("SELECT COUNT(*) FROM Users WHERE role = 'admin'")
-        admin_count = cursor.fetchone()[0]
-        
-        # Create default admin if none exists
-        if admin_count == 0:
-            default_password = hashlib.sha256("admin123".encode()).hexdigest()
-            admin_secret = generate_secret()
-            
-            cursor.execute("""
-                INSERT INTO Users (first_name, last_name, email, password, secret, role)
-                VALUES ('Admin', 'User', 'admin@library.com', %s, %s, 'admin')
-            """, (default_password, admin_secret))
-        
-        # Insert sample book data if the Books table is empty
-        cursor.execute("SELECT COUNT(*) FROM Books")
-        book_count = cursor.fetchone()[0]
-        
-        if book_count == 0:
-            sample_books = [
-                ("The Great Gatsby", "F. Scott Fitzgerald", "9780743273565", 1925, "Fiction", "A novel about the American Dream", 5, 5),
-                ("To Kill a Mockingbird", "Harper Lee", "9780061120084", 1960, "Fiction", "Classic novel of racial injustice", 3, 3),
-                ("1984", "George Orwell", "9780451524935", 1949, "Dystopian", "Dystopian social science fiction", 4, 4),
-                ("Pride and Prejudice", "Jane Austen", "9780141439518", 1813, "Romance", "A romantic novel of manners", 2, 2),
-                ("The Hobbit", "J.R.R. Tolkien", "9780547928227", 1937, "Fantasy", "Fantasy novel and prelude to Lord of the Rings", 3, 3),
-                ("The Catcher in the Rye", "J.D. Salinger", "9780316769488", 1951, "Fiction", "Story of teenage angst and alienation", 2, 2),
-                ("The Lord of the Rings", "J.R.R. Tolkien", "9780618640157", 1954, "Fantasy", "Epic high-fantasy novel", 3, 3),
-                ("Animal Farm", "George Orwell", "9780451526342", 1945, "Satire", "Allegorical novella", 4, 4),
-                ("The Da Vinci Code", "Dan Brown", "9780307474278", 2003, "Mystery", "Mystery thriller novel", 5, 5),
-                ("Harry Potter and the Sorcerer's Stone", "J.K. Rowling", "9780590353427", 1997, "Fantasy", "Fantasy novel", 6, 6)
-            ]
-            
-            cursor.executemany("""
-                INSERT INTO Books (title, author, isbn, publication_year, genre, description, total_copies, available_copies)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, sample_books)
-        
-        connection.commit()
-        return True
-    except mysql.connector.Error as err:
-        messagebox.showerror("Database Setup Error", f"Failed to set up database: {err}")
-        return False
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
+        return get_pool().get_connection()
+    except PoolExhaustedError as err:
+        show_error("Database Connection Error", f"The database is busy, please try again: {err}")
+        return None
+    except get_backend().Error as err:
+        show_error("Database Connection Error", f"Failed to connect to database: {err}")
+        return None
 
 # ------------------- Session Utility Functions -------------------
+# Every screen loads the session when it is shown; the files are read once per run and
+# kept here, in step with every save and clear
+_user_session = None
+_admin_session = None
+
 def load_user_session():
     """Load user data from session file"""
+    global _user_session
+    if _user_session is not None:
+        return _user_session
     try:
         if os.path.exists(USER_SESSION_FILE):
             with open(USER_SESSION_FILE, 'r') as f:
-                return json.load(f)
-        return None
+                _user_session = json.load(f)
+        return _user_session
     except Exception as e:
         messagebox.showerror("Session Error", f"Failed to load session: {e}")
         return None
 
 def save_user_session(user_data):
     """Save user data to session file"""
+    global _user_session
     with open(USER_SESSION_FILE, 'w') as f:
         json.dump(user_data, f)
+    _user_session = user_data
 
 def clear_user_session():
     """Delete the user session file"""
+    global _user_session
+    _user_session = None
     if os.path.exists(USER_SESSION_FILE):
         os.remove(USER_SESSION_FILE)
 
 def load_admin_session():
     """Load admin session data"""
+    global _admin_session
+    if _admin_session is not None:
+        return _admin_session
     try:
         if os.path.exists(ADMIN_SESSION_FILE):
             with open(ADMIN_SESSION_FILE, 'r') as f:
-                return json.load(f)
-        return None
+                _admin_session = json.load(f)
+        return _admin_session
     except Exception as e:
         messagebox.showerror("Session Error", f"Failed to load session: {e}")
         return None
 
 def save_admin_session(admin_data):
     """Save admin session data"""
+    global _admin_session
     with open(ADMIN_SESSION_FILE, 'w') as f:
         json.dump(admin_data, f)
+    _admin_session = admin_data
 
 def clear_admin_session():
     """Delete the admin session file"""
+    global _admin_session
+    _admin_session = None
     if os.path.exists(ADMIN_SESSION_FILE):
         os.remove(ADMIN_SESSION_FILE)
 
@@ -263,39 +192,3 @@ def generate_secret(length=12):
     """Generate a random secret key"""
     characters = string.ascii_letters + string.digits
     return ''.join(random.choice(characters) for _ in range(length))
-
-def update_password(email, secret, new_password):
-    """Update user password using email and secret"""
-    try:
-        connection = connect_db()
-        if not connection:
-            return False, "Database connection error"
-            
-        cursor = connection.cursor()
-        
-        # Check if email and secret match
-        cursor.execute(
-            "SELECT user_id FROM Users WHERE email = %s AND secret = %s",
-            (email, secret)
-        )
-        user = cursor.fetchone()
-        
-        if not user:
-            return False, "Invalid email or secret key"
-        
-        # Update the password
-        hashed_password = hash_password(new_password)
-        cursor.execute(
-            "UPDATE Users SET password = %s WHERE user_id = %s",
-            (hashed_password, user[0])
-        )
-        
-        connection.commit()
-        return True, "Password updated successfully"
-    
-    except mysql.connector.Error as err:
-        return False, f"Database error: {str(err)}"
-    finally:
-        if 'connection' in locals() and connection.is_connected():
-            cursor.close()
-            connection.close()
\ No newline at end of file